@@ -0,0 +1,201 @@
+"""Способы запуска игр разных типов.
+
+Каждый способ (backend) по пути к файлу игры строит команду запуска:
+argv, рабочую папку и окружение. Какой способ подходит файлу, решается
+один раз по сигнатуре и расширению, а результат сохраняется в
+``Games.launch_backend``.
+"""
+
+import abc
+import os
+import re
+import shlex
+import shutil
+import sys
+from functools import lru_cache
+from typing import NamedTuple
+
+ELF_MAGIC = b"\x7fELF"
+# AppImage — ELF с отметкой «AI» и номером типа в e_ident[8:11]
+APPIMAGE_MAGICS = (b"AI\x01", b"AI\x02")
+WINE_EXTENSIONS = {".exe", ".msi", ".bat"}
+# Коды полей из спецификации .desktop (%f, %U, ...): файлов лаунчер не
+# передаёт, поэтому они просто убираются
+DESKTOP_FIELD_CODE = re.compile(r"^%[fFuUdDnNickvm]$")
+
+
+class LaunchCommand(NamedTuple):
+    argv: list[str]
+    cwd: str
+    env: dict[str, str]
+
+
+def read_desktop_entry(path: str) -> dict[str, str]:
+    """Ключи секции ``[Desktop Entry]`` файла .desktop."""
+    entry = {}
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            in_entry = False
+            for line in file:
+                line = line.strip()
+                if line.startswith("["):
+                    in_entry = line == "[Desktop Entry]"
+                elif in_entry and "=" in line and not line.startswith("#"):
+                    key, value = line.split("=", 1)
+                    entry.setdefault(key.strip(), value.strip())
+    except OSError:
+        pass
+    return entry
+
+
+@lru_cache(maxsize=None)
+def base_environment() -> dict[str, str]:
+    """Окружение для игр, собранное один раз за время работы лаунчера."""
+    return dict(os.environ)
+
+
+@lru_cache(maxsize=None)
+def find_executable(name: str) -> str | None:
+    return shutil.which(name)
+
+
+class LaunchBackend(abc.ABC):
+    name = ""
+
+    @abc.abstractmethod
+    def matches(self, path: str, head: bytes) -> bool:
+        """Подходит ли способ файлу по пути и первым байтам."""
+
+    def command(self, path: str) -> LaunchCommand:
+        return LaunchCommand([path], os.path.dirname(path), base_environment())
+
+
+class AppImageBackend(LaunchBackend):
+    name = "appimage"
+
+    def matches(self, path, head):
+        return path.lower().endswith(".appimage") or (
+            head.startswith(ELF_MAGIC) and head[8:11] in APPIMAGE_MAGICS
+        )
+
+
+class NativeBackend(LaunchBackend):
+    name = "native"
+
+    def matches(self, path, head):
+        return head.startswith(ELF_MAGIC)
+
+
+class ScriptBackend(LaunchBackend):
+    name = "script"
+
+    def matches(self, path, head):
+        return head.startswith(b"#!") or path.lower().endswith(".sh")
+
+    def command(self, path):
+        # Скрипт без строки #! или без права на выполнение ядро не
+        # запустит, поэтому его выполняет sh
+        if os.access(path, os.X_OK) and _read_head(path).startswith(b"#!"):
+            argv = [path]
+        else:
+            argv = [find_executable("sh") or "/bin/sh", path]
+        return LaunchCommand(argv, os.path.dirname(path), base_environment())
+
+
+class DesktopBackend(LaunchBackend):
+    name = "desktop"
+
+    def matches(self, path, head):
+        return path.lower().endswith(".desktop")
+
+    def command(self, path):
+        entry = read_desktop_entry(path)
+        argv = [
+            arg
+            for arg in shlex.split(entry.get("Exec", ""))
+            if not DESKTOP_FIELD_CODE.match(arg)
+        ]
+        if not argv:
+            raise ValueError(f"В {path} не указана команда запуска (Exec)")
+        if os.sep not in argv[0]:
+            argv[0] = find_executable(argv[0]) or argv[0]
+        cwd = entry.get("Path") or os.path.dirname(path)
+        return LaunchCommand(argv, cwd, base_environment())
+
+
+class WineBackend(LaunchBackend):
+    name = "wine"
+
+    def matches(self, path, head):
+        return (
+            sys.platform != "win32"
+            and os.path.splitext(path)[1].lower() in WINE_EXTENSIONS
+        )
+
+    def command(self, path):
+        wine = find_executable("wine")
+        if wine is None:
+            raise FileNotFoundError("Для запуска Windows-игр установите Wine")
+        return LaunchCommand(
+            [wine, path], os.path.dirname(path), wine_environment(path)
+        )
+
+
+class WindowsBackend(LaunchBackend):
+    name = "windows"
+
+    def matches(self, path, head):
+        return sys.platform == "win32"
+
+
+def wine_prefix(path: str) -> str | None:
+    """Префикс Wine, внутри которого лежит игра (…/prefix/drive_c/…)."""
+    parts = path.split(os.sep)
+    if "drive_c" not in parts:
+        return None
+    return os.sep.join(parts[: parts.index("drive_c")])
+
+
+def wine_environment(path: str) -> dict[str, str]:
+    return _wine_environment(wine_prefix(path))
+
+
+@lru_cache(maxsize=None)
+def _wine_environment(prefix: str | None) -> dict[str, str]:
+    if prefix is None:
+        return base_environment()
+    return {**base_environment(), "WINEPREFIX": prefix}
+
+
+# Порядок важен: AppImage — тоже ELF, а .exe на Windows запускается
+# напрямую, без Wine
+BACKENDS = [
+    AppImageBackend(),
+    NativeBackend(),
+    ScriptBackend(),
+    DesktopBackend(),
+    WineBackend(),
+    WindowsBackend(),
+]
+BACKENDS_BY_NAME = {backend.name: backend for backend in BACKENDS}
+
+
+def _read_head(path: str) -> bytes:
+    try:
+        with open(path, "rb") as file:
+            return file.read(16)
+    except OSError:
+        return b""
+
+
+def resolve_backend(path: str) -> str | None:
+    """Имя способа запуска файла или None, если ни один не подходит."""
+    head = _read_head(path)
+    for backend in BACKENDS:
+        if backend.matches(path, head):
+            return backend.name
+    return None
+
+
+def get_backend(name: str | None) -> LaunchBackend | None:
+    return BACKENDS_BY_NAME.get(name)
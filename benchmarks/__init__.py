@@ -0,0 +1,50 @@
+"""Общий код скриптов замеров.
+
+Скрипты запускаются как ``python benchmarks/<имя>.py`` и работают с
+отдельной папкой данных лаунчера: ``HOME`` переносится во временную
+папку, которая удаляется по завершении.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+HOME_VARIABLES = ("HOME", "USERPROFILE")
+
+
+def set_home(home):
+    """Направляет ``Path.home()`` (и папку данных) в ``home``."""
+    for name in HOME_VARIABLES:
+        os.environ[name] = str(home)
+
+
+@contextmanager
+def temp_home(prefix: str = "qtlauncher_bench_"):
+    """Временная домашняя папка с ``Documents`` на время блока."""
+    home = Path(tempfile.mkdtemp(prefix=prefix))
+    saved = {name: os.environ.get(name) for name in HOME_VARIABLES}
+    try:
+        (home / "Documents").mkdir()
+        set_home(home)
+        yield home
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(home, ignore_errors=True)
+
+
+def use_temp_home(prefix: str = "qtlauncher_bench_") -> Path:
+    """``temp_home()`` до конца процесса — для настройки на уровне модуля.
+
+    Вызывается до импорта модулей лаунчера.
+    """
+    context = temp_home(prefix)
+    home = context.__enter__()
+    atexit.register(context.__exit__, None, None, None)
+    return home
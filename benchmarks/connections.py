@@ -0,0 +1,135 @@
+"""Сколько соединений с SQLite открывает каждое действие интерфейса.
+
+Запуск: ``python benchmarks/connections.py``
+
+Действия повторяют вызовы ``Database`` из ``main.py`` и ``dialogs.py``.
+До общего ``ConnectionManager`` каждый метод ``Database`` и ``UserManager``
+открывал своё соединение, поэтому колонка «до» — это число вызовов этих
+методов, обратившихся к базе (вложенные вызовы не считаются). Колонка
+«после» — реально открытые соединения.
+"""
+
+import functools
+import inspect
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import use_temp_home  # noqa: E402
+
+use_temp_home()
+
+import db  # noqa: E402
+
+calls = 0
+depth = 0
+touched = False
+
+
+def count_calls(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        global calls, depth, touched
+        if not depth:
+            touched = False
+        depth += 1
+        try:
+            return method(*args, **kwargs)
+        finally:
+            depth -= 1
+            if not depth and touched:
+                calls += 1
+
+    return wrapper
+
+
+def mark_touched(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        global touched
+        touched = True
+        return method(*args, **kwargs)
+
+    return wrapper
+
+
+for cls in (db.UserManager, db.Database):
+    for name, method in inspect.getmembers(cls, inspect.isfunction):
+        if not name.startswith("_"):
+            setattr(cls, name, count_calls(method))
+db.ConnectionManager.get = mark_touched(db.ConnectionManager.get)
+
+
+def startup():
+    database = db.Database()
+    database.users.register_user("bench", "password")
+    database.users.login_user("bench", "password")
+    database.get_all_games()
+    database.get_last_games()
+    database.get_category_counts()
+    database.check_category_id_is_valid()
+    return database
+
+
+def add_game(database, index):
+    # AddGameDialog.accept_dialog
+    name = f"Game {index}"
+    path = f"/games/game_{index}.exe"
+    category_id = database.get_category_id_by_name("Все")
+    database.check_unique("Games", "name", name)
+    database.check_unique("Games", "path", path)
+    database.insert_game(name, path, category_id)
+    database.get_game(name)
+
+
+def edit_game(database, index):
+    # EditGameDialog и обновление строки в главном окне
+    name = f"Game {index}"
+    game = database.get_game(name)
+    database.check_unique("Games", "name", name + " (edited)")
+    database.update_game(name, name + " (edited)", game[3])
+    database.get_game(name + " (edited)")
+
+
+def filter_by_category(database):
+    database.get_category_id_by_name("Все")
+
+
+def delete_category(database):
+    # AddCategoryDialog, перенос игр в неё и DeleteCategoryDialog
+    category_id = database.insert_category("Bench")
+    database.move_games(
+        [game[0] for game in database.get_all_games()], category_id
+    )
+    database.delete_category("Bench", "Все")
+
+
+def measure(label, action, *args):
+    global calls
+    database = args[0] if args else None
+    calls = 0
+    before = database.connections.connects if database else 0
+    result = action(*args)
+    if database is None:
+        database = result
+        before = 0
+    after = database.connections.connects - before
+    print(f"{label:<28}{calls:>8}{after:>8}")
+    return result
+
+
+def main():
+    print(f"{'Действие':<28}{'до':>8}{'после':>8}")
+    database = measure("Запуск и вход", startup)
+    for i in range(3):
+        measure(f"Добавление игры #{i + 1}", add_game, database, i)
+    measure("Редактирование игры", edit_game, database, 0)
+    measure("Фильтр по категории", filter_by_category, database)
+    measure("Удаление категории", delete_category, database)
+    database.close()
+
+
+if __name__ == "__main__":
+    main()
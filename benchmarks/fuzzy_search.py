@@ -0,0 +1,108 @@
+"""Задержка нечёткого поиска ``TrigramIndex`` в зависимости от размера.
+
+Запуск: ``python benchmarks/fuzzy_search.py [--sizes 10000 100000 1000000]``
+
+Названия собираются из случайных слогов, запросы — это названия
+из индекса с внесёнными опечатками. Время построения индекса печатается
+отдельно.
+
+Из-за небольшого набора слогов на миллионе названий много почти
+одинаковых, поэтому попаданием считается первый результат, который
+совпадает с запросом не хуже исходного названия. Скрипт завершается
+с кодом 1, если на каком-то размере попаданий меньше ``--min-hits``
+процентов: задержка не должна покупаться потерей результатов.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fuzzy import TrigramIndex, normalize, word_distance  # noqa: E402
+
+SYLLABLES = [
+    "wit", "cher", "cy", "ber", "dark", "soul", "el", "den", "ring", "do",
+    "om", "ha", "des", "por", "tal", "stal", "ker", "star", "craft", "war",
+    "ме", "тро", "ста", "лкер", "ве", "дьмак", "тан", "ки", "гон", "ка",
+]
+
+
+def make_name(rng: random.Random) -> str:
+    words = [
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        for _ in range(rng.randint(1, 3))
+    ]
+    return " ".join(words).capitalize() + f" {rng.randint(1, 9)}"
+
+
+def add_typo(rng: random.Random, name: str) -> str:
+    position = rng.randrange(len(name))
+    kind = rng.choice(("drop", "swap", "replace"))
+    if kind == "drop":
+        return name[:position] + name[position + 1 :]
+    if kind == "swap" and position < len(name) - 1:
+        return (
+            name[:position]
+            + name[position + 1]
+            + name[position]
+            + name[position + 2 :]
+        )
+    return name[:position] + rng.choice("aeiouаеиоу") + name[position + 1 :]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="*", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--min-hits", type=int, default=95)
+    args = parser.parse_args()
+
+    failed = []
+    for size in args.sizes:
+        rng = random.Random(size)
+        names = [make_name(rng) for _ in range(size)]
+        index = TrigramIndex()
+        started = time.perf_counter()
+        for game_id, name in enumerate(names):
+            index.add(game_id, name)
+        built = time.perf_counter() - started
+
+        timings, hits = [], 0
+        for _ in range(args.queries):
+            target = rng.randrange(size)
+            query = add_typo(rng, names[target])
+            started = time.perf_counter()
+            found = index.search(query, 10)
+            timings.append((time.perf_counter() - started) * 1000)
+            if found:
+                query_words = normalize(query)
+                expected = word_distance(query_words, normalize(names[target]))
+                best = word_distance(query_words, normalize(names[found[0]]))
+                hits += best <= expected
+        timings.sort()
+        percent = hits * 100 // args.queries
+        if percent < args.min_hits:
+            failed.append(size)
+        print(
+            f"{size:>9} названий: построение {built:5.1f} с, "
+            f"медиана {statistics.median(timings):6.2f} мс, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:6.2f} мс, "
+            f"попаданий {percent}%"
+        )
+    if failed:
+        print(
+            f"Попаданий меньше {args.min_hits}%: "
+            f"{', '.join(str(size) for size in failed)}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Плавность прокрутки списка игр, пока иконки грузятся в фоне.
+
+Запуск: ``python benchmarks/icons.py [--games 20000]``
+
+Создаётся папка с играми-скриптами; у половины рядом лежит картинка
+(``<игра>.png``). Список прокручивается от начала до конца шагами по
+странице, и на каждом шаге замеряется время обработки событий — то, что
+пользователь видит как кадр. Первый проход идёт с пустым кэшем
+миниатюр, второй — с новым ``IconLoader``, то есть с пустой памятью, но
+с готовыми миниатюрами на диске.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import use_temp_home  # noqa: E402
+
+HOME = use_temp_home()
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QSize  # noqa: E402
+from PyQt6.QtGui import QColor, QImage  # noqa: E402
+from PyQt6.QtWidgets import QApplication, QListView, QStyle  # noqa: E402
+
+import db  # noqa: E402
+from icons import IconLoader  # noqa: E402
+from models import GameFilterProxyModel, GameListModel  # noqa: E402
+
+FRAME_MS = 16.0
+# Доля кадров дольше FRAME_MS, при которой прокрутка считается рывками
+SLOW_SHARE = 0.01
+SETTLE_MS = 40
+
+
+def make_games(folder: Path, count: int) -> list[tuple[str, str, None]]:
+    games = []
+    image = QImage(64, 64, QImage.Format.Format_ARGB32)
+    for i in range(count):
+        path = folder / f"game_{i}.sh"
+        path.write_text("#!/bin/sh\n")
+        if i % 2 == 0:
+            # Разные цвета — разные миниатюры, одинаковые — одна на диске
+            image.fill(QColor.fromHsv(i % 360, 200, 200))
+            image.save(str(folder / f"game_{i}.png"))
+        games.append((f"Игра {i}", str(path), None))
+    return games
+
+
+def scroll(app, view, model, loader) -> list[float]:
+    frames = []
+
+    def frame():
+        started = time.perf_counter()
+        app.processEvents()
+        frames.append((time.perf_counter() - started) * 1000)
+
+    bar = view.verticalScrollBar()
+    for value in range(0, bar.maximum() + 1, bar.pageStep()):
+        bar.setValue(value)
+        frame()
+        # Даём иконкам видимой страницы догрузиться, как при живой прокрутке
+        deadline = time.perf_counter() + SETTLE_MS / 1000
+        while time.perf_counter() < deadline:
+            frame()
+            time.sleep(0.002)
+    loader.pool.waitForDone()
+    frame()
+    return frames
+
+
+def report(title, frames, loader):
+    frames.sort()
+    slow = sum(1 for frame in frames if frame > FRAME_MS)
+    print(
+        f"{title:<22} кадров {len(frames):6}  медиана {statistics.median(frames):5.1f} мс  "
+        f"p95 {frames[int(len(frames) * 0.95)]:5.1f} мс  "
+        f"макс {frames[-1]:6.1f} мс  дольше {FRAME_MS:.0f} мс: {slow}  "
+        f"в памяти {len(loader._memory)} иконок"
+    )
+    return slow / len(frames) > SLOW_SHARE
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=20_000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    database = db.Database()
+    database.users.register_user("bench", "password")
+    database.users.login_user("bench", "password")
+    folder = HOME / "games"
+    folder.mkdir()
+    database.insert_games_bulk(make_games(folder, args.games))
+
+    model = GameListModel()
+    proxy = GameFilterProxyModel()
+    proxy.setSourceModel(model)
+    model.set_games(database.get_all_games())
+    view = QListView()
+    view.setUniformItemSizes(True)
+    view.setIconSize(QSize(24, 24))
+    view.resize(470, 600)
+    view.setModel(proxy)
+    view.show()
+    placeholder = view.style().standardIcon(QStyle.StandardPixmap.SP_FileIcon)
+    print(f"Каталог: {args.games} игр")
+
+    slow = False
+    for title in ("пустой кэш", "миниатюры на диске"):
+        loader = IconLoader(database)
+        model.set_icon_loader(loader, placeholder)
+        view.scrollToTop()
+        app.processEvents()
+        slow |= report(title, scroll(app, view, model, loader), loader)
+        loader.icons_ready.disconnect()
+        loader.shutdown()
+    database.close()
+    sys.exit(1 if slow else 0)
+
+
+if __name__ == "__main__":
+    main()
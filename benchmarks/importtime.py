@@ -0,0 +1,151 @@
+"""Время импорта ``main`` и время до первого кадра окна.
+
+Запуск: ``python benchmarks/importtime.py [--repeat 5] [--games 1000]``
+
+Импорт замеряется через ``python -X importtime -c "import main"`` в
+отдельном процессе: выводится общее время и самые медленные модули.
+Время до первого кадра — от запуска процесса до первой отрисовки
+главного окна вошедшего пользователя; отдельно выводится, когда в списке
+появились игры. Если медиана превышает бюджет, скрипт завершается с
+кодом 1, поэтому его можно запускать как проверку перед коммитом.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import use_temp_home  # noqa: E402
+
+use_temp_home()
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# Замеряется импорт, а не компиляция исходников в байткод
+os.environ.pop("PYTHONDONTWRITEBYTECODE", None)
+
+IMPORT_BUDGET_MS = 180.0
+FIRST_FRAME_BUDGET_MS = 400.0
+TOP_MODULES = 12
+
+FIRST_FRAME_SCRIPT = """
+import json, sys, time
+from PyQt6.QtCore import QEvent, QObject, QTimer
+from PyQt6.QtWidgets import QApplication
+
+app = QApplication(sys.argv)
+import main
+
+marks = {}
+
+class Probe(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and "frame" not in marks:
+            marks["frame"] = time.time()
+        return False
+
+def poll():
+    if window.game_model.rowCount() and "games" not in marks:
+        marks["games"] = time.time()
+    if len(marks) == 2:
+        print(json.dumps(marks))
+        app.quit()
+
+probe = Probe()
+window = main.QtLauncher()
+window.installEventFilter(probe)
+window.show()
+timer = QTimer()
+timer.timeout.connect(poll)
+timer.start(1)
+app.exec()
+"""
+
+
+def prepare(games: int):
+    """Папка данных с вошедшим пользователем и ``games`` играми."""
+    from db import database
+
+    database.users.register_user("bench", "password")
+    database.users.login_user("bench", "password")
+    database.insert_games_bulk(
+        (f"Игра {i}", f"/games/{i}.exe", None) for i in range(games)
+    )
+    database.close()
+
+
+def measure_import() -> tuple[float, list[tuple[float, str]]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        modules.append((int(self_us) / 1000, name.strip()))
+        if name.strip() == "main":
+            total = int(cumulative_us) / 1000
+    return total, sorted(modules, reverse=True)[:TOP_MODULES]
+
+
+def measure_first_frame() -> tuple[float, float]:
+    started = time.time()
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_FRAME_SCRIPT],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=60,
+    )
+    marks = json.loads(result.stdout.strip().splitlines()[-1])
+    return (marks["frame"] - started) * 1000, (marks["games"] - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--games", type=int, default=1000)
+    args = parser.parse_args()
+
+    prepare(args.games)
+    measure_import()
+
+    imports = []
+    for _ in range(args.repeat):
+        total, slowest = measure_import()
+        imports.append(total)
+    print("Самые долгие модули (собственное время):")
+    for self_ms, name in slowest:
+        print(f"  {self_ms:7.1f} мс  {name}")
+
+    frames, contents = [], []
+    for _ in range(args.repeat):
+        frame, content = measure_first_frame()
+        frames.append(frame)
+        contents.append(content)
+
+    import_ms = statistics.median(imports)
+    frame_ms = statistics.median(frames)
+    print(f"import main        {import_ms:7.1f} мс  (бюджет {IMPORT_BUDGET_MS:.0f})")
+    print(f"первый кадр        {frame_ms:7.1f} мс  (бюджет {FIRST_FRAME_BUDGET_MS:.0f})")
+    print(f"список игр ({args.games}) {statistics.median(contents):7.1f} мс")
+    over = import_ms > IMPORT_BUDGET_MS or frame_ms > FIRST_FRAME_BUDGET_MS
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Проверка обновления базы первой версии со сломанными категориями.
+
+Запуск: ``python benchmarks/migration_upgrade.py``
+
+Создаёт базу схемы версии 1, в которой одна игра ссылается на удалённую
+категорию, а другая — на категорию другого пользователя, и обновляет её
+с включёнными внешними ключами, как это делает ``ConnectionManager``.
+Скрипт завершается с кодом 1, если обновление упало или после него
+остались висячие ссылки.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import migrations  # noqa: E402
+
+
+def build_v1() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    migrations.MIGRATIONS[0](conn)
+    conn.execute("PRAGMA user_version = 1")
+    conn.executemany(
+        "INSERT INTO Users (id, login, password) VALUES (?, ?, '')",
+        [(1, "alice"), (2, "bob")],
+    )
+    conn.executemany(
+        "INSERT INTO Categories (id, name, user_id) VALUES (?, ?, ?)",
+        [(1, "Все", 1), (2, "RPG", 1), (3, "Все", 2)],
+    )
+    conn.executemany(
+        """INSERT INTO Games (name, path, category_id, user_id)
+        VALUES (?, ?, ?, ?)""",
+        [
+            ("ok", "/ok", 2, 1),
+            ("orphan", "/orphan", 99, 1),
+            ("foreign", "/foreign", 3, 1),
+        ],
+    )
+    return conn
+
+
+def main() -> int:
+    conn = build_v1()
+    conn.execute("PRAGMA foreign_keys = ON")
+    failed = []
+    try:
+        version = migrations.migrate(conn)
+    except sqlite3.Error as e:
+        print(f"[FAIL] migrate: {e}")
+        return 1
+    if version != migrations.SCHEMA_VERSION:
+        failed.append(f"версия схемы {version}")
+    games = dict(conn.execute("SELECT name, category_id FROM Games"))
+    expected = {"ok": 2, "orphan": 1, "foreign": 1}
+    if games != expected:
+        failed.append(f"категории игр {games}, ожидалось {expected}")
+    violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+    if violations:
+        failed.append(f"висячие ссылки {violations}")
+    if conn.execute("PRAGMA foreign_keys").fetchone()[0] != 1:
+        failed.append("внешние ключи остались выключены")
+    conn.close()
+    for message in failed:
+        print(f"[FAIL] {message}")
+    if not failed:
+        print(f"[ok] версия 1 -> {version}, категории: {games}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
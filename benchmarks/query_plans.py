@@ -0,0 +1,252 @@
+"""Проверка планов выполнения запросов ``db.py``.
+
+Запуск: ``python benchmarks/query_plans.py``
+
+Скрипт вызывает методы ``Database`` на небольшой базе, перехватывает
+выполненные ими инструкции через ``set_trace_callback`` и печатает
+``EXPLAIN QUERY PLAN`` каждой из них — проверяются те запросы, что
+действительно отправляет лаунчер. Отдельно проверяется поиск дочерних
+строк каждого внешнего ключа: его SQLite выполняет при удалении и
+изменении родительской строки, и в перехваченных инструкциях он не
+виден. Скрипт завершается с кодом 1, если хоть один запрос делает
+полный просмотр таблицы или индекса.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import use_temp_home  # noqa: E402
+
+use_temp_home()
+
+import db  # noqa: E402
+
+# Методы, которым полный просмотр нужен по смыслу
+FULL_SCAN_ALLOWED: set[str] = set()
+# Управление транзакциями, настройки и строки триггеров («-- TRIGGER»)
+SKIPPED_PREFIXES = (
+    "BEGIN",
+    "COMMIT",
+    "ROLLBACK",
+    "SAVEPOINT",
+    "RELEASE",
+    "PRAGMA",
+    "--",
+)
+SQL_PREVIEW = 100
+
+
+def full_scans(details: list[str]) -> list[str]:
+    # "SCAN Games" — полный просмотр. "SCAN ... USING INDEX", виртуальные
+    # таблицы (FTS5, json_each), константная строка и уже вычисленные
+    # подзапросы ("MATERIALIZE found" ... "SCAN found") — нет.
+    subqueries = {
+        detail.split()[1]
+        for detail in details
+        if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))
+    }
+    return [
+        detail
+        for detail in details
+        if detail.startswith("SCAN ")
+        and "USING" not in detail
+        and "VIRTUAL TABLE" not in detail
+        and detail != "SCAN CONSTANT ROW"
+        and detail.split()[1] not in subqueries
+    ]
+
+
+def prepare(database) -> dict:
+    database.users.register_user("plans", "password")
+    database.users.register_user("other", "password")
+    database.users.login_user("plans", "password")
+    database.insert_category("RPG")
+    database.insert_category("Стратегии")
+    database.insert_games_bulk(
+        [(f"Game {i}", f"/games/{i}.exe", "RPG") for i in range(20)]
+    )
+    return {
+        "all": database.get_category_id_by_name("Все"),
+        "rpg": database.get_category_id_by_name("RPG"),
+        "game": database.get_game("Game 1")[0],
+        "batch": [database.get_game(f"Game {i}")[0] for i in (2, 3, 4)],
+    }
+
+
+def calls(database, ids: dict) -> list:
+    users = database.users
+    session = {}
+    result = [
+        ("login_user", lambda: users.login_user("plans", "password")),
+        ("user_exists", lambda: users.user_exists("plans")),
+        ("get_all_games", database.get_all_games),
+        ("get_game", lambda: database.get_game("Game 1")),
+        ("get_game_by_id", lambda: database.get_game_by_id(ids["game"])),
+        (
+            "check_unique(name)",
+            lambda: database.check_unique("Games", "name", "Game 1"),
+        ),
+        (
+            "check_unique(category)",
+            lambda: database.check_unique("Categories", "name", "RPG"),
+        ),
+        ("get_category_counts", database.get_category_counts),
+        (
+            "get_category_id_by_name",
+            lambda: database.get_category_id_by_name("RPG"),
+        ),
+        ("search_games", lambda: database.search_games("Gam")),
+        ("fuzzy_search_games", lambda: database.fuzzy_search_games("Gmae 1")),
+    ]
+    for mode in db.SORT_MODES:
+        for reverse in (False, True):
+            result.append(
+                (
+                    f"get_game_order({mode}, reverse={reverse})",
+                    lambda mode=mode, reverse=reverse: (
+                        database.get_game_order(mode, reverse)
+                    ),
+                )
+            )
+
+    def start_session():
+        session["id"] = database.start_play_session(ids["game"])
+
+    result += [
+        ("start_play_session", start_session),
+        (
+            "finish_play_session",
+            lambda: database.finish_play_session(session["id"]),
+        ),
+        ("get_last_games", database.get_last_games),
+        (
+            "set_game_backend",
+            lambda: database.set_game_backend(ids["game"], "native"),
+        ),
+        (
+            "insert_game",
+            lambda: database.insert_game("New", "/games/new.exe", ids["all"]),
+        ),
+        (
+            "update_game",
+            lambda: database.update_game("New", "Newer", ids["rpg"]),
+        ),
+        ("delete_game", lambda: database.delete_game("Newer")),
+        (
+            "delete_category(с играми)",
+            lambda: database.delete_category("RPG", "Стратегии"),
+        ),
+        (
+            "move_games",
+            lambda: database.move_games(ids["batch"], ids["all"]),
+        ),
+        (
+            "rename_games",
+            lambda: database.rename_games(ids["batch"], "Game", "Игра"),
+        ),
+        ("delete_games", lambda: database.delete_games(ids["batch"][:1])),
+        ("insert_category", lambda: database.insert_category("Гонки")),
+        ("delete_category", lambda: database.delete_category("Гонки")),
+        (
+            "set_games_missing",
+            lambda: database.set_games_missing(["/games/5.exe"], True),
+        ),
+        (
+            "save_scan_state",
+            lambda: database.save_scan_state(
+                {"/games/5.exe": ("/games", False, 1, 2, 3)}, ["/gone"]
+            ),
+        ),
+        ("load_scan_state", database.load_scan_state),
+        ("get_game_paths", database.get_game_paths),
+        ("set_thumbnail", lambda: database.set_thumbnail("key", "digest")),
+        ("get_thumbnail", lambda: database.get_thumbnail("key")),
+        ("forget_thumbnails", lambda: database.forget_thumbnails(["digest"])),
+        ("check_category_id_is_valid", database.check_category_id_is_valid),
+    ]
+    return result
+
+
+def foreign_key_plans(conn) -> dict[str, list[str]]:
+    """Планы поиска дочерних строк для каждого внешнего ключа."""
+    plans = {}
+    tables = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    ).fetchall()
+    for (table,) in tables:
+        for key in conn.execute(f"PRAGMA foreign_key_list({table})"):
+            parent, column = key[2], key[3]
+            plan = conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT 1 FROM {table} WHERE {column} = ?",
+                (0,),
+            ).fetchall()
+            plans[f"{table}.{column} -> {parent}"] = [row[3] for row in plan]
+    return plans
+
+
+def capture(database, methods: list) -> dict[str, list[str]]:
+    """Инструкции, выполненные каждым методом, без повторов."""
+    conn = database.get_connection()
+    statements = []
+    captured = {}
+    conn.set_trace_callback(statements.append)
+    try:
+        for name, call in methods:
+            # С холодным кэшем видны и запросы загрузки каталога
+            database.invalidate_cache()
+            statements.clear()
+            call()
+            captured[name] = list(
+                dict.fromkeys(
+                    sql
+                    for sql in statements
+                    if not sql.lstrip().upper().startswith(SKIPPED_PREFIXES)
+                )
+            )
+    finally:
+        conn.set_trace_callback(None)
+    return captured
+
+
+def main() -> int:
+    database = db.Database()
+    ids = prepare(database)
+    captured = capture(database, calls(database, ids))
+    conn = database.get_connection()
+    failed = []
+    for name, statements in captured.items():
+        plans = []
+        for sql in statements:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+            plans.append((sql, [row[3] for row in plan]))
+        scans = name not in FULL_SCAN_ALLOWED and any(
+            full_scans(details) for _sql, details in plans
+        )
+        status = "FAIL" if scans else "ok"
+        if scans:
+            failed.append(name)
+        print(f"[{status}] {name}")
+        for sql, details in plans:
+            print(f"   {' '.join(sql.split())[:SQL_PREVIEW]}")
+            for detail in details:
+                print(f"       {detail}")
+    for name, details in foreign_key_plans(conn).items():
+        # Здесь и просмотр индекса целиком — тоже полный просмотр
+        scans = [detail for detail in details if detail.startswith("SCAN ")]
+        status = "FAIL" if scans else "ok"
+        if scans:
+            failed.append(f"внешний ключ {name}")
+        print(f"[{status}] внешний ключ {name}")
+        for detail in details:
+            print(f"       {detail}")
+    database.close()
+    if failed:
+        print(f"Полный просмотр: {', '.join(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Пропускная способность ``LibraryScanner`` на синтетическом дереве.
+
+Запуск: ``python benchmarks/scanner.py [--files 100000] [--root ПУТЬ]``
+
+Дерево состоит из папок игр по 50 файлов, среди которых исполняемые,
+деинсталляторы, библиотеки и данные. По умолчанию в нём 100 тысяч файлов,
+оно строится во временной папке и удаляется после замера. Дерево в
+``--root`` остаётся на месте, и повторный запуск его переиспользует.
+
+В конце замеряется пересканирование неизменного дерева с индексом файлов,
+сохранённым в ``ScanState``, включая его загрузку из базы.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import use_temp_home  # noqa: E402
+
+HOME = use_temp_home()
+
+import db  # noqa: E402
+from scanner import FileState, LibraryScanner  # noqa: E402
+
+FILES_PER_DIR = 50
+DIRS_PER_GROUP = 100
+FILE_NAMES = [
+    "game.exe",
+    "unins000.exe",
+    "vc_redist.x64.exe",
+    "start.sh",
+] + [f"data_{i}.pak" for i in range(FILES_PER_DIR - 4)]
+
+
+def build_tree(root: Path, files: int):
+    marker = root / f".synthetic_{files}"
+    if marker.exists():
+        return
+    directories = max(1, files // FILES_PER_DIR)
+    for index in range(directories):
+        group = root / f"group_{index // DIRS_PER_GROUP}"
+        game_dir = group / f"Game {index}" / "bin"
+        game_dir.mkdir(parents=True, exist_ok=True)
+        for name in FILE_NAMES:
+            (game_dir / name).touch()
+    marker.touch()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--root", type=Path)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    # Временная папка HOME удаляется при выходе вместе с деревом
+    root = args.root or HOME / "scan_tree"
+    root.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    build_tree(root, args.files)
+    print(f"Дерево: {root} ({time.perf_counter() - started:.1f} с)")
+
+    for workers in args.workers:
+        scanner = LibraryScanner([str(root)], workers=workers)
+        first_batch = None
+        started = time.perf_counter()
+
+        def on_found(_batch):
+            nonlocal first_batch
+            if first_batch is None:
+                first_batch = time.perf_counter() - started
+
+        scanner.scan(on_found)
+        stats = scanner.stats
+        print(
+            f"потоков {workers:>3}: {stats.files} файлов, "
+            f"{stats.directories} папок, найдено {stats.candidates} "
+            f"за {stats.elapsed:.2f} с "
+            f"({stats.files / stats.elapsed:,.0f} файлов/с), "
+            f"первая порция через {first_batch or 0:.3f} с"
+        )
+
+    database = db.Database()
+    database.users.register_user("bench", "password")
+    database.users.login_user("bench", "password")
+    database.save_scan_state(scanner.changed_state, [])
+    for attempt in range(3):
+        started = time.perf_counter()
+        state = {
+            path: FileState._make(row)
+            for path, row in database.load_scan_state().items()
+        }
+        loaded = time.perf_counter() - started
+        scanner = LibraryScanner([str(root)], state=state)
+        scanner.scan()
+        total = time.perf_counter() - started
+        print(
+            f"пересканирование #{attempt + 1}: {total * 1000:.1f} мс "
+            f"(загрузка индекса {loaded * 1000:.1f} мс, "
+            f"прочитано папок {scanner.stats.directories_read}, "
+            f"изменений {len(scanner.changed_state)})"
+        )
+    database.close()
+
+
+if __name__ == "__main__":
+    main()
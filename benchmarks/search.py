@@ -0,0 +1,84 @@
+"""Время ответа ``Database.search_games`` на большом каталоге.
+
+Запуск: ``python benchmarks/search.py [--games 100000]``
+
+Названия игр собираются из случайных слогов (латиница и кириллица),
+поэтому распределение слов похоже на настоящую библиотеку. Для каждого
+запроса печатаются медиана и 95-й перцентиль.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import use_temp_home  # noqa: E402
+
+use_temp_home()
+
+import db  # noqa: E402
+
+SYLLABLES = [
+    "wit", "cher", "cy", "ber", "dark", "soul", "el", "den", "ring", "do",
+    "om", "ha", "des", "por", "tal", "stal", "ker", "star", "craft", "war",
+    "ме", "тро", "ста", "лкер", "ве", "дьмак", "тан", "ки", "гон", "ка",
+]
+QUERIES = ["w", "wi", "witch", "dark so", "ве", "ведь", "star craft 2", "zzz"]
+TARGET_MS = 5.0
+
+
+def make_name(rng: random.Random, index: int) -> str:
+    words = [
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+        for _ in range(rng.randint(1, 3))
+    ]
+    return " ".join(words).capitalize() + f" {index}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    database = db.Database()
+    database.users.register_user("bench", "password")
+    database.users.login_user("bench", "password")
+
+    rng = random.Random(42)
+    started = time.perf_counter()
+    database.insert_games_bulk(
+        (make_name(rng, i), f"/games/{i}.exe", None)
+        for i in range(args.games)
+    )
+    print(
+        f"Каталог: {args.games} игр "
+        f"({time.perf_counter() - started:.1f} с на заполнение)"
+    )
+
+    slow = False
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            found = database.search_games(query, 50)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        median = statistics.median(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        slow |= median > TARGET_MS
+        print(
+            f"{query!r:<16} найдено {len(found):>3}  "
+            f"медиана {median:6.2f} мс  p95 {p95:6.2f} мс"
+        )
+    database.close()
+    sys.exit(1 if slow else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Время переключения сортировки списка игр на большом каталоге.
+
+Запуск: ``python benchmarks/sorting.py [--games 100000]``
+
+Для каждого режима замеряются чтение id из индекса
+(``Database.get_game_order``), перестановка строк модели
+(``GameListModel.set_order``) под прокси-моделью фильтра и списком,
+а также разворот порядка кнопками A - Z / Z - A без обращения к базе.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import use_temp_home  # noqa: E402
+
+use_temp_home()
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication, QListView  # noqa: E402
+
+import db  # noqa: E402
+from models import GameFilterProxyModel, GameListModel  # noqa: E402
+
+SYLLABLES = [
+    "wit", "cher", "cy", "ber", "dark", "soul", "el", "den", "ring", "do",
+    "ме", "тро", "ста", "лкер", "ве", "дьмак", "тан", "ки", "гон", "ка",
+]
+TARGET_MS = 250.0
+
+
+def make_name(rng: random.Random, index: int) -> str:
+    words = [
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+        for _ in range(rng.randint(1, 3))
+    ]
+    return " ".join(words).capitalize() + f" {index}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    database = db.Database()
+    database.users.register_user("bench", "password")
+    database.users.login_user("bench", "password")
+
+    rng = random.Random(42)
+    database.insert_games_bulk(
+        (make_name(rng, i), f"/games/{i}.exe", None)
+        for i in range(args.games)
+    )
+    with database.transaction() as conn:
+        conn.executemany(
+            """UPDATE Games SET last_played = ?, play_count = ?,
+            install_size = ? WHERE id = ?""",
+            [
+                (
+                    rng.choice([None, rng.randint(0, 10**9)]),
+                    rng.randint(0, 100),
+                    rng.randint(0, 10**10),
+                    game_id,
+                )
+                for (game_id,) in conn.execute("SELECT id FROM Games")
+            ],
+        )
+    database.invalidate_cache()
+
+    model = GameListModel()
+    proxy = GameFilterProxyModel()
+    proxy.setSourceModel(model)
+    model.set_games(database.get_all_games())
+    view = QListView()
+    view.setUniformItemSizes(True)
+    view.setModel(proxy)
+    view.show()
+    app.processEvents()
+    print(f"Каталог: {args.games} игр")
+
+    slow = False
+    for mode in db.SORT_MODES:
+        query_times, layout_times, reverse_times = [], [], []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            order = database.get_game_order(mode)
+            queried = time.perf_counter()
+            model.set_order(order)
+            app.processEvents()
+            ordered = time.perf_counter()
+            model.reverse_order()
+            app.processEvents()
+            finished = time.perf_counter()
+            query_times.append((queried - started) * 1000)
+            layout_times.append((ordered - queried) * 1000)
+            reverse_times.append((finished - ordered) * 1000)
+        query = statistics.median(query_times)
+        layout = statistics.median(layout_times)
+        slow |= query + layout > TARGET_MS
+        print(
+            f"{mode:<13} индекс {query:6.1f} мс  модель {layout:6.1f} мс  "
+            f"разворот {statistics.median(reverse_times):6.1f} мс"
+        )
+    database.close()
+    sys.exit(1 if slow else 0)
+
+
+if __name__ == "__main__":
+    main()
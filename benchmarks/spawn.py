@@ -0,0 +1,141 @@
+"""Задержка запуска игры для каждого способа из ``backends``.
+
+Запуск: ``python benchmarks/spawn.py [--repeat 200]``
+
+Для каждого способа создаётся крошечная «игра», которая сразу выходит,
+и замеряется время от вызова до возврата управления лаунчеру:
+``launcher.spawn`` (``os.posix_spawn`` через ``sh``, который меняет
+рабочую папку), ``os.posix_spawn`` самой игры без смены папки,
+``subprocess.Popen`` с рабочей папкой (fork + exec) и ``QProcess.start``. Если Wine не установлен, вместо него подставляется
+скрипт-заглушка: замеряется сам запуск, а не старт Wine.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import use_temp_home  # noqa: E402
+
+WORK = use_temp_home()
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+if shutil.which("wine") is None:
+    (WORK / "bin").mkdir()
+    stub = WORK / "bin" / "wine"
+    stub.write_text("#!/bin/sh\nexit 0\n")
+    stub.chmod(0o755)
+    os.environ["PATH"] = f"{WORK / 'bin'}{os.pathsep}{os.environ['PATH']}"
+
+from PyQt6.QtCore import QCoreApplication, QProcess  # noqa: E402
+
+import backends  # noqa: E402
+import launcher  # noqa: E402
+
+
+def make_targets() -> dict[str, str]:
+    true = shutil.which("true")
+    shutil.copy(true, WORK / "native")
+    shutil.copy(true, WORK / "game.AppImage")
+    script = WORK / "game.sh"
+    script.write_text("#!/bin/sh\nexit 0\n")
+    script.chmod(0o755)
+    (WORK / "game.desktop").write_text(
+        f"[Desktop Entry]\nName=Игра\nExec={true} %U\n"
+    )
+    prefix_game = WORK / "prefix" / "drive_c" / "Games" / "game.exe"
+    prefix_game.parent.mkdir(parents=True)
+    prefix_game.touch()
+    return {
+        "native": str(WORK / "native"),
+        "appimage": str(WORK / "game.AppImage"),
+        "script": str(script),
+        "desktop": str(WORK / "game.desktop"),
+        "wine": str(prefix_game),
+    }
+
+
+def measure(start, repeat: int) -> float:
+    """Медиана времени ``start()`` в микросекундах.
+
+    ``start`` возвращает функцию, которая дожидается выхода ребёнка;
+    ожидание в замер не входит.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        reap = start()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+        reap()
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    if not launcher.spawn_supported():
+        print("posix_spawn и pidfd недоступны: замер не имеет смысла")
+        return
+    app = QCoreApplication(sys.argv)  # noqa: F841
+
+    print(
+        f"{'способ':<10}{'spawn':>14}{'posix_spawn':>12}"
+        f"{'Popen':>12}{'QProcess':>12}"
+    )
+    for expected, path in make_targets().items():
+        name = backends.resolve_backend(path)
+        assert name == expected, (path, name)
+        command = backends.get_backend(name).command(path)
+
+        def spawn():
+            pid = launcher.spawn(command)
+            return lambda: os.waitpid(pid, 0)
+
+        def posix_spawn():
+            pid = os.posix_spawn(
+                command.argv[0], command.argv, command.env, setsid=True
+            )
+            return lambda: os.waitpid(pid, 0)
+
+        def popen():
+            process = subprocess.Popen(
+                command.argv,
+                cwd=command.cwd,
+                env=command.env,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            return process.wait
+
+        def qprocess():
+            process = QProcess()
+            process.setProgram(command.argv[0])
+            process.setArguments(command.argv[1:])
+            process.setWorkingDirectory(command.cwd)
+            process.setStandardOutputFile(QProcess.nullDevice())
+            process.setStandardErrorFile(QProcess.nullDevice())
+            process.start()
+            process.waitForStarted()
+            return lambda: process.waitForFinished()
+
+        print(
+            f"{name:<10}"
+            f"{measure(spawn, args.repeat):>11.0f} мкс"
+            f"{measure(posix_spawn, args.repeat):>8.0f} мкс"
+            f"{measure(popen, args.repeat):>8.0f} мкс"
+            f"{measure(qprocess, args.repeat):>8.0f} мкс"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Нагрузочный тест: несколько процессов работают с одним ``games.db``.
+
+Запуск: ``python benchmarks/stress_concurrency.py [процессы] [операции]``
+
+Каждый процесс имитирует отдельный экземпляр лаунчера: регистрирует своего
+пользователя и выполняет смесь чтений и записей. В конце печатается число
+операций в секунду, количество повторов из-за занятой базы и ошибок, а
+строки Games каждого пользователя сверяются с тем, что записал процесс.
+При ошибках или расхождениях скрипт завершается с кодом 1.
+"""
+
+import multiprocessing
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import set_home, temp_home  # noqa: E402
+
+
+def worker(home: str, index: int, operations: int, queue):
+    set_home(home)
+    import db
+
+    database = db.Database()
+    login = f"stress_{index}"
+    database.users.register_user(login, "password")
+    database.users.login_user(login, "password")
+    category_id = database.get_category_id_by_name("Все")
+
+    rng = random.Random(index)
+    # Что должно оказаться в базе: insert_game и update_game печатают
+    # ошибки, а не поднимают их, поэтому итог проверяется по строкам
+    expected = {}
+    errors = 0
+    started = time.perf_counter()
+    for op in range(operations):
+        try:
+            roll = rng.random()
+            if roll < 0.4 or not expected:
+                name, path = f"Game {op}", f"/games/{index}/{op}.exe"
+                database.insert_game(name, path, category_id)
+                expected[name] = path
+            elif roll < 0.55:
+                name = rng.choice(sorted(expected))
+                new_name = f"{name.split(' v')[0]} v{op}"
+                database.update_game(name, new_name, category_id)
+                expected[new_name] = expected.pop(name)
+            else:
+                database.get_all_games()
+                database.get_game(rng.choice(sorted(expected)))
+        except Exception:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    queue.put(
+        (
+            index,
+            elapsed,
+            database.connections.busy_retries_done,
+            errors,
+            expected,
+        )
+    )
+    database.close()
+
+
+def verify(db_path: Path, results: list) -> list[str]:
+    """Сверяет итоговые строки Games с тем, что записал каждый процесс."""
+    conn = sqlite3.connect(db_path)
+    problems = []
+    integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    if integrity != "ok":
+        problems.append(f"integrity_check: {integrity}")
+    for index, _elapsed, _retries, _errors, expected in results:
+        actual = dict(
+            conn.execute(
+                """SELECT g.name, g.path FROM Games g
+                JOIN Users u ON u.id = g.user_id
+                WHERE u.login = ?""",
+                (f"stress_{index}",),
+            )
+        )
+        if actual != expected:
+            missing = expected.keys() - actual.keys()
+            extra = actual.keys() - expected.keys()
+            problems.append(
+                f"#{index}: игр {len(actual)} из {len(expected)}, "
+                f"нет {sorted(missing)[:3]}, лишние {sorted(extra)[:3]}"
+            )
+    conn.close()
+    return problems
+
+
+def run(home: Path, processes: int, operations: int) -> tuple[list, list]:
+    """Результаты процессов и найденные в базе расхождения."""
+    import db
+    from utils import data_manager
+
+    # Создаём схему заранее, чтобы процессы не соревновались за миграции
+    database = db.Database()
+    database.close()
+    # Настройки пишутся с задержкой, а папка удаляется раньше atexit
+    data_manager.flush()
+
+    queue = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=worker, args=(str(home), i, operations, queue)
+        )
+        for i in range(processes)
+    ]
+    started = time.perf_counter()
+    for process in workers:
+        process.start()
+    results = [queue.get() for _ in workers]
+    for process in workers:
+        process.join()
+    wall = time.perf_counter() - started
+    print(f"Процессов: {processes}, операций на процесс: {operations}")
+    print(f"Время: {wall:.2f} с, {processes * operations / wall:.0f} оп/с")
+    return results, verify(database.db_path, results)
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    with temp_home("qtlauncher_stress_") as home:
+        results, problems = run(home, processes, operations)
+
+    total_retries = sum(r[2] for r in results)
+    total_errors = sum(r[3] for r in results)
+    print(f"Повторов из-за занятой базы: {total_retries}")
+    print(f"Ошибок: {total_errors}")
+    for index, elapsed, retries, errors, games in sorted(results):
+        print(
+            f"  #{index}: {elapsed:.2f} с, игр {len(games)}, "
+            f"повторов {retries}, ошибок {errors}"
+        )
+    for problem in problems:
+        print(f"Расхождение: {problem}")
+    sys.exit(1 if total_errors or problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,526 @@
+"""Общий замер слоя данных и главного окна без экрана.
+
+Запуск::
+
+    python benchmarks/suite.py [--users 3] [--games 5000] [--categories 20]
+                               [--output results.json]
+                               [--baseline benchmarks/baseline.json]
+                               [--save-baseline] [--threshold 0.25]
+
+В временной папке создаётся синтетическая ``games.db``: ``--users``
+пользователей, у каждого ``--categories`` категорий и ``--games`` игр с
+историей запусков. Затем замеряются все публичные методы ``Database``,
+вызовы ``DataManager`` и пути обновления главного окна
+(``update_game_list``, ``filter_games_by_category``, ``sort_games``,
+``reload_user_data``). Методы ``Database`` без замера перечисляются в
+конце, чтобы новый метод не остался незамеченным.
+
+Результаты (медиана и минимум на вызов, мкс) пишутся в JSON. Если есть
+базовый файл, каждый замер сравнивается с ним: замедление больше чем на
+``--threshold`` (доля) и больше чем на ``--min-delta-us`` считается
+регрессией, и скрипт завершается с кодом 1. ``--save-baseline``
+сохраняет текущие результаты как базовые. Базовый файл зависит от
+машины, поэтому сравнивать имеет смысл замеры на одном компьютере.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import use_temp_home  # noqa: E402
+
+use_temp_home()
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+import db  # noqa: E402
+from db import database  # noqa: E402
+from utils import data_manager  # noqa: E402
+
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baseline.json"
+# Один прогон длится не меньше этого, чтобы быстрые методы не тонули
+# в погрешности таймера
+RUN_SECONDS = 0.02
+MAX_CALLS_PER_RUN = 2000
+# Служебные методы: замерять в них нечего
+NOT_MEASURED = {"get_connection", "transaction", "close"}
+
+SYLLABLES = [
+    "wit", "cher", "cy", "ber", "dark", "soul", "el", "den", "ring", "do",
+    "ме", "тро", "ста", "лкер", "ве", "дьмак", "тан", "ки", "гон", "ка",
+]
+
+
+class Case(NamedTuple):
+    group: str
+    name: str
+    run: Callable[[], object]
+    # Методы Database, которые покрывает замер
+    covers: tuple[str, ...] = ()
+    # Вызывается перед каждым вызовом run, вне замера
+    setup: Callable[[], object] | None = None
+
+
+def make_name(rng: random.Random, index: int) -> str:
+    words = [
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+        for _ in range(rng.randint(1, 3))
+    ]
+    return " ".join(words).capitalize() + f" {index}"
+
+
+def generate(users: int, games: int, categories: int, seed: int = 42):
+    """Заполняет базу; текущим остаётся первый пользователь."""
+    rng = random.Random(seed)
+    for user in reversed(range(users)):
+        login = f"user{user}"
+        database.users.register_user(login, "password")
+        database.users.login_user(login, "password")
+        names = [f"Категория {i}" for i in range(categories)]
+        for name in names:
+            database.insert_category(name)
+        database.insert_games_bulk(
+            (
+                make_name(rng, i),
+                f"/games/{login}/{i}.exe",
+                rng.choice(names + ["Все"]),
+            )
+            for i in range(games)
+        )
+    with database.transaction() as conn:
+        conn.executemany(
+            """UPDATE Games SET last_played = ?, play_count = ?,
+            install_size = ? WHERE id = ?""",
+            [
+                (
+                    rng.choice([None, rng.randint(0, 10**9)]),
+                    rng.randint(0, 100),
+                    rng.randint(0, 10**10),
+                    game_id,
+                )
+                for (game_id,) in conn.execute("SELECT id FROM Games")
+            ],
+        )
+    database.invalidate_cache()
+
+
+def method_case(name: str, *args) -> Case:
+    method = getattr(database, name)
+    return Case("db", name, lambda: method(*args), (name,))
+
+
+def database_cases(rng: random.Random) -> list[Case]:
+    games = database.get_all_games()
+    game = rng.choice(games)
+    category_id = database.get_category_id_by_name("Категория 0")
+    counter = iter(range(10**9))
+
+    def insert_and_delete():
+        index = next(counter)
+        database.insert_game(
+            f"Бенчмарк {index}", f"/bench/{index}.exe", category_id
+        )
+        database.delete_game(f"Бенчмарк {index}")
+
+    def insert_bulk_and_delete():
+        index = next(counter)
+        rows, _ = database.insert_games_bulk(
+            (f"Пачка {index}-{i}", f"/bulk/{index}/{i}.exe", None)
+            for i in range(100)
+        )
+        database.delete_games([row[0] for row in rows])
+
+    def category_roundtrip():
+        index = next(counter)
+        new_id = database.insert_category(f"Новая {index}")
+        # Игры «Категории 0» уходят в новую и возвращаются при удалении
+        moved = [
+            game[0]
+            for game in database.get_all_games()
+            if game[3] == category_id
+        ]
+        database.move_games(moved, new_id)
+        database.delete_category(f"Новая {index}", "Категория 0")
+
+    def bulk_insert_and_delete_games():
+        index = next(counter)
+        rows, _ = database.insert_games_bulk(
+            (f"Пачка {index}-{i}", f"/bulk/{index}/{i}.exe", None)
+            for i in range(1000)
+        )
+        database.delete_games([row[0] for row in rows])
+
+    batch = [row[0] for row in games[:100]]
+    other_id = database.get_category_id_by_name("Категория 1")
+
+    def move_batch():
+        database.move_games(batch, other_id)
+        database.move_games(batch, category_id)
+
+    def rename_batch():
+        database.rename_games(batch, "$", " (пачка)")
+        database.rename_games(batch, r" \(пачка\)$", "")
+
+    renamed = [game[1], game[1] + " (изм.)"]
+
+    def rename():
+        database.update_game(renamed[0], renamed[1], game[3])
+        renamed.reverse()
+
+    missing = [True]
+
+    def toggle_missing():
+        database.set_games_missing([game[2]], missing[0])
+        missing[0] = not missing[0]
+
+    def play_session():
+        session_id = database.start_play_session(game[0])
+        database.finish_play_session(session_id)
+
+    backends = ["native", None]
+
+    def set_backend():
+        database.set_game_backend(game[0], backends[0])
+        backends.reverse()
+
+    def thumbnails():
+        index = next(counter)
+        database.set_thumbnail(f"key{index}", "digest")
+        database.get_thumbnail(f"key{index}")
+        database.forget_thumbnails(["digest"])
+
+    scan_state = {f"/games/{i}": ("/games", 0, i, 1, 1) for i in range(100)}
+
+    def scan_roundtrip():
+        database.save_scan_state(scan_state, ())
+        database.load_scan_state()
+
+    cases = [
+        method_case("create_tables"),
+        Case(
+            "db",
+            "get_all_games (холодный кэш)",
+            database.get_all_games,
+            ("get_all_games", "invalidate_cache"),
+            setup=database.invalidate_cache,
+        ),
+        method_case("get_all_games"),
+        method_case("get_game", game[1]),
+        Case(
+            "db",
+            "get_game_by_id",
+            lambda: database.get_game_by_id(game[0]),
+            ("get_game_by_id",),
+        ),
+        method_case("get_category_counts"),
+        Case(
+            "db",
+            "get_category_id_by_name",
+            lambda: database.get_category_id_by_name("Категория 0"),
+            ("get_category_id_by_name",),
+        ),
+        Case(
+            "db",
+            "check_unique",
+            lambda: database.check_unique("Games", "name", "Нет такой"),
+            ("check_unique",),
+        ),
+        Case(
+            "db",
+            "check_category_id_is_valid",
+            database.check_category_id_is_valid,
+            ("check_category_id_is_valid",),
+        ),
+        Case(
+            "db",
+            "search_games",
+            lambda: database.search_games(game[1].split()[0][:3]),
+            ("search_games",),
+        ),
+        Case(
+            "db",
+            "fuzzy_search_games",
+            lambda: database.fuzzy_search_games(game[1][:-1] + "x"),
+            ("fuzzy_search_games",),
+        ),
+        method_case("get_last_games"),
+        method_case("cache_stats"),
+        Case(
+            "db",
+            "insert_game + delete_game",
+            insert_and_delete,
+            ("insert_game", "delete_game"),
+        ),
+        Case(
+            "db",
+            "insert_games_bulk (100) + delete_games",
+            insert_bulk_and_delete,
+            ("insert_games_bulk", "delete_games"),
+        ),
+        Case(
+            "db",
+            "insert/move_games/delete_category",
+            category_roundtrip,
+            ("insert_category", "move_games", "delete_category"),
+        ),
+        Case(
+            "db",
+            "insert_games_bulk (1000) + delete_games",
+            bulk_insert_and_delete_games,
+            ("delete_games",),
+        ),
+        Case("db", "move_games (100 × 2)", move_batch, ("move_games",)),
+        Case(
+            "db", "rename_games (100 × 2)", rename_batch, ("rename_games",)
+        ),
+        Case("db", "update_game", rename, ("update_game",)),
+        Case(
+            "db", "set_games_missing", toggle_missing, ("set_games_missing",)
+        ),
+        Case(
+            "db",
+            "start/finish_play_session",
+            play_session,
+            ("start_play_session", "finish_play_session"),
+        ),
+        Case("db", "set_game_backend", set_backend, ("set_game_backend",)),
+        Case(
+            "db",
+            "set/get/forget_thumbnail",
+            thumbnails,
+            ("set_thumbnail", "get_thumbnail", "forget_thumbnails"),
+        ),
+        Case(
+            "db",
+            "save/load_scan_state",
+            scan_roundtrip,
+            ("save_scan_state", "load_scan_state"),
+        ),
+    ]
+    for mode in db.SORT_MODES:
+        cases.append(
+            Case(
+                "db",
+                f"get_game_order ({mode})",
+                lambda mode=mode: database.get_game_order(mode),
+                ("get_game_order",),
+            )
+        )
+    return cases
+
+
+def data_manager_cases() -> list[Case]:
+    themes = ["light", "dark"]
+
+    def set_theme():
+        data_manager.set_theme(themes[0])
+        themes.reverse()
+
+    return [
+        Case("settings", "get_theme", data_manager.get_theme),
+        Case("settings", "set_theme", set_theme),
+        Case("settings", "get_sort_mode", data_manager.get_sort_mode),
+        Case(
+            "settings",
+            "set_sort_mode",
+            lambda: data_manager.set_sort_mode("name", False),
+        ),
+        Case("settings", "get_library_roots", data_manager.get_library_roots),
+        Case(
+            "settings",
+            "flush",
+            data_manager.flush,
+            setup=lambda: data_manager.set_theme(themes[0]),
+        ),
+    ]
+
+
+def window_cases(app, window) -> list[Case]:
+    def refresh(action):
+        def run():
+            action()
+            app.processEvents()
+
+        return run
+
+    return [
+        Case("window", "update_game_list", refresh(window.update_game_list)),
+        Case(
+            "window",
+            "filter_games_by_category (категория)",
+            refresh(lambda: window.filter_games_by_category("Категория 0")),
+            setup=lambda: window.filter_games_by_category("Все"),
+        ),
+        Case(
+            "window",
+            "filter_games_by_category (Все)",
+            refresh(lambda: window.filter_games_by_category("Все")),
+            setup=lambda: window.filter_games_by_category("Категория 0"),
+        ),
+        Case(
+            "window",
+            "sort_games (смена режима)",
+            refresh(lambda: window.sort_games(mode="play_count")),
+            setup=lambda: window.sort_games(mode="name"),
+        ),
+        Case(
+            "window",
+            "sort_games (разворот)",
+            refresh(
+                lambda: window.sort_games(reverse=not window.sort_reverse)
+            ),
+        ),
+        Case("window", "reload_user_data", refresh(window.reload_user_data)),
+    ]
+
+
+def time_case(case: Case, repeat: int) -> dict:
+    if case.setup is not None:
+        case.setup()
+    started = time.perf_counter()
+    case.run()
+    estimate = time.perf_counter() - started
+    # С подготовкой каждый вызов замеряется отдельно
+    if case.setup is not None:
+        calls = 1
+    else:
+        calls = int(RUN_SECONDS / max(estimate, 1e-7))
+        calls = max(1, min(MAX_CALLS_PER_RUN, calls))
+    timings = []
+    for _ in range(repeat):
+        if case.setup is not None:
+            case.setup()
+        started = time.perf_counter()
+        for _ in range(calls):
+            case.run()
+        timings.append((time.perf_counter() - started) / calls * 1_000_000)
+    return {
+        "median_us": round(statistics.median(timings), 2),
+        "min_us": round(min(timings), 2),
+        "calls": calls,
+    }
+
+
+def save_report(path: Path, report: dict):
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float):
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        delta = result["median_us"] - base["median_us"]
+        if delta > min_delta and result["median_us"] > base["median_us"] * (
+            1 + threshold
+        ):
+            regressions.append((key, base["median_us"], result["median_us"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-delta-us", type=float, default=20.0)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    started = time.perf_counter()
+    generate(args.users, args.games, args.categories)
+    print(
+        f"База: {args.users} польз. × {args.games} игр, "
+        f"{args.categories} категорий — {time.perf_counter() - started:.1f} с"
+    )
+
+    import main as launcher_main
+
+    window = launcher_main.QtLauncher()
+    window.show()
+    while not window.game_model.rowCount():
+        app.processEvents()
+
+    rng = random.Random(7)
+    cases = (
+        database_cases(rng)
+        + data_manager_cases()
+        + window_cases(app, window)
+    )
+    results = {}
+    for case in cases:
+        key = f"{case.group}/{case.name}"
+        results[key] = time_case(case, args.repeat)
+        print(
+            f"{key:<50} {results[key]['median_us']:>12.1f} мкс"
+            f"  (мин {results[key]['min_us']:.1f})"
+        )
+
+    covered = {name for case in cases for name in case.covers}
+    public = {
+        name
+        for name in vars(db.Database)
+        if not name.startswith("_") and callable(getattr(db.Database, name))
+    }
+    uncovered = sorted(public - covered - NOT_MEASURED)
+    if uncovered:
+        print("Методы Database без замера:", ", ".join(uncovered))
+
+    report = {
+        "meta": {
+            "users": args.users,
+            "games": args.games,
+            "categories": args.categories,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        save_report(args.output, report)
+
+    failed = False
+    if args.save_baseline:
+        save_report(args.baseline, report)
+        print(f"Базовые результаты сохранены в {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["meta"]["games"] != args.games:
+            print("Базовые результаты сняты на другом размере базы")
+        regressions = compare(
+            results, baseline["results"], args.threshold, args.min_delta_us
+        )
+        for key, before, after in regressions:
+            print(f"РЕГРЕССИЯ {key}: {before:.1f} -> {after:.1f} мкс")
+        if not regressions:
+            print(f"Регрессий относительно {args.baseline} нет")
+        failed = bool(regressions)
+
+    window.close()
+    database.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,188 +1,591 @@
 import hashlib
+import json
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
 
-from utils import get_data_path
+import migrations
+from fuzzy import TrigramIndex, collation_key
+from sqltrace import TracedConnection, query_tracer
+from utils import NO_SESSION, Lazy, Session, data_manager, get_data_path
+
+
+def for_current_user(empty=lambda: None):
+    """Передаёт методу ``Database`` id текущего пользователя.
+
+    id берётся один раз на вызов. Без входа метод не вызывается и к базе
+    не обращается: возвращается ``empty()``.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            user_id = self.users.get_current_user_id()
+            if user_id is None:
+                return empty()
+            return method(self, user_id, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
 
 
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 
-class UserManager:
-    def __init__(self, db_path):
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": 5000,
+    "synchronous": "NORMAL",
+    "cache_size": -16000,
+    "mmap_size": 64 * 1024 * 1024,
+}
+
+SEARCH_RANK_WINDOW = 1000
+FTS_BULK_THRESHOLD = 500
+
+# Режим сортировки -> столбцы ORDER BY и их направление. Порядок совпадает
+# с индексами migrations.SORT_INDEXES, поэтому сортировка (и обратная
+# ей) читается из индекса без временного B-дерева.
+SORT_MODES = {
+    "name": (("sort_name", False),),
+    "last_played": (("last_played", True), ("sort_name", False)),
+    "play_count": (("play_count", True), ("sort_name", False)),
+    "added_at": (("added_at", True), ("sort_name", False)),
+    "install_size": (("install_size", True), ("sort_name", False)),
+}
+
+INSERT_GAME_SQL = """INSERT INTO Games
+    (name, path, category_id, user_id, sort_name, added_at, install_size)
+    VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL")
+
+
+def build_pragmas(profile: dict | None) -> list[str]:
+    """Превращает профиль из settings.json в список PRAGMA-инструкций.
+
+    Неизвестные ключи и некорректные значения заменяются значениями
+    по умолчанию, чтобы опечатка в настройках не ломала запуск.
+    """
+    settings = dict(DEFAULT_PRAGMAS)
+    settings.update(profile or {})
+
+    journal_mode = str(settings["journal_mode"]).upper()
+    if journal_mode not in JOURNAL_MODES:
+        journal_mode = DEFAULT_PRAGMAS["journal_mode"]
+    synchronous = str(settings["synchronous"]).upper()
+    if synchronous not in SYNCHRONOUS_MODES:
+        synchronous = DEFAULT_PRAGMAS["synchronous"]
+
+    pragmas = [
+        f"PRAGMA journal_mode = {journal_mode}",
+        f"PRAGMA synchronous = {synchronous}",
+        # Не настраивается: на внешних ключах держится целостность категорий
+        "PRAGMA foreign_keys = ON",
+    ]
+    for key in ("busy_timeout", "cache_size", "mmap_size"):
+        try:
+            value = int(settings[key])
+        except (TypeError, ValueError):
+            value = DEFAULT_PRAGMAS[key]
+        pragmas.append(f"PRAGMA {key} = {value}")
+    return pragmas
+
+
+def game_values(name, path, category_id, user_id) -> tuple:
+    """Параметры для ``INSERT_GAME_SQL`` вместе с ключами сортировки."""
+    return (
+        name,
+        path,
+        category_id,
+        user_id,
+        collation_key(name),
+        int(time.time()),
+        migrations.file_size(path),
+    )
+
+
+def is_busy_error(error: Exception) -> bool:
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class ThreadConnection:
+    def __init__(self):
+        self.conn = None
+        self.depth = 0
+
+
+class ConnectionManager:
+    """Долгоживущее соединение с БД на каждый поток.
+
+    Соединения открываются один раз и переиспользуются всеми методами
+    ``Database`` и ``UserManager``. Записи выполняются внутри
+    ``transaction()``, вложенные области превращаются в SAVEPOINT.
+
+    Если базу держит другой экземпляр лаунчера дольше ``busy_timeout``,
+    захват блокировки на запись повторяется ``busy_retries`` раз
+    с экспоненциальной задержкой.
+
+    Если включён учёт запросов, соединения открываются с трассировкой
+    ``sqltrace.query_tracer``.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        cached_statements: int = 256,
+        pragmas: list[str] | None = None,
+        busy_retries: int = 5,
+        busy_retry_delay: float = 0.05,
+    ):
         self.db_path = db_path
-        self._current_user_id = None
-        self._current_user_login = None
-        self._load_session()
+        self.cached_statements = cached_statements
+        self.pragmas = pragmas if pragmas is not None else build_pragmas(None)
+        self.busy_retries = busy_retries
+        self.busy_retry_delay = busy_retry_delay
+        self.connects = 0
+        self.busy_retries_done = 0
+        # Состояние по id потока, а не threading.local: потоки пулов Qt
+        # теряют threading.local между обращениями к Python. Поток, который
+        # может завершиться (задачи пулов, сканирование), в конце работы
+        # вызывает close_thread(): иначе соединение висело бы до выхода,
+        # а id потока мог бы достаться другому потоку.
+        self._threads: dict[int, ThreadConnection] = {}
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+
+    def _state(self) -> ThreadConnection:
+        state = self._threads.get(threading.get_ident())
+        if state is None:
+            state = ThreadConnection()
+            with self._lock:
+                self._threads[threading.get_ident()] = state
+        return state
+
+    def get(self) -> sqlite3.Connection:
+        local = self._state()
+        conn = local.conn
+        if conn is None:
+            traced = query_tracer.enabled
+            conn = sqlite3.connect(
+                self.db_path,
+                isolation_level=None,
+                cached_statements=self.cached_statements,
+                check_same_thread=False,
+                factory=TracedConnection if traced else sqlite3.Connection,
+            )
+            if traced:
+                conn.set_trace_callback(query_tracer.statement)
+                query_tracer.connection_opened()
+            for pragma in self.pragmas:
+                self._execute_with_retry(conn, pragma)
+            local.conn = conn
+            local.depth = 0
+            with self._lock:
+                self._connections.append(conn)
+                self.connects += 1
+        return conn
+
+    def _execute_with_retry(self, conn: sqlite3.Connection, sql: str):
+        delay = self.busy_retry_delay
+        for attempt in range(self.busy_retries + 1):
+            try:
+                return conn.execute(sql)
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == self.busy_retries:
+                    raise
+                with self._lock:
+                    self.busy_retries_done += 1
+                time.sleep(delay)
+                delay *= 2
+
+    @contextmanager
+    def transaction(self):
+        conn = self.get()
+        local = self._state()
+        depth = local.depth
+        savepoint = f"sp_{depth}"
+        if depth == 0:
+            # IMMEDIATE берёт блокировку на запись сразу, поэтому занятая
+            # база обнаруживается здесь, а не посреди транзакции
+            self._execute_with_retry(conn, "BEGIN IMMEDIATE")
+        else:
+            conn.execute(f"SAVEPOINT {savepoint}")
+        local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            local.depth = depth
+            if depth == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        local.depth = depth
+        if depth == 0:
+            try:
+                self._execute_with_retry(conn, "COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        else:
+            conn.execute(f"RELEASE {savepoint}")
+
+    def close_thread(self):
+        with self._lock:
+            local = self._threads.pop(threading.get_ident(), None)
+        conn = None if local is None else local.conn
+        if conn is None:
+            return
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._threads = {}
+        for conn in connections:
+            conn.close()
+
+
+class UserManager:
+    """Вход, регистрация и текущий пользователь.
+
+    Сессия читается из ``SessionManager`` один раз при создании; методы
+    ``Database`` получают id пользователя из памяти, не обращаясь к
+    session.json.
+    """
+
+    def __init__(self, connections: ConnectionManager):
+        self.connections = connections
+        self._session = data_manager.session.current()
 
     def register_user(self, login: str, password: str) -> bool:
 
         if self.user_exists(login):
             return False
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         try:
-            hashed_password = hash_password(password)
-            cursor.execute(
-                "INSERT INTO Users (login, password) VALUES (?, ?)",
-                (login, hashed_password),
-            )
-            user_id = cursor.lastrowid
-
-            cursor.execute(
-                "INSERT INTO Categories (name, user_id) VALUES (?, ?)",
-                ("Все", user_id),
-            )
+            with self.connections.transaction() as conn:
+                hashed_password = hash_password(password)
+                cursor = conn.execute(
+                    "INSERT INTO Users (login, password) VALUES (?, ?)",
+                    (login, hashed_password),
+                )
+                user_id = cursor.lastrowid
 
-            conn.commit()
+                conn.execute(
+                    "INSERT INTO Categories (name, user_id) VALUES (?, ?)",
+                    ("Все", user_id),
+                )
             return True
         except Exception as e:
             print(f"Ошибка при регистрации пользователя: {e}")
             return False
-        finally:
-            conn.close()
 
     def login_user(self, login: str, password: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        try:
-            hashed_password = hash_password(password)
-            cursor.execute(
+        hashed_password = hash_password(password)
+        user = (
+            self.connections.get()
+            .execute(
                 "SELECT id, login FROM Users WHERE login = ? AND password = ?",
                 (login, hashed_password),
             )
-            user = cursor.fetchone()
-            if user:
-                self._current_user_id = user[0]
-                self._current_user_login = user[1]
-                self._save_session()
-                from utils import data_manager
-
-                data_manager.update_current_user(self._current_user_id)
-                return True
-            return False
-        finally:
-            conn.close()
+            .fetchone()
+        )
+        if user:
+            data_manager.session.save_session(user[0], user[1])
+            self._session = data_manager.session.current()
+            return True
+        return False
 
     def user_exists(self, login: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "SELECT COUNT(*) FROM Users WHERE login = ?", (login,)
-            )
-            count = cursor.fetchone()[0]
-            return count > 0
-        finally:
-            conn.close()
+        count = (
+            self.connections.get()
+            .execute("SELECT COUNT(*) FROM Users WHERE login = ?", (login,))
+            .fetchone()[0]
+        )
+        return count > 0
+
+    @property
+    def session(self) -> Session:
+        return self._session
 
     def get_current_user_id(self) -> int | None:
-        if not self._current_user_id:
-            self._load_session()
-        return self._current_user_id
+        return self._session.user_id
 
     def get_current_user_login(self) -> str | None:
-        if not self._current_user_login:
-            self._load_session()
-        return self._current_user_login
+        return self._session.login
 
     def is_authenticated(self) -> bool:
-        return bool(self.get_current_user_id())
+        return self._session is not NO_SESSION
 
     def logout(self):
-        self._current_user_id = None
-        self._current_user_login = None
-        self._delete_session()
-        from utils import data_manager
+        data_manager.session.clear_session()
+        self._session = NO_SESSION
 
-        data_manager.update_current_user(None)
 
-    def _save_session(self):
-        from utils import data_manager
+class GameCatalog:
+    """Кэш игр одного пользователя: строки таблицы Games в памяти.
 
-        if (
-            self._current_user_id is not None
-            and self._current_user_login is not None
-        ):
-            data_manager.session.save_session(
-                self._current_user_id, self._current_user_login
-            )
-        else:
-            data_manager.session.clear_session()
+    Строки хранятся в том же виде, что возвращает ``SELECT * FROM Games``,
+    и проиндексированы по id, названию, пути и категории.
+    """
 
-    def _load_session(self):
-        from utils import data_manager
+    def __init__(self, rows):
+        self.by_id = {}
+        self.by_name = {}
+        self.by_path = {}
+        self.by_category = {}
+        # Нечёткий индекс строится в потоке поиска (Database.fuzzy_index)
+        # и, пока подключён к каталогу, обновляется вместе с ним
+        self.fuzzy: TrigramIndex | None = None
+        for row in rows:
+            self.add(row)
 
-        self._current_user_id, self._current_user_login = (
-            data_manager.session.load_session()
-        )
+    def add(self, row):
+        self.by_id[row[0]] = row
+        self._index(row)
+        if self.fuzzy is not None:
+            self.fuzzy.add(row[0], row[1])
 
-    def _delete_session(self):
-        from utils import data_manager
+    def replace(self, row):
+        old = self.by_id.get(row[0])
+        if old is not None:
+            self._unindex(old)
+        # Присваивание по существующему ключу сохраняет порядок игр
+        self.by_id[row[0]] = row
+        self._index(row)
+        if self.fuzzy is not None and (old is None or old[1] != row[1]):
+            self.fuzzy.rename(row[0], row[1])
 
-        data_manager.session.clear_session()
+    def remove(self, game_id):
+        row = self.by_id.pop(game_id, None)
+        if row is not None:
+            self._unindex(row)
+            if self.fuzzy is not None:
+                self.fuzzy.remove(game_id)
+        return row
+
+    def _index(self, row):
+        self.by_name[row[1]] = row
+        self.by_path[row[2]] = row
+        self.by_category.setdefault(row[3], {})[row[0]] = row
+
+    def _unindex(self, row):
+        self.by_name.pop(row[1], None)
+        self.by_path.pop(row[2], None)
+        category = self.by_category.get(row[3])
+        if category is not None:
+            category.pop(row[0], None)
+            if not category:
+                del self.by_category[row[3]]
 
 
 class Database:
     def __init__(self):
         self.data_path = get_data_path()
         self.db_path = self.data_path / "games.db"
-        self.users = UserManager(self.db_path)
+        profile = self._load_pragma_profile()
+        query_tracer.configure(profile)
+        self.connections = ConnectionManager(
+            self.db_path, pragmas=build_pragmas(profile)
+        )
+        self.users = UserManager(self.connections)
         self.create_tables()
 
+        # Кэш каталога живёт в потоке, создавшем Database (поток GUI).
+        # Остальные потоки читают напрямую из SQLite.
+        self._catalogs: dict[int | None, GameCatalog] = {}
+        self._data_version = None
+        self._games_version = None
+        # Нечёткие индексы по пользователям: (версия Games, индекс).
+        # Строятся и читаются потоками поиска, поэтому живут вне каталога.
+        self._fuzzy_indexes: dict[int, tuple[int, TrigramIndex]] = {}
+        self._fuzzy_lock = threading.Lock()
+        self._owner_thread = threading.get_ident()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @staticmethod
+    def _load_pragma_profile() -> dict:
+        profile = data_manager.settings.get_setting("database")
+        if not isinstance(profile, dict):
+            # Записываем профиль по умолчанию, чтобы его было видно и можно
+            # было настроить в settings.json
+            profile = dict(DEFAULT_PRAGMAS)
+            data_manager.update_setting("database", profile)
+        return profile
+
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        return self.connections.get()
 
-    def create_tables(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """CREATE TABLE IF NOT EXISTS Categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            user_id INTEGER NOT NULL,
-            UNIQUE(name, user_id),
-            FOREIGN KEY (user_id) REFERENCES Users (id)
-            )"""
+    @contextmanager
+    def transaction(self):
+        # Свои изменения Games поток GUI сам переносит в каталог. Версию
+        # Games после них можно запомнить только внутри транзакции: пока
+        # она открыта, другие соединения в базу не пишут. Если до начала
+        # транзакции версия уже разошлась с каталогом, его сбросит _catalog.
+        track = (
+            threading.get_ident() == self._owner_thread
+            and not self.get_connection().in_transaction
         )
+        with self.connections.transaction() as conn:
+            before = migrations.games_version(conn) if track else None
+            yield conn
+            if track and before == self._games_version:
+                self._games_version = migrations.games_version(conn)
+                self._advance_fuzzy_indexes(before, self._games_version)
 
-        cursor.execute(
-            """CREATE TABLE IF NOT EXISTS Games (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            path TEXT NOT NULL UNIQUE,
-            category_id INTEGER NOT NULL,
-            user_id INTEGER NOT NULL,
-            FOREIGN KEY (category_id) REFERENCES Categories(id),
-            FOREIGN KEY (user_id) REFERENCES Users(id)
-            )"""
+    def close(self):
+        self.connections.close_all()
+
+    def create_tables(self):
+        migrations.migrate(self.get_connection(), self.data_path)
+        self._has_fts = migrations.has_table(
+            self.get_connection(), "GamesFts"
         )
 
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            login TEXT NOT NULL UNIQUE,
-            password TEXT NOT NULL
-            )"""
+    def _catalog(self, user_id) -> GameCatalog | None:
+        if threading.get_ident() != self._owner_thread:
+            return None
+
+        # data_version меняется, когда базу изменило другое соединение:
+        # другой поток или другой экземпляр лаунчера. Каталог сбрасывается,
+        # только если при этом изменилась таблица Games.
+        conn = self.get_connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            games_version = migrations.games_version(conn)
+            if games_version != self._games_version:
+                self._catalogs.clear()
+                self._games_version = games_version
+
+        catalog = self._catalogs.get(user_id)
+        if catalog is None:
+            self.cache_misses += 1
+            rows = (
+                self.get_connection()
+                .execute(
+                    "SELECT * FROM Games WHERE user_id = ? ORDER BY id",
+                    (user_id,),
+                )
+                .fetchall()
+            )
+            catalog = self._catalogs[user_id] = GameCatalog(rows)
+        else:
+            self.cache_hits += 1
+        if catalog.fuzzy is None:
+            with self._fuzzy_lock:
+                entry = self._fuzzy_indexes.get(user_id)
+            # Индекс той же версии, что и каталог, содержит те же игры
+            if entry is not None and entry[0] == self._games_version:
+                catalog.fuzzy = entry[1]
+        return catalog
+
+    def _loaded_catalog(self, user_id) -> GameCatalog | None:
+        if threading.get_ident() != self._owner_thread:
+            return None
+        return self._catalogs.get(user_id)
+
+    def _refresh_cached_game(self, user_id, game_id):
+        catalog = self._loaded_catalog(user_id)
+        if catalog is None:
+            return
+        row = (
+            self.get_connection()
+            .execute("SELECT * FROM Games WHERE id = ?", (game_id,))
+            .fetchone()
         )
+        if row is None:
+            catalog.remove(game_id)
+        else:
+            catalog.replace(row)
 
-        conn.commit()
-        conn.close()
+    def invalidate_cache(self, user_id=None):
+        with self._fuzzy_lock:
+            if user_id is None:
+                self._fuzzy_indexes.clear()
+            else:
+                self._fuzzy_indexes.pop(user_id, None)
+        if user_id is None:
+            self._catalogs.clear()
+        else:
+            self._catalogs.pop(user_id, None)
+
+    def _advance_fuzzy_indexes(self, before: int, after: int):
+        # Свою запись поток GUI переносит в каталог, а каталог — в
+        # подключённый к нему индекс, поэтому такой индекс остаётся верным
+        with self._fuzzy_lock:
+            for user_id, (version, index) in self._fuzzy_indexes.items():
+                catalog = self._catalogs.get(user_id)
+                if (
+                    version == before
+                    and catalog is not None
+                    and catalog.fuzzy is index
+                ):
+                    self._fuzzy_indexes[user_id] = (after, index)
+
+    def fuzzy_index(self, user_id) -> TrigramIndex:
+        """Нечёткий индекс игр пользователя, актуальный для базы.
+
+        Построение на 50 тысячах игр занимает около секунды, поэтому
+        индекс строится в потоке поиска, а не в потоке GUI.
+        """
+        conn = self.get_connection()
+        # Версия читается до выборки: запись между ними даст лишнюю
+        # перестройку, но не индекс, помеченный новее своих данных
+        version = migrations.games_version(conn)
+        with self._fuzzy_lock:
+            entry = self._fuzzy_indexes.get(user_id)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        index = TrigramIndex()
+        for game_id, name in conn.execute(
+            "SELECT id, name FROM Games WHERE user_id = ?", (user_id,)
+        ):
+            index.add(game_id, name)
+        with self._fuzzy_lock:
+            current = self._fuzzy_indexes.get(user_id)
+            if current is None or current[0] < version:
+                self._fuzzy_indexes[user_id] = (version, index)
+        return index
+
+    def cache_stats(self) -> dict:
+        return {"hits": self.cache_hits, "misses": self.cache_misses}
 
     def check_unique(self, select_from, where_value, parameter):
+        if select_from == "Games" and where_value in ("name", "path"):
+            catalog = self._catalog(self.users.get_current_user_id())
+            if catalog is not None:
+                index = (
+                    catalog.by_name if where_value == "name" else catalog.by_path
+                )
+                return parameter not in index
+
         conn = self.get_connection()
-        cursor = conn.cursor()
         if select_from in ["Games", "Categories"]:
             user_id = self.users.get_current_user_id()
-            cursor.execute(
+            cursor = conn.execute(
                 f"SELECT COUNT(*) FROM {select_from} WHERE {where_value} = ? AND user_id = ?",
                 (parameter, user_id),
             )
         else:
-            cursor.execute(
+            cursor = conn.execute(
                 f"SELECT COUNT(*) FROM {select_from} WHERE {where_value} = ?",
                 (parameter,),
             )
@@ -190,196 +593,688 @@ class Database:
         return count == 0
 
     def insert_game(self, name, game_path, category_id):
-        conn = self.get_connection()
-        cursor = conn.cursor()
         try:
             user_id = self.users.get_current_user_id()
-            cursor.execute(
-                "INSERT INTO Games (name, path, category_id, user_id) VALUES (?, ?, ?, ?)",
-                (name, game_path, category_id, user_id),
-            )
-            conn.commit()
+            with self.transaction() as conn:
+                cursor = conn.execute(
+                    INSERT_GAME_SQL,
+                    game_values(name, game_path, category_id, user_id),
+                )
+            self._refresh_cached_game(user_id, cursor.lastrowid)
         except Exception as e:
             print(f"Ошибка при добавлении игры: {e}")
-        finally:
-            conn.close()
+
+    def _insert_games_rows(self, conn, rows, last_id):
+        if not self._has_fts or len(rows) < FTS_BULK_THRESHOLD:
+            conn.executemany(
+                INSERT_GAME_SQL,
+                rows,
+            )
+            return
+
+        # Триггер FTS на каждую строку в разы медленнее одной вставки
+        # INSERT ... SELECT, поэтому на время большой пачки он снимается.
+        # Всё происходит в одной транзакции, так что другие соединения
+        # не увидят таблицу без триггера.
+        conn.execute("DROP TRIGGER games_fts_insert")
+        conn.executemany(
+            INSERT_GAME_SQL,
+            rows,
+        )
+        conn.execute(
+            """INSERT INTO GamesFts (rowid, name, user_id)
+            SELECT id, name, user_id FROM Games WHERE id > ?""",
+            (last_id,),
+        )
+        conn.execute(migrations.GAMES_FTS_INSERT_TRIGGER)
+
+    def insert_games_bulk(self, games):
+        """Добавляет много игр одной транзакцией.
+
+        ``games`` — итерируемый набор ``(name, path, category_name)``;
+        неизвестная или пустая категория заменяется на «Все».
+        Возвращает ``(добавленные строки, конфликты)``, где конфликт —
+        ``(name, path, причина)``.
+        """
+        user_id = self.users.get_current_user_id()
+        inserted, conflicts = [], []
+        try:
+            with self.transaction() as conn:
+                categories = dict(
+                    conn.execute(
+                        "SELECT name, id FROM Categories WHERE user_id = ?",
+                        (user_id,),
+                    )
+                )
+                default_category = categories["Все"]
+
+                names, paths = set(), set()
+                for name, path in conn.execute(
+                    "SELECT name, path FROM Games WHERE user_id = ?",
+                    (user_id,),
+                ):
+                    names.add(name)
+                    paths.add(path)
+
+                rows = []
+                for name, path, category in games:
+                    name, path = name.strip(), path.strip()
+                    if not name or not path:
+                        conflicts.append((name, path, "Пустое название или путь"))
+                    elif name in names:
+                        conflicts.append(
+                            (name, path, "Игра с таким именем уже существует")
+                        )
+                    elif path in paths:
+                        conflicts.append(
+                            (name, path, "Игра с таким путём уже существует")
+                        )
+                    else:
+                        names.add(name)
+                        paths.add(path)
+                        rows.append(
+                            game_values(
+                                name,
+                                path,
+                                categories.get(category, default_category),
+                                user_id,
+                            )
+                        )
+
+                if rows:
+                    # Пока транзакция держит блокировку на запись, все новые
+                    # id с AUTOINCREMENT больше текущего максимума — наши
+                    last_id = conn.execute(
+                        "SELECT COALESCE(MAX(id), 0) FROM Games"
+                    ).fetchone()[0]
+                    self._insert_games_rows(conn, rows, last_id)
+                    inserted = conn.execute(
+                        "SELECT * FROM Games WHERE id > ? AND user_id = ? ORDER BY id",
+                        (last_id, user_id),
+                    ).fetchall()
+
+            catalog = self._loaded_catalog(user_id)
+            if catalog is not None:
+                for row in inserted:
+                    catalog.add(row)
+        except Exception as e:
+            print(f"Ошибка при импорте игр: {e}")
+            return [], conflicts
+        return inserted, conflicts
 
     def insert_category(self, name):
-        conn = self.get_connection()
-        cursor = conn.cursor()
         try:
             user_id = self.users.get_current_user_id()
+            with self.transaction() as conn:
+                cursor = conn.execute(
+                    "SELECT COUNT(*) FROM Categories WHERE name = ? AND user_id = ?",
+                    (name, user_id),
+                )
+                if cursor.fetchone()[0] > 0:
+                    return False
 
-            cursor.execute(
-                "SELECT COUNT(*) FROM Categories WHERE name = ? AND user_id = ?",
-                (name, user_id),
+                cursor = conn.execute(
+                    "INSERT INTO Categories (name, user_id) VALUES (?, ?)",
+                    (name, user_id),
+                )
+            # id новой категории; он же — признак успеха
+            return cursor.lastrowid
+        except Exception as e:
+            print(f"Ошибка при добавлении категории: {e}")
+            return False
+
+    @for_current_user()
+    def delete_category(self, user_id, name, reassign_to="Все"):
+        """Удаляет категорию, перенося её игры в ``reassign_to``.
+
+        Поиск обеих категорий, перенос игр и удаление идут одной
+        транзакцией с одним COMMIT. Возвращает число перенесённых игр или
+        None, если удалить не удалось.
+        """
+        if name == "Все" or name == reassign_to:
+            return None
+        try:
+            with self.transaction() as conn:
+                ids = dict(
+                    conn.execute(
+                        """SELECT name, id FROM Categories
+                        WHERE user_id = ? AND name IN (?, ?)""",
+                        (user_id, name, reassign_to),
+                    )
+                )
+                if name not in ids or reassign_to not in ids:
+                    return None
+                # Один UPDATE по idx_games_user_category; после него
+                # триггеру categories_reassign_games переносить нечего
+                moved = conn.execute(
+                    """UPDATE Games SET category_id = ?
+                    WHERE user_id = ? AND category_id = ?""",
+                    (ids[reassign_to], user_id, ids[name]),
+                ).rowcount
+                conn.execute(
+                    "DELETE FROM Categories WHERE id = ?", (ids[name],)
+                )
+            if moved:
+                self.invalidate_cache(user_id)
+            return moved
+        except Exception as e:
+            print(f"Ошибка при удалении категории: {e}")
+            return None
+
+    def delete_game(self, name):
+        try:
+            user_id = self.users.get_current_user_id()
+            with self.transaction() as conn:
+                conn.execute(
+                    "DELETE FROM Games WHERE name = ? AND user_id = ?",
+                    (name, user_id),
+                )
+            catalog = self._loaded_catalog(user_id)
+            if catalog is not None and name in catalog.by_name:
+                catalog.remove(catalog.by_name[name][0])
+        except Exception as e:
+            print(f"Ошибка при удалении игры: {e}")
+
+    @for_current_user()
+    def check_category_id_is_valid(self, user_id):
+        """Переносит во «Все» игры с чужой или удалённой категорией.
+
+        Пока триггеры не отметили в Meta нарушение, проверка сводится к
+        одному чтению по первичному ключу.
+        """
+        try:
+            conn = self.get_connection()
+            marker = conn.execute(
+                "SELECT value FROM Meta WHERE key = ?",
+                (migrations.CATEGORY_INTEGRITY_KEY,),
+            ).fetchone()
+            if marker is not None and marker[0] == 1:
+                return
+            with self.transaction() as conn:
+                repaired = migrations.repair_categories(conn)
+            if repaired:
+                self.invalidate_cache()
+        except Exception as e:
+            print(f"Ошибка при проверке категорий: {e}")
+
+    @for_current_user(list)
+    def get_category_counts(self, user_id):
+        """Категории с числом игр: [(id, название, игр), ...].
+
+        Один проход по индексу idx_games_user_category; «Все» идёт первой,
+        остальные — по названию.
+        """
+        return (
+            self.get_connection()
+            .execute(
+                """SELECT c.id, c.name, COUNT(g.id) FROM Categories c
+                LEFT JOIN Games g
+                    ON g.user_id = c.user_id AND g.category_id = c.id
+                WHERE c.user_id = ?
+                GROUP BY c.id
+                ORDER BY CASE c.name WHEN 'Все' THEN 0 ELSE 1 END, c.name""",
+                (user_id,),
             )
-            if cursor.fetchone()[0] > 0:
-                return False
+            .fetchall()
+        )
 
-            cursor.execute(
-                "INSERT INTO Categories (name, user_id) VALUES (?, ?)",
+    @for_current_user()
+    def get_category_id_by_name(self, user_id, name):
+        result = (
+            self.get_connection()
+            .execute(
+                "SELECT id FROM Categories WHERE name = ? AND user_id = ?",
                 (name, user_id),
             )
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"Ошибка при добавлении категории: {e}")
-            return False
-        finally:
-            conn.close()
+            .fetchone()
+        )
+        return result[0] if result else None
 
-    def delete(self, select_from, where_value, parameter):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    @for_current_user(dict)
+    def load_scan_state(self, user_id) -> dict:
+        return {
+            row[0]: row[1:]
+            for row in self.get_connection().execute(
+                """SELECT path, parent, is_dir, inode, size, mtime_ns
+                FROM ScanState WHERE user_id = ?""",
+                (user_id,),
+            )
+        }
+
+    @for_current_user()
+    def save_scan_state(self, user_id, changed: dict, removed):
         try:
-            cursor.execute(
-                f"DELETE FROM {select_from} WHERE {where_value} = ?",
-                (parameter,),
+            with self.transaction() as conn:
+                conn.executemany(
+                    "DELETE FROM ScanState WHERE user_id = ? AND path = ?",
+                    ((user_id, path) for path in removed),
+                )
+                conn.executemany(
+                    """INSERT OR REPLACE INTO ScanState
+                    (user_id, path, parent, is_dir, inode, size, mtime_ns)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        (user_id, path, *entry)
+                        for path, entry in changed.items()
+                    ),
+                )
+        except Exception as e:
+            print(f"Ошибка при сохранении индекса файлов: {e}")
+
+    @for_current_user(set)
+    def get_game_paths(self, user_id) -> set:
+        catalog = self._catalog(user_id)
+        if catalog is not None:
+            return set(catalog.by_path)
+        return {
+            row[0]
+            for row in self.get_connection().execute(
+                "SELECT path FROM Games WHERE user_id = ?", (user_id,)
             )
-            conn.commit()
+        }
+
+    def set_games_missing(self, paths, missing: bool):
+        """Помечает игры с указанными путями как пропавшие или найденные.
+
+        Возвращает строки текущего пользователя, у которых изменился статус.
+        """
+        user_id = self.users.get_current_user_id()
+        changed = []
+        try:
+            with self.transaction() as conn:
+                for path in paths:
+                    cursor = conn.execute(
+                        """UPDATE Games SET missing = ?
+                        WHERE path = ? AND user_id = ? AND missing != ?""",
+                        (int(missing), path, user_id, int(missing)),
+                    )
+                    if not cursor.rowcount:
+                        continue
+                    row = conn.execute(
+                        "SELECT * FROM Games WHERE path = ? AND user_id = ?",
+                        (path, user_id),
+                    ).fetchone()
+                    if row is not None:
+                        changed.append(row)
         except Exception as e:
-            print(f"Ошибка при удалении: {e}")
-        finally:
-            conn.close()
+            print(f"Ошибка при обновлении статуса игр: {e}")
+            return []
+
+        catalog = self._loaded_catalog(user_id)
+        if catalog is not None:
+            for row in changed:
+                catalog.replace(row)
+        return changed
+
+    @for_current_user(list)
+    def search_games(self, user_id, query: str, limit: int = 50):
+        """Ищет игры текущего пользователя по началу слов в названии.
+
+        Каждое слово запроса считается префиксом, более точные (короткие)
+        совпадения идут первыми. Можно вызывать из фоновых потоков.
+        """
+        terms = re.findall(r"\w+", query.casefold())
+        if not terms:
+            return []
 
-    def get_games_by_category(self, category_id):
         conn = self.get_connection()
-        cursor = conn.cursor()
-        user_id = self.users.get_current_user_id()
-        cursor.execute(
-            "SELECT * FROM Games WHERE category_id = ? AND user_id = ?",
-            (category_id, user_id),
+        if self._has_fts:
+            words = " ".join(f'"{term}"*' for term in terms)
+            match = f"user_id : {int(user_id)} AND name : ({words})"
+            # Для коротких префиксов совпадений тысячи, поэтому ранжируются
+            # только первые SEARCH_RANK_WINDOW. bm25 для однострочных
+            # названий почти целиком сводится к длине документа, а считается
+            # в разы дольше, поэтому более короткие названия просто идут
+            # первыми.
+            return conn.execute(
+                """SELECT Games.* FROM (
+                    SELECT rowid FROM GamesFts
+                    WHERE GamesFts MATCH ?
+                    LIMIT ?
+                ) AS found
+                JOIN Games ON Games.id = found.rowid
+                ORDER BY length(Games.name), Games.name
+                LIMIT ?""",
+                (match, SEARCH_RANK_WINDOW, limit),
+            ).fetchall()
+
+        conditions = " AND ".join("name LIKE ?" for _ in terms)
+        return conn.execute(
+            f"""SELECT * FROM Games WHERE user_id = ? AND {conditions}
+            ORDER BY name LIMIT ?""",
+            (user_id, *(f"%{term}%" for term in terms), limit),
+        ).fetchall()
+
+    @for_current_user(list)
+    def fuzzy_search_games(self, user_id, query: str, limit: int = 10):
+        """Ищет игры с опечатками в названии («wichter 3»).
+
+        Вызывается из потока поиска: индекс может строиться долго.
+        """
+        game_ids = self.fuzzy_index(user_id).search(query, limit)
+        if not game_ids:
+            return []
+        return self._select_games(self.get_connection(), user_id, game_ids)
+
+    @for_current_user(list)
+    def get_all_games(self, user_id):
+        catalog = self._catalog(user_id)
+        if catalog is not None:
+            return list(catalog.by_id.values())
+        return (
+            self.get_connection()
+            .execute(
+                "SELECT * FROM Games WHERE user_id = ? ORDER BY id", (user_id,)
+            )
+            .fetchall()
         )
-        games = cursor.fetchall()
-        conn.close()
-        return games
 
-    def edit_games_category(self, category_id_old, category_id_new):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    @for_current_user(list)
+    def get_game_order(self, user_id, mode: str = "name", reverse: bool = False):
+        """id игр текущего пользователя в порядке режима ``mode``.
+
+        Читаются только id из индекса режима, сами строки не загружаются.
+        """
+        keys = SORT_MODES.get(mode, SORT_MODES["name"]) + (("id", False),)
+        order_by = ", ".join(
+            f"{column} {'DESC' if descending != reverse else 'ASC'}"
+            for column, descending in keys
+        )
+        return [
+            row[0]
+            for row in self.get_connection().execute(
+                f"SELECT id FROM Games WHERE user_id = ? ORDER BY {order_by}",
+                (user_id,),
+            )
+        ]
+
+    def start_play_session(self, game_id) -> int | None:
+        """Записывает запуск игры и возвращает id новой сессии."""
         try:
             user_id = self.users.get_current_user_id()
-            cursor.execute(
-                "UPDATE Games SET category_id = ? WHERE category_id = ? AND user_id = ?",
-                (category_id_new, category_id_old, user_id),
-            )
-            conn.commit()
+            started_at = int(time.time())
+            with self.transaction() as conn:
+                cursor = conn.execute(
+                    """INSERT INTO PlaySessions (game_id, user_id, started_at)
+                    VALUES (?, ?, ?)""",
+                    (game_id, user_id, started_at),
+                )
+                conn.execute(
+                    """UPDATE Games SET last_played = ?, play_count = play_count + 1
+                    WHERE id = ? AND user_id = ?""",
+                    (started_at, game_id, user_id),
+                )
+            self._refresh_cached_game(user_id, game_id)
+            return cursor.lastrowid
         except Exception as e:
-            print(f"Ошибка при изменении категории для игры: {str(e)}")
-        finally:
-            conn.close()
+            print(f"Ошибка при сохранении запуска игры: {e}")
+            return None
 
-    def check_category_id_is_valid(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def set_game_backend(self, game_id, backend: str | None):
         try:
             user_id = self.users.get_current_user_id()
-            cursor.execute(
-                "SELECT id FROM Categories WHERE user_id = ?", (user_id,)
-            )
-            valid_category_ids = {row[0] for row in cursor.fetchall()}
+            with self.transaction() as conn:
+                conn.execute(
+                    """UPDATE Games SET launch_backend = ?
+                    WHERE id = ? AND user_id = ?""",
+                    (backend, game_id, user_id),
+                )
+            self._refresh_cached_game(user_id, game_id)
+        except Exception as e:
+            print(f"Ошибка при сохранении способа запуска: {e}")
 
-            if not valid_category_ids:
-                return
+    def finish_play_session(self, session_id):
+        try:
+            with self.transaction() as conn:
+                conn.execute(
+                    "UPDATE PlaySessions SET ended_at = ? WHERE id = ?",
+                    (int(time.time()), session_id),
+                )
+        except Exception as e:
+            print(f"Ошибка при сохранении завершения игры: {e}")
 
-            cursor.execute(
-                "SELECT id, name, category_id FROM Games WHERE category_id NOT IN ({}) AND user_id = ?".format(
-                    ",".join("?" for _ in valid_category_ids)
-                ),
-                list(valid_category_ids) + [user_id],
+    def get_thumbnail(self, source_key: str) -> str | None:
+        row = (
+            self.get_connection()
+            .execute(
+                "SELECT digest FROM ThumbnailIndex WHERE source_key = ?",
+                (source_key,),
             )
+            .fetchone()
+        )
+        return None if row is None else row[0]
 
-            invalid_games = cursor.fetchall()
-
-            for game_id, game_name, old_category_id in invalid_games:
-                cursor.execute(
-                    "UPDATE Games SET category_id = ? WHERE id = ? AND user_id = ?",
-                    (1, game_id, user_id),
+    def set_thumbnail(self, source_key: str, digest: str):
+        try:
+            with self.transaction() as conn:
+                conn.execute(
+                    """INSERT OR REPLACE INTO ThumbnailIndex (source_key, digest)
+                    VALUES (?, ?)""",
+                    (source_key, digest),
                 )
+        except Exception as e:
+            print(f"Ошибка при сохранении миниатюры: {e}")
 
-            conn.commit()
+    def forget_thumbnails(self, digests):
+        try:
+            with self.transaction() as conn:
+                conn.executemany(
+                    "DELETE FROM ThumbnailIndex WHERE digest = ?",
+                    ((digest,) for digest in digests),
+                )
         except Exception as e:
-            print(f"Ошибка при проверке категорий: {e}")
-        finally:
-            conn.close()
+            print(f"Ошибка при удалении миниатюр: {e}")
 
-    def get_categories(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        user_id = self.users.get_current_user_id()
-        cursor.execute(
-            """SELECT name FROM Categories 
-            WHERE user_id = ?
-            ORDER BY CASE name WHEN 'Все' THEN 0 ELSE 1 END, name""",
-            (user_id,),
+    @for_current_user(list)
+    def get_last_games(self, user_id, limit: int = 5) -> list[str]:
+        """Названия последних запущенных игр, без повторов."""
+        return [
+            row[0]
+            for row in self.get_connection().execute(
+                """SELECT name FROM Games
+                WHERE user_id = ? AND last_played IS NOT NULL
+                ORDER BY last_played DESC LIMIT ?""",
+                (user_id, limit),
+            )
+        ]
+
+    @for_current_user()
+    def get_game_by_id(self, user_id, game_id):
+        catalog = self._catalog(user_id)
+        if catalog is not None:
+            return catalog.by_id.get(game_id)
+        return (
+            self.get_connection()
+            .execute(
+                "SELECT * FROM Games WHERE id = ? AND user_id = ?",
+                (game_id, user_id),
+            )
+            .fetchone()
         )
-        categories = cursor.fetchall()
-        conn.close()
-        return categories
 
-    def get_category_name_by_id(self, _id):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        user_id = self.users.get_current_user_id()
-        cursor.execute(
-            "SELECT name FROM Categories WHERE id = ? AND user_id = ?",
-            (_id, user_id),
+    @for_current_user()
+    def get_game(self, user_id, name):
+        catalog = self._catalog(user_id)
+        if catalog is not None:
+            return catalog.by_name.get(name)
+        return (
+            self.get_connection()
+            .execute(
+                "SELECT * FROM Games WHERE name = ? AND user_id = ?",
+                (name, user_id),
+            )
+            .fetchone()
         )
-        name = cursor.fetchone()[0]
-        conn.close()
-        return name
 
-    def get_category_id_by_name(self, name):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        user_id = self.users.get_current_user_id()
-        cursor.execute(
-            "SELECT id FROM Categories WHERE name = ? AND user_id = ?",
-            (name, user_id),
+    def update_game(self, old_name, new_name, category_id):
+        try:
+            user_id = self.users.get_current_user_id()
+            with self.transaction() as conn:
+                row = conn.execute(
+                    "SELECT id FROM Games WHERE name = ? AND user_id = ?",
+                    (old_name, user_id),
+                ).fetchone()
+                if row is None:
+                    return
+                conn.execute(
+                    """UPDATE Games SET name = ?, sort_name = ?, category_id = ?
+                    WHERE id = ?""",
+                    (new_name, collation_key(new_name), category_id, row[0]),
+                )
+            self._refresh_cached_game(user_id, row[0])
+        except Exception as e:
+            print(str(e))
+
+    def _select_games(self, conn, user_id, game_ids) -> list:
+        # Одним запросом в порядке game_ids; чужие и удалённые id пропадают
+        return conn.execute(
+            """SELECT g.* FROM json_each(?) AS j
+            JOIN Games g ON g.id = j.value
+            WHERE g.user_id = ?
+            ORDER BY j.key""",
+            (json.dumps(list(game_ids)), user_id),
+        ).fetchall()
+
+    def _delete_games_rows(self, conn, ids):
+        if not self._has_fts or len(ids) < FTS_BULK_THRESHOLD:
+            conn.executemany(
+                "DELETE FROM Games WHERE id = ?", [(i,) for i in ids]
+            )
+            return
+
+        # Как и при вставке: удаление из FTS по строке в триггере в разы
+        # медленнее одного INSERT ... SELECT на всю пачку
+        trigger = conn.execute(
+            "SELECT sql FROM sqlite_master "
+            "WHERE type = 'trigger' AND name = 'games_fts_delete'"
+        ).fetchone()[0]
+        conn.execute("DROP TRIGGER games_fts_delete")
+        conn.execute(
+            """INSERT INTO GamesFts (GamesFts, rowid, name, user_id)
+            SELECT 'delete', id, name, user_id FROM Games
+            WHERE id IN (SELECT value FROM json_each(?))""",
+            (json.dumps(ids),),
         )
-        result = cursor.fetchone()
-        _id = result[0] if result else None
-        conn.close()
-        return _id
+        conn.executemany(
+            "DELETE FROM Games WHERE id = ?", [(i,) for i in ids]
+        )
+        conn.execute(trigger)
 
-    def get_games(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def delete_games(self, game_ids):
+        """Удаляет игры по id одной транзакцией.
+
+        Возвращает удалённые строки.
+        """
         user_id = self.users.get_current_user_id()
-        cursor.execute("SELECT name FROM Games WHERE user_id = ?", (user_id,))
-        games = cursor.fetchall()
-        conn.close()
+        try:
+            with self.transaction() as conn:
+                rows = self._select_games(conn, user_id, game_ids)
+                self._delete_games_rows(conn, [row[0] for row in rows])
+        except Exception as e:
+            print(f"Ошибка при удалении игр: {e}")
+            return []
 
-        game_names = [game[0] for game in games]
-        return game_names
+        catalog = self._loaded_catalog(user_id)
+        if catalog is not None:
+            for row in rows:
+                catalog.remove(row[0])
+        return rows
 
-    def get_game(self, name):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def move_games(self, game_ids, category_id):
+        """Переносит игры в категорию одной транзакцией.
+
+        Возвращает обновлённые строки.
+        """
         user_id = self.users.get_current_user_id()
-        cursor.execute(
-            "SELECT * FROM Games WHERE name = ? AND user_id = ?",
-            (name, user_id),
-        )
-        row = cursor.fetchone()
-        conn.close()
-        return row
+        try:
+            with self.transaction() as conn:
+                owner = conn.execute(
+                    "SELECT user_id FROM Categories WHERE id = ?",
+                    (category_id,),
+                ).fetchone()
+                if owner is None or owner[0] != user_id:
+                    return []
+                rows = self._select_games(conn, user_id, game_ids)
+                ids = [row[0] for row in rows]
+                conn.executemany(
+                    "UPDATE Games SET category_id = ? WHERE id = ?",
+                    [(category_id, game_id) for game_id in ids],
+                )
+                rows = self._select_games(conn, user_id, ids)
+        except Exception as e:
+            print(f"Ошибка при переносе игр: {e}")
+            return []
 
-    def update_game(self, old_name, new_name, category_id):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        catalog = self._loaded_catalog(user_id)
+        if catalog is not None:
+            for row in rows:
+                catalog.replace(row)
+        return rows
+
+    def rename_games(self, game_ids, pattern: str, replacement: str):
+        """Переименовывает игры заменой по регулярному выражению.
+
+        Все переименования идут одной транзакцией. Возвращает
+        ``(переименованные строки, конфликты)``, где конфликт —
+        ``(старое название, новое название, причина)``. Неверный шаблон
+        или замена поднимают ``re.error``: это ошибка ввода, а не базы.
+        """
+        regex = re.compile(pattern)
         try:
-            user_id = self.users.get_current_user_id()
-            cursor.execute(
-                "UPDATE Games SET name = ?, category_id = ? WHERE name = ? AND user_id = ?",
-                (new_name, category_id, old_name, user_id),
-            )
-            conn.commit()
+            # Ссылки на группы в замене проверяются до первого совпадения
+            regex.sub(replacement, "")
+        except IndexError as e:
+            raise re.error(str(e)) from e
+        user_id = self.users.get_current_user_id()
+        renamed, conflicts = [], []
+        try:
+            with self.transaction() as conn:
+                names = {
+                    name
+                    for (name,) in conn.execute(
+                        "SELECT name FROM Games WHERE user_id = ?", (user_id,)
+                    )
+                }
+                updates = []
+                for row in self._select_games(conn, user_id, game_ids):
+                    old_name = row[1]
+                    new_name = regex.sub(replacement, old_name).strip()
+                    if new_name == old_name:
+                        continue
+                    if not new_name:
+                        conflicts.append(
+                            (old_name, new_name, "Пустое название")
+                        )
+                    elif new_name in names:
+                        conflicts.append(
+                            (
+                                old_name,
+                                new_name,
+                                "Игра с таким именем уже существует",
+                            )
+                        )
+                    else:
+                        names.discard(old_name)
+                        names.add(new_name)
+                        updates.append(
+                            (new_name, collation_key(new_name), row[0])
+                        )
+                conn.executemany(
+                    "UPDATE Games SET name = ?, sort_name = ? WHERE id = ?",
+                    updates,
+                )
+                renamed = self._select_games(
+                    conn, user_id, [update[2] for update in updates]
+                )
         except Exception as e:
-            print(str(e))
-        finally:
-            conn.close()
+            print(f"Ошибка при переименовании игр: {e}")
+            return [], conflicts
+
+        catalog = self._loaded_catalog(user_id)
+        if catalog is not None:
+            for row in renamed:
+                catalog.replace(row)
+        return renamed, conflicts
 
 
-database = Database()
+database = Lazy(Database)
@@ -1,50 +1,98 @@
+from pathlib import Path
+
 from PyQt6.QtWidgets import QDialog, QFileDialog, QMessageBox, QLineEdit
 
 from db import database
+from models import CategoryModel
 from ui.add_game_dialog import Ui_Dialog as AddGameUI
 from ui.createCategory import Ui_Dialog as AddCategoryUI
 from ui.deleteCategory import Ui_Dialog as DeleteCategoryUI
 from ui.edit_game_dialog_ui import Ui_Dialog as EditGameUI
 from ui.profile_dialog_ui import Ui_Dialog as ProfileUI
 
+GAME_FILE_FILTER = (
+    "Игры (*.exe *.msi *.bat *.sh *.AppImage *.appimage *.desktop "
+    "*.x86_64 *.x86);;Все файлы (*)"
+)
+
 
 class BaseDialog:
-    def get_categories(self):
-        combobox = self.comboBox
-        categories = database.get_categories()
-        for category in categories:
-            combobox.addItem(category[0])
+    def set_categories(self, categories: CategoryModel):
+        # Список категорий общий с главным окном, запрос к базе не нужен
+        self.categories = categories
+        self.comboBox.setModel(categories)
+
+    def current_category_id(self):
+        return self.comboBox.currentData(CategoryModel.CategoryIdRole)
 
 
 class AddGameDialog(QDialog, AddGameUI, BaseDialog):
-    def __init__(self):
+    def __init__(self, categories: CategoryModel):
         super().__init__()
         self.setFixedSize(450, 180)
 
         self.setupUi(self)
         self.path_button.clicked.connect(self.choose_file)
 
+        # Несколько выбранных файлов включают режим импорта
+        self.import_paths = []
+        self.added_games = []
+
         self.buttonBox.accepted.disconnect()
         self.buttonBox.rejected.disconnect()
 
-        self.get_categories()
+        self.set_categories(categories)
 
         self.buttonBox.accepted.connect(self.accept_dialog)
         self.buttonBox.rejected.connect(self.reject)
 
     def choose_file(self):
-        file_path = QFileDialog.getOpenFileName(
-            self, "Выбрать файл", "", "EXE - Файл (*.exe)"
+        file_paths = QFileDialog.getOpenFileNames(
+            self, "Выбрать файлы", "", GAME_FILE_FILTER
         )[0]
-        if file_path:
-            self.file_path.setText(file_path)
+        if not file_paths:
+            return
+
+        if len(file_paths) == 1:
+            self.import_paths = []
+            self.game_name.setEnabled(True)
+            self.file_path.setText(file_paths[0])
+        else:
+            self.import_paths = file_paths
+            self.game_name.clear()
+            self.game_name.setEnabled(False)
+            self.game_name.setPlaceholderText(
+                "Названия будут взяты из имён файлов"
+            )
+            self.file_path.setText(f"Выбрано файлов: {len(file_paths)}")
+
+    def import_games(self):
+        category_name = self.comboBox.currentText()
+        games = [
+            (Path(path).stem, path, category_name)
+            for path in self.import_paths
+        ]
+        self.added_games, conflicts = database.insert_games_bulk(games)
+        self.accept()
+
+        message = f"Добавлено игр: {len(self.added_games)}"
+        if conflicts:
+            details = "\n".join(
+                f"{name}: {reason}" for name, _path, reason in conflicts[:10]
+            )
+            if len(conflicts) > 10:
+                details += f"\n... и ещё {len(conflicts) - 10}"
+            message += f"\nПропущено: {len(conflicts)}\n{details}"
+        QMessageBox.information(self, "Импорт завершён", message)
 
     def accept_dialog(self):
+        if self.import_paths:
+            self.import_games()
+            return
+
         game_name = self.game_name.text().strip()
         game_path = self.file_path.text().strip()
-        category_id = database.get_category_id_by_name(
-            self.comboBox.currentText()
-        )
+        category_id = self.current_category_id()
 
         if not game_name:
             QMessageBox.warning(self, "Ошибка", "Введите название игры")
@@ -55,7 +103,7 @@ class AddGameDialog(QDialog, AddGameUI, BaseDialog):
             return
 
         if not category_id:
-            category_id = 1
+            category_id = self.categories.all_category_id()
 
         if not database.check_unique(
             select_from="Games", where_value="name", parameter=game_name
@@ -75,6 +123,9 @@ class AddGameDialog(QDialog, AddGameUI, BaseDialog):
 
         try:
             database.insert_game(game_name, game_path, category_id)
+            game = database.get_game(game_name)
+            if game:
+                self.added_games = [game]
             self.accept()
             QMessageBox.information(self, "Успех", "Игра добавлена!")
 
@@ -85,7 +136,7 @@ class AddGameDialog(QDialog, AddGameUI, BaseDialog):
 
 
 class EditGameDialog(QDialog, EditGameUI, BaseDialog):
-    def __init__(self, game_name):
+    def __init__(self, game_name, categories: CategoryModel):
         super().__init__()
         self.orig_game_name = game_name
         self.setFixedSize(450, 180)
@@ -95,7 +146,7 @@ class EditGameDialog(QDialog, EditGameUI, BaseDialog):
         self.buttonBox.accepted.disconnect()
         self.buttonBox.rejected.disconnect()
 
-        self.get_categories()
+        self.set_categories(categories)
         self.load_game_data()
 
         self.path_button.setDisabled(True)
@@ -110,23 +161,20 @@ class EditGameDialog(QDialog, EditGameUI, BaseDialog):
             self.file_path.setText(game_data[2])  # path
 
             # Устанавливаем правильную категорию
-            category_name = database.get_category_name_by_id(game_data[3])
-            index = self.comboBox.findText(category_name)
-            if index >= 0:
-                self.comboBox.setCurrentIndex(index)
+            row = self.categories.row_of(game_data[3])
+            if row is not None:
+                self.comboBox.setCurrentIndex(row)
 
     def accept_dialog(self):
         new_game_name = self.game_name.text().strip()
-        category_id = database.get_category_id_by_name(
-            self.comboBox.currentText()
-        )
+        category_id = self.current_category_id()
 
         if not new_game_name:
             QMessageBox.warning(self, "Ошибка", "Введите название игры")
             return
 
         if not category_id:
-            category_id = 1
+            category_id = self.categories.all_category_id()
 
         if new_game_name != self.orig_game_name and not database.check_unique(
             select_from="Games", where_value="name", parameter=new_game_name
@@ -155,6 +203,8 @@ class AddCategoryDialog(QDialog, AddCategoryUI):
         self.setFixedSize(300, 110)
 
         self.setupUi(self)
+        self.category_id = None
+        self.category_name = None
 
         self.buttonBox.accepted.disconnect()
         self.buttonBox.rejected.disconnect()
@@ -176,24 +226,30 @@ class AddCategoryDialog(QDialog, AddCategoryUI):
             )
             return
 
-        if not database.insert_category(category_name):
+        self.category_id = database.insert_category(category_name)
+        if not self.category_id:
             QMessageBox.warning(
                 self, "Ошибка", "Категория с таким именем уже существует"
             )
             return
+        self.category_name = category_name
 
         self.accept()
         QMessageBox.information(self, "Успех", "Категория успешно добавлена")
 
 
 class DeleteCategoryDialog(QDialog, DeleteCategoryUI, BaseDialog):
-    def __init__(self):
+    def __init__(self, categories: CategoryModel):
         super().__init__()
         self.setFixedSize(300, 110)
 
         self.setupUi(self)
 
-        self.get_categories()
+        self.set_categories(categories)
+        self.category_id = None
+        # Игры удалённой категории переходят во «Все»
+        self.moved_to = categories.all_category_id()
+        self.moved_games = 0
 
         self.buttonBox.accepted.disconnect()
         self.buttonBox.rejected.disconnect()
@@ -214,23 +270,18 @@ class DeleteCategoryDialog(QDialog, DeleteCategoryUI, BaseDialog):
             )
             return
 
-        try:
-            database.edit_games_category(
-                database.get_category_id_by_name(category_name), 1
-            )
-
-            database.delete(
-                select_from="Categories",
-                where_value="id",
-                parameter=database.get_category_id_by_name(category_name),
-            )
-            self.accept()
-            QMessageBox.information(self, "Успех", "Категория успешно удалена")
-
-        except Exception as e:
+        category_id = self.current_category_id()
+        moved = database.delete_category(category_name, "Все")
+        if moved is None:
             QMessageBox.critical(
-                self, "Ошибка", f"Не удалось удалить категорию: {str(e)}"
+                self, "Ошибка", "Не удалось удалить категорию"
             )
+            return
+
+        self.category_id = category_id
+        self.moved_games = moved
+        self.accept()
+        QMessageBox.information(self, "Успех", "Категория успешно удалена")
 
 
 class ProfileDialog(QDialog, ProfileUI):
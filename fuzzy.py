@@ -0,0 +1,226 @@
+"""Нечёткий поиск названий игр по триграммам.
+
+Индекс хранит для каждой триграммы множество id игр. Кандидаты
+отбираются по числу общих триграмм с запросом, а лучшие из них
+переупорядочиваются по расстоянию Левенштейна между словами, поэтому
+«wichter 3» находит «The Witcher 3».
+"""
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+# Какую долю триграмм запроса должно содержать название, чтобы стать
+# кандидатом. Опечатка в слове портит до трёх-четырёх его триграмм.
+MIN_SHARED_GRAMS = 0.4
+# Сколько кандидатов, лучших по Жаккару, проверять расстоянием Левенштейна
+RERANK_CANDIDATES = 30
+# Кандидаты, у которых слова запроса в среднем расходятся с названием
+# на половину длины и больше, считаются случайными совпадениями
+MAX_WORD_DISTANCE = 0.5
+
+BREVE = "\u0306"
+
+_WORD_RE = re.compile(r"\w+")
+_NUMBER_RE = re.compile(r"\d+")
+
+
+def normalize(text: str) -> str:
+    """Приводит название к виду для сравнения.
+
+    Регистр сворачивается так же, как в ``Database.search_games``,
+    «ё» приравнивается к «е», диакритика латиницы отбрасывается.
+    """
+    text = text.casefold().replace("ё", "е")
+    decomposed = unicodedata.normalize("NFD", text)
+    text = "".join(
+        char
+        for char in decomposed
+        if not unicodedata.combining(char) or char == BREVE
+    )
+    # «й» раскладывается на «и» + бреве; бреве оставляем и собираем обратно
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(_WORD_RE.findall(text))
+
+
+def collation_key(name: str) -> str:
+    """Ключ сортировки названия, хранится в ``Games.sort_name``.
+
+    Регистр и «ё» не влияют на порядок, а числа сравниваются по
+    значению: «Игра 2» идёт раньше «Игра 10».
+    """
+    return _NUMBER_RE.sub(
+        lambda match: match.group().lstrip("0").zfill(10), normalize(name)
+    )
+
+
+def trigrams(text: str) -> set[str]:
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i : i + 3])
+    return grams
+
+
+def levenshtein(a: str, b: str, limit: int | None = None) -> int:
+    """Расстояние Левенштейна; при превышении ``limit`` возвращает limit+1."""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def word_distance(query: str, name: str, cache: dict | None = None) -> float:
+    """Средняя относительная ошибка слов запроса при лучшем совпадении.
+
+    Слово, которое расходится со всеми словами названия больше чем на
+    половину длины, считается несовпавшим (ошибка 1.0).
+    """
+    name_words = name.split()
+    if not name_words:
+        return 1.0
+    if cache is None:
+        cache = {}
+    total = 0.0
+    query_words = query.split()
+    for word in query_words:
+        limit = len(word) // 2
+        best = limit + 1
+        for candidate in name_words:
+            key = (word, candidate)
+            distance = cache.get(key)
+            if distance is None:
+                distance = cache[key] = levenshtein(word, candidate, limit)
+            if distance < best:
+                best = distance
+                if not best:
+                    break
+        total += best / max(len(word), 1) if best <= limit else 1.0
+    return total / len(query_words)
+
+
+class TrigramIndex:
+    """Индекс названий; изменяется и читается из разных потоков."""
+
+    def __init__(self):
+        self._postings: dict[str, set[int]] = defaultdict(set)
+        self._names: dict[int, str] = {}
+        self._normalized: dict[int, str] = {}
+        self._gram_counts: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, game_id: int, name: str):
+        normalized = normalize(name)
+        grams = trigrams(normalized)
+        with self._lock:
+            self._remove(game_id)
+            self._names[game_id] = name
+            self._normalized[game_id] = normalized
+            self._gram_counts[game_id] = len(grams)
+            for gram in grams:
+                self._postings[gram].add(game_id)
+
+    def rename(self, game_id: int, name: str):
+        self.add(game_id, name)
+
+    def remove(self, game_id: int):
+        with self._lock:
+            self._remove(game_id)
+
+    def _remove(self, game_id: int):
+        if game_id not in self._names:
+            return
+        normalized = self._normalized.pop(game_id)
+        del self._names[game_id]
+        del self._gram_counts[game_id]
+        for gram in trigrams(normalized):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(game_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def search(self, query: str, limit: int = 10) -> list[int]:
+        """Возвращает id наиболее похожих игр, лучшие первыми."""
+        normalized = normalize(query)
+        query_grams = trigrams(normalized)
+        if not query_grams:
+            return []
+        with self._lock:
+            return self._search(normalized, query_grams, limit)
+
+    def _search(self, normalized: str, query_grams: set, limit: int):
+        # Триграммы, которых нет в индексе, дают пустые списки: они тоже
+        # входят в запрос, но ни одному названию не добавляют совпадений
+        empty = set()
+        postings = sorted(
+            (self._postings.get(gram, empty) for gram in query_grams),
+            key=len,
+        )
+        query_size = len(postings)
+        required = max(1, math.ceil(query_size * MIN_SHARED_GRAMS))
+
+        # Название с required общими триграммами обязательно есть хотя бы
+        # в одном из query_size - required + 1 самых редких списков.
+        # Кандидаты берутся только из них. Длинные списки частых триграмм
+        # не перебираются: в них лишь проверяется каждый кандидат, и
+        # отбрасываются те, кому уже не набрать required.
+        prefix = query_size - required + 1
+        overlap = Counter()
+        for posting in postings[:prefix]:
+            overlap.update(posting)
+        rest = postings[prefix:]
+        for position, posting in enumerate(rest):
+            left = len(rest) - position - 1
+            counted = {}
+            for game_id, shared in overlap.items():
+                shared += game_id in posting
+                if shared + left >= required:
+                    counted[game_id] = shared
+            overlap = counted
+
+        # Коэффициент Жаккара по триграммам
+        gram_counts = self._gram_counts
+        candidates = heapq.nlargest(
+            RERANK_CANDIDATES,
+            overlap.items(),
+            key=lambda item: item[1]
+            / (query_size + gram_counts[item[0]] - item[1]),
+        )
+
+        ranked = []
+        cache = {}
+        for game_id, shared in candidates:
+            distance = word_distance(
+                normalized, self._normalized[game_id], cache
+            )
+            if distance >= MAX_WORD_DISTANCE:
+                continue
+            similarity = shared / (query_size + gram_counts[game_id] - shared)
+            ranked.append((distance - similarity, game_id))
+        ranked.sort()
+        return [game_id for _score, game_id in ranked[:limit]]
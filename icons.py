@@ -0,0 +1,481 @@
+"""Иконки игр: извлечение в фоне и кэш миниатюр.
+
+Иконка берётся из ресурсов PE для .exe, из ``Icon=`` для .desktop или
+из картинки рядом с файлом игры. Извлечение идёт в пуле потоков, готовые
+миниатюры сохраняются в ``thumbnails/`` папки данных под именем,
+равным хэшу их содержимого, поэтому одинаковые иконки разных игр
+хранятся один раз. Соответствие «файл игры -> миниатюра» лежит в таблице
+``ThumbnailIndex``. На диске и в памяти держатся только недавно
+использованные миниатюры.
+"""
+
+import hashlib
+import os
+import struct
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from PyQt6.QtCore import (
+    QBuffer,
+    QByteArray,
+    QIODevice,
+    QObject,
+    QRunnable,
+    QThreadPool,
+    QTimer,
+    Qt,
+    pyqtSignal,
+)
+from PyQt6.QtGui import QImage, QPixmap
+
+from backends import read_desktop_entry
+from sqltrace import query_tracer
+from utils import get_data_path
+
+THUMBNAIL_SIZE = 32
+DISK_BUDGET = 64 * 1024 * 1024
+MEMORY_BUDGET = 16 * 1024 * 1024
+# Запросы сверх этого числа вытесняют самые старые: при быстрой прокрутке
+# они относятся к строкам, которые уже не видны
+MAX_PENDING = 256
+# Готовые иконки передаются в модель пачками, а не по одной
+READY_BATCH_MS = 30
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".ico", ".bmp", ".svg", ".xpm")
+NEIGHBOUR_NAMES = ("icon", "cover", "logo", "folder")
+ICON_THEME_DIRS = (
+    os.path.expanduser("~/.local/share/icons"),
+    "/usr/share/icons",
+    "/usr/share/pixmaps",
+)
+ICON_THEME_SIZES = ("48x48", "64x64", "128x128", "32x32", "256x256", "scalable")
+
+RT_ICON = 3
+RT_GROUP_ICON = 14
+PNG_MAGIC = b"\x89PNG"
+
+
+class PeResources:
+    """Чтение ресурсов из PE-файла без загрузки его целиком."""
+
+    def __init__(self, file):
+        self.file = file
+        self.sections = []
+        self.resource_rva = 0
+
+    def _read(self, offset: int, size: int) -> bytes:
+        self.file.seek(offset)
+        data = self.file.read(size)
+        if len(data) != size:
+            raise ValueError("Файл PE обрезан")
+        return data
+
+    def load_headers(self) -> bool:
+        if self._read(0, 2) != b"MZ":
+            return False
+        pe_offset = struct.unpack("<I", self._read(0x3C, 4))[0]
+        if self._read(pe_offset, 4) != b"PE\0\0":
+            return False
+        sections, optional_size = struct.unpack(
+            "<H12xH", self._read(pe_offset + 6, 16)
+        )
+        optional = pe_offset + 24
+        magic = struct.unpack("<H", self._read(optional, 2))[0]
+        directories = optional + (112 if magic == 0x20B else 96)
+        self.resource_rva = struct.unpack(
+            "<I", self._read(directories + 2 * 8, 4)
+        )[0]
+        table = optional + optional_size
+        for i in range(sections):
+            size, rva, raw_size, raw_offset = struct.unpack(
+                "<4I", self._read(table + i * 40 + 8, 16)
+            )
+            self.sections.append((rva, max(size, raw_size), raw_offset))
+        return self.resource_rva != 0
+
+    def _offset(self, rva: int) -> int:
+        for start, size, raw_offset in self.sections:
+            if start <= rva < start + size:
+                return raw_offset + rva - start
+        raise ValueError("RVA вне секций")
+
+    def _entries(self, directory_rva: int):
+        base = self._offset(self.resource_rva)
+        header = self._read(base + directory_rva, 16)
+        named, ids = struct.unpack("<12xHH", header)
+        data = self._read(base + directory_rva + 16, (named + ids) * 8)
+        for i in range(named + ids):
+            name, offset = struct.unpack_from("<II", data, i * 8)
+            yield name, offset
+
+    def _leaf(self, offset: int) -> bytes:
+        # Тип -> имя -> язык: берём первый язык
+        base = self._offset(self.resource_rva)
+        while offset & 0x80000000:
+            offset = next(self._entries(offset & 0x7FFFFFFF))[1]
+        rva, size = struct.unpack("<II", self._read(base + offset, 8))
+        return self._read(self._offset(rva), size)
+
+    def resources(self, resource_type: int) -> dict[int, bytes]:
+        for name, offset in self._entries(0):
+            if name == resource_type and offset & 0x80000000:
+                return {
+                    entry_name: self._leaf(entry_offset)
+                    for entry_name, entry_offset in self._entries(
+                        offset & 0x7FFFFFFF
+                    )
+                }
+        return {}
+
+    def first_resource(self, resource_type: int) -> bytes | None:
+        for name, offset in self._entries(0):
+            if name == resource_type and offset & 0x80000000:
+                entry = next(self._entries(offset & 0x7FFFFFFF), None)
+                if entry is not None:
+                    return self._leaf(entry[1])
+        return None
+
+
+def pe_icon(path: str) -> QImage | None:
+    """Главная иконка .exe: первая группа RT_GROUP_ICON."""
+    try:
+        with open(path, "rb") as file:
+            pe = PeResources(file)
+            if not pe.load_headers():
+                return None
+            group = pe.first_resource(RT_GROUP_ICON)
+            if group is None:
+                return None
+            count = struct.unpack_from("<4xH", group)[0]
+            entries = [
+                struct.unpack_from("<BBBBHHIH", group, 6 + i * 14)
+                for i in range(count)
+            ]
+            if not entries:
+                return None
+            icons = pe.resources(RT_ICON)
+    except (OSError, ValueError, struct.error, StopIteration):
+        return None
+
+    def entry_size(entry):
+        return entry[0] or 256
+
+    # Наименьшая иконка не меньше миниатюры, иначе самая большая
+    large = [e for e in entries if entry_size(e) >= THUMBNAIL_SIZE]
+    if large:
+        entry = min(large, key=lambda e: (entry_size(e), -e[5]))
+    else:
+        entry = max(entries, key=lambda e: (entry_size(e), e[5]))
+    data = icons.get(entry[7])
+    if not data:
+        return None
+    if data.startswith(PNG_MAGIC):
+        image = QImage.fromData(data)
+    else:
+        # Ресурс RT_ICON — это .ico без заголовка каталога
+        header = struct.pack("<HHH", 0, 1, 1) + struct.pack(
+            "<BBBBHHII", *entry[:6], len(data), 22
+        )
+        image = QImage.fromData(header + data, "ICO")
+    return None if image.isNull() else image
+
+
+def theme_icon_path(name: str) -> str | None:
+    if os.path.isabs(name):
+        return name if os.path.isfile(name) else None
+    candidates = []
+    for root in ICON_THEME_DIRS:
+        candidates.append(os.path.join(root, name))
+        for size in ICON_THEME_SIZES:
+            candidates.append(os.path.join(root, "hicolor", size, "apps", name))
+    for candidate in candidates:
+        for extension in ("",) + IMAGE_EXTENSIONS:
+            if os.path.isfile(candidate + extension):
+                return candidate + extension
+    return None
+
+
+@lru_cache(maxsize=64)
+def _folder_listing(folder: str, _mtime_ns: int) -> dict[str, str]:
+    # Игры часто лежат в одной папке: её содержимое читается один раз,
+    # пока папка не изменится
+    try:
+        return {name.lower(): name for name in os.listdir(folder)}
+    except OSError:
+        return {}
+
+
+def neighbour_image_path(path: str) -> str | None:
+    folder = os.path.dirname(path)
+    try:
+        files = _folder_listing(folder, os.stat(folder).st_mtime_ns)
+    except OSError:
+        return None
+    stem = os.path.splitext(os.path.basename(path))[0].lower()
+    for base in (stem,) + NEIGHBOUR_NAMES:
+        for extension in IMAGE_EXTENSIONS:
+            name = files.get(base + extension)
+            if name is not None:
+                return os.path.join(folder, name)
+    return None
+
+
+def extract_icon(path: str) -> QImage | None:
+    extension = os.path.splitext(path)[1].lower()
+    image = None
+    if extension == ".exe":
+        image = pe_icon(path)
+    elif extension == ".desktop":
+        icon = read_desktop_entry(path).get("Icon")
+        icon_path = theme_icon_path(icon) if icon else None
+        if icon_path:
+            image = QImage(icon_path)
+    if image is None or image.isNull():
+        image_path = neighbour_image_path(path)
+        if image_path:
+            image = QImage(image_path)
+    if image is None or image.isNull():
+        return None
+    return image.scaled(
+        THUMBNAIL_SIZE,
+        THUMBNAIL_SIZE,
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation,
+    )
+
+
+class ThumbnailCache:
+    """Миниатюры на диске, адресуемые хэшем содержимого.
+
+    Методы вызываются из рабочих потоков; база данных у каждого потока
+    своя (``ConnectionManager``).
+    """
+
+    def __init__(self, database, budget: int = DISK_BUDGET):
+        self.database = database
+        self.budget = budget
+        self.folder = get_data_path() / "thumbnails"
+        self.folder.mkdir(exist_ok=True)
+
+    def _blob_path(self, digest: str):
+        return self.folder / f"{digest}.png"
+
+    @staticmethod
+    def source_key(path: str) -> str | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return hashlib.sha1(
+            f"{path}\0{st.st_size}\0{st.st_mtime_ns}".encode()
+        ).hexdigest()
+
+    def load(self, path: str) -> tuple[bool, QImage | None]:
+        """``(найдено в кэше, миниатюра)``; миниатюра None — иконки нет."""
+        key = self.source_key(path)
+        if key is None:
+            return True, None
+        digest = self.database.get_thumbnail(key)
+        if digest is None:
+            return False, None
+        if digest == "":
+            return True, None
+        blob = self._blob_path(digest)
+        image = QImage(str(blob))
+        if image.isNull():
+            return False, None
+        # Время изменения файла служит отметкой последнего использования
+        os.utime(blob)
+        return True, image
+
+    def store(self, path: str, image: QImage | None):
+        key = self.source_key(path)
+        if key is None:
+            return
+        digest = ""
+        if image is not None:
+            data = QByteArray()
+            buffer = QBuffer(data)
+            buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+            image.save(buffer, "PNG")
+            png = bytes(data)
+            digest = hashlib.sha256(png).hexdigest()
+            blob = self._blob_path(digest)
+            if not blob.exists():
+                temp = blob.with_suffix(f".{os.getpid()}.tmp")
+                temp.write_bytes(png)
+                os.replace(temp, blob)
+        self.database.set_thumbnail(key, digest)
+
+    def evict(self):
+        """Удаляет давно не использованные миниатюры сверх бюджета."""
+        blobs = []
+        total = 0
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(".png"):
+                st = entry.stat()
+                blobs.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.budget:
+            return
+        blobs.sort()
+        removed = []
+        # Освобождаем с запасом, чтобы не чистить после каждой записи
+        target = self.budget * 0.9
+        for _mtime, size, path in blobs:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed.append(os.path.splitext(os.path.basename(path))[0])
+        self.database.forget_thumbnails(removed)
+
+
+class IconSignals(QObject):
+    finished = pyqtSignal(int, str, QImage, bool)
+
+
+class IconTask(QRunnable):
+    def __init__(self, cache: ThumbnailCache, game_id: int, path: str):
+        super().__init__()
+        self.cache = cache
+        self.game_id = game_id
+        self.path = path
+        self.signals = IconSignals()
+
+    def run(self):
+        image, stored = None, False
+        try:
+            with query_tracer.action("load_icons"):
+                found, image = self.cache.load(self.path)
+                if not found:
+                    image = extract_icon(self.path)
+                    self.cache.store(self.path, image)
+                    stored = True
+        except Exception as e:
+            print(f"Ошибка при загрузке иконки {self.path}: {e}")
+        finally:
+            # Поток пула может завершиться, и его соединение осталось бы
+            # открытым до конца работы лаунчера
+            self.cache.database.connections.close_thread()
+        # Ответ нужен и при ошибке, иначе запрос останется «в работе»
+        self.signals.finished.emit(
+            self.game_id,
+            self.path,
+            QImage() if image is None else image,
+            stored,
+        )
+
+
+class IconLoader(QObject):
+    """Отдаёт иконки игр модели и подгружает недостающие в фоне.
+
+    ``icon()`` вызывается из ``data()`` только для видимых строк и
+    никогда не ждёт: если иконки ещё нет в памяти, ставит её в очередь
+    и возвращает None. Когда иконки готовы, сигнал ``icons_ready``
+    передаёт id игр.
+    """
+
+    icons_ready = pyqtSignal(list)
+
+    # Сколько новых миниатюр записать, прежде чем проверить бюджет диска
+    EVICT_EVERY = 100
+
+    def __init__(self, database, parent=None, memory_budget=MEMORY_BUDGET):
+        super().__init__(parent)
+        self.cache = ThumbnailCache(database)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(min(4, os.cpu_count() or 1))
+        self.memory_budget = memory_budget
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        # Пустой результат тоже кэшируется, чтобы не искать иконку снова
+        self._no_icon = set()
+        self._pending = deque()
+        self._queued = set()
+        self._in_flight = set()
+        self._ready = []
+        self._stored = 0
+        self._ready_timer = QTimer(self)
+        self._ready_timer.setSingleShot(True)
+        self._ready_timer.setInterval(READY_BATCH_MS)
+        self._ready_timer.timeout.connect(self._flush_ready)
+
+    def icon(self, game_id: int, path: str) -> QPixmap | None:
+        pixmap = self._memory.get(path)
+        if pixmap is not None:
+            self._memory.move_to_end(path)
+            return pixmap
+        if path not in self._no_icon:
+            self._request(game_id, path)
+        return None
+
+    def _request(self, game_id, path):
+        if path in self._in_flight:
+            return
+        if path in self._queued:
+            return
+        self._pending.append((game_id, path))
+        self._queued.add(path)
+        if len(self._pending) > MAX_PENDING:
+            _, dropped = self._pending.popleft()
+            self._queued.discard(dropped)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._pending and len(self._in_flight) < self.pool.maxThreadCount():
+            # Последние запросы — строки, видимые сейчас
+            game_id, path = self._pending.pop()
+            self._queued.discard(path)
+            self._in_flight.add(path)
+            task = IconTask(self.cache, game_id, path)
+            task.signals.finished.connect(self._on_finished)
+            self.pool.start(task)
+
+    def _on_finished(self, game_id, path, image, stored):
+        self._in_flight.discard(path)
+        if image.isNull():
+            self._no_icon.add(path)
+        else:
+            self._remember(path, QPixmap.fromImage(image))
+        self._ready.append(game_id)
+        if not self._ready_timer.isActive():
+            self._ready_timer.start()
+        if stored:
+            self._stored += 1
+            if self._stored % self.EVICT_EVERY == 0:
+                self.pool.start(self._evict)
+        self._dispatch()
+
+    def _evict(self):
+        try:
+            self.cache.evict()
+        finally:
+            self.cache.database.connections.close_thread()
+
+    def _remember(self, path, pixmap: QPixmap):
+        size = pixmap.width() * pixmap.height() * 4
+        self._memory[path] = pixmap
+        self._memory_size += size
+        while self._memory_size > self.memory_budget and len(self._memory) > 1:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= old.width() * old.height() * 4
+
+    def _flush_ready(self):
+        ready, self._ready = self._ready, []
+        self.icons_ready.emit(ready)
+
+    def forget(self, path):
+        """Сбрасывает иконку из памяти, например после смены файла игры."""
+        pixmap = self._memory.pop(path, None)
+        if pixmap is not None:
+            self._memory_size -= pixmap.width() * pixmap.height() * 4
+        self._no_icon.discard(path)
+
+    def shutdown(self):
+        self._pending.clear()
+        self._queued.clear()
+        self.pool.waitForDone()
@@ -0,0 +1,251 @@
+"""Запуск игр и учёт времени игры.
+
+Команду запуска строит способ из ``backends``. На Linux игра
+запускается через ``os.posix_spawn``, а её завершение отслеживается по
+pidfd через ``QSocketNotifier``; там, где этого нет (Windows), — через
+``QProcess``. В обоих случаях запуск не ждёт дочерний процесс, а начало
+и завершение игры приходят в цикл событий. Время запуска и выхода
+записывается в ``PlaySessions``.
+"""
+
+import errno
+import os
+import select
+import signal
+import time
+from functools import lru_cache
+
+from PyQt6.QtCore import QObject, QProcess, QSocketNotifier, pyqtSignal
+
+from backends import LaunchCommand, get_backend, resolve_backend
+
+# Сколько ждать завершения игр при закрытии лаунчера, прежде чем
+# завершить их принудительно
+SHUTDOWN_TIMEOUT_MS = 3000
+
+# posix_spawn не умеет менять рабочую папку ребёнка, а os.chdir в
+# лаунчере сменил бы её всем его потокам. Папку меняет sh уже в
+# ребёнке и через exec заменяет себя игрой.
+SHELL = "/bin/sh"
+CHDIR_SCRIPT = 'cd -- "$1" && shift && exec "$@"'
+
+
+@lru_cache(maxsize=None)
+def spawn_supported() -> bool:
+    if not hasattr(os, "posix_spawn") or not hasattr(os, "pidfd_open"):
+        return False
+    if not os.access(SHELL, os.X_OK):
+        return False
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        # Ядро старше 5.3
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def _null_file_actions():
+    streams = ((0, os.O_RDONLY), (1, os.O_WRONLY), (2, os.O_WRONLY))
+    return [
+        (os.POSIX_SPAWN_OPEN, fd, os.devnull, flags, 0)
+        for fd, flags in streams
+    ]
+
+
+def spawn(command: LaunchCommand) -> int:
+    """Запускает команду в новой сессии и возвращает pid.
+
+    Ввод и вывод игры направляются в нулевое устройство: лаунчер их не
+    читает, а заполненный канал остановил бы игру. Ошибки, о которых
+    внутри sh узнать уже нельзя, проверяются заранее и поднимают
+    ``OSError``, как сам ``posix_spawn``.
+    """
+    path, argv = command.argv[0], command.argv
+    if not os.access(path, os.X_OK):
+        error = errno.EACCES if os.path.exists(path) else errno.ENOENT
+        raise OSError(error, os.strerror(error), path)
+    if command.cwd:
+        if not os.path.isdir(command.cwd):
+            raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), command.cwd)
+        path = SHELL
+        argv = ["sh", "-c", CHDIR_SCRIPT, "sh", command.cwd, *argv]
+    return os.posix_spawn(
+        path,
+        argv,
+        command.env,
+        file_actions=_null_file_actions(),
+        setsid=True,
+    )
+
+
+class RunningGame:
+    def __init__(self, game_id: int):
+        self.game_id = game_id
+        self.session_id = None
+        self.process = None
+        self.pid = None
+        self.pidfd = None
+        self.notifier = None
+
+
+class LaunchSupervisor(QObject):
+    """Запускает игры и следит за их процессами."""
+
+    game_started = pyqtSignal(int)
+    game_finished = pyqtSignal(int, int)
+    launch_failed = pyqtSignal(int, str)
+
+    def __init__(self, database, parent=None):
+        super().__init__(parent)
+        self.database = database
+        self._running = {}
+
+    def is_running(self, game_id) -> bool:
+        return game_id in self._running
+
+    def running_games(self) -> list[int]:
+        return list(self._running)
+
+    def launch(self, game) -> bool:
+        """Запускает игру; False, если она уже запущена.
+
+        Об ошибке запуска сообщает сигнал ``launch_failed``.
+        """
+        game_id = game[0]
+        if game_id in self._running:
+            return False
+
+        running = RunningGame(game_id)
+        try:
+            command = self._command(game)
+        except (OSError, ValueError) as e:
+            self.launch_failed.emit(game_id, str(e))
+            return True
+
+        self._running[game_id] = running
+        if spawn_supported():
+            self._spawn(running, command)
+        else:
+            self._start_process(running, command)
+        return True
+
+    def _command(self, game) -> LaunchCommand:
+        game_id, path, backend_name = game[0], game[2], game[11]
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Файл игры не найден: {path}")
+        backend = get_backend(backend_name)
+        if backend is None:
+            backend_name = resolve_backend(path)
+            backend = get_backend(backend_name)
+            if backend is None:
+                raise ValueError(f"Неизвестный тип файла игры: {path}")
+            self.database.set_game_backend(game_id, backend_name)
+        return backend.command(path)
+
+    def _spawn(self, running: RunningGame, command: LaunchCommand):
+        try:
+            running.pid = spawn(command)
+            running.pidfd = os.pidfd_open(running.pid)
+        except OSError as e:
+            self._fail(running, e.strerror or str(e))
+            return
+        running.notifier = QSocketNotifier(
+            running.pidfd, QSocketNotifier.Type.Read, self
+        )
+        running.notifier.activated.connect(lambda: self._on_exited(running))
+        self._on_started(running)
+
+    def _start_process(self, running: RunningGame, command: LaunchCommand):
+        process = QProcess(self)
+        process.setProgram(command.argv[0])
+        process.setArguments(command.argv[1:])
+        process.setWorkingDirectory(command.cwd or ".")
+        process.setStandardInputFile(QProcess.nullDevice())
+        process.setStandardOutputFile(QProcess.nullDevice())
+        process.setStandardErrorFile(QProcess.nullDevice())
+        running.process = process
+        process.started.connect(lambda: self._on_started(running))
+        process.finished.connect(
+            lambda exit_code, _status: self._on_finished(running, exit_code)
+        )
+        process.errorOccurred.connect(
+            lambda error: self._on_error(running, error)
+        )
+        process.start()
+
+    def _on_started(self, running: RunningGame):
+        running.session_id = self.database.start_play_session(running.game_id)
+        self.game_started.emit(running.game_id)
+
+    def _on_exited(self, running: RunningGame):
+        running.notifier.setEnabled(False)
+        _, status = os.waitpid(running.pid, 0)
+        self._on_finished(running, os.waitstatus_to_exitcode(status))
+
+    def _on_finished(self, running: RunningGame, exit_code: int):
+        if running.session_id is not None:
+            self.database.finish_play_session(running.session_id)
+        self._forget(running)
+        self.game_finished.emit(running.game_id, exit_code)
+
+    def _on_error(self, running: RunningGame, error):
+        # Об ошибках уже запущенного процесса сообщит finished
+        if error == QProcess.ProcessError.FailedToStart:
+            self._fail(running, running.process.errorString())
+
+    def _fail(self, running: RunningGame, message: str):
+        self._forget(running)
+        # Файл могли заменить файлом другого типа: при следующем запуске
+        # способ будет определён заново
+        self.database.set_game_backend(running.game_id, None)
+        self.launch_failed.emit(running.game_id, message)
+
+    def _forget(self, running: RunningGame):
+        if self._running.get(running.game_id) is running:
+            del self._running[running.game_id]
+        if running.process is not None:
+            running.process.deleteLater()
+        if running.notifier is not None:
+            running.notifier.deleteLater()
+        if running.pidfd is not None:
+            os.close(running.pidfd)
+            running.pidfd = None
+
+    def shutdown(self):
+        """Завершает все запущенные игры и закрывает их сессии."""
+        running = list(self._running.values())
+        for game in running:
+            self._stop(game, force=False)
+        # Игры завершаются параллельно, поэтому срок общий для всех
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT_MS / 1000
+        for game in running:
+            remaining = max(int((deadline - time.monotonic()) * 1000), 0)
+            if not self._wait(game, remaining):
+                self._stop(game, force=True)
+                self._wait(game, SHUTDOWN_TIMEOUT_MS)
+
+    def _stop(self, game: RunningGame, force: bool):
+        if game.process is not None:
+            if force:
+                game.process.kill()
+            else:
+                game.process.terminate()
+            return
+        try:
+            # Игра запущена в своей сессии: сигнал получит вся её группа
+            os.killpg(game.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def _wait(self, game: RunningGame, timeout_ms: int) -> bool:
+        if game.process is not None:
+            return game.process.waitForFinished(timeout_ms)
+        if game.pidfd is None:
+            return True
+        poller = select.poll()
+        poller.register(game.pidfd, select.POLLIN)
+        if not poller.poll(timeout_ms):
+            return False
+        self._on_exited(game)
+        return True
@@ -1,14 +1,87 @@
 import os
+import re
 import sys
+from functools import lru_cache
+
+# Первым из модулей лаунчера: от его импорта отсчитывается время запуска
+from profiler import profiler
+
+from PyQt6.QtCore import (
+    QObject,
+    QPoint,
+    QRunnable,
+    QSize,
+    QThreadPool,
+    QTimer,
+    Qt,
+    pyqtSignal,
+)
+from PyQt6.QtGui import QAction, QActionGroup
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QApplication,
+    QFileDialog,
+    QInputDialog,
+    QMainWindow,
+    QMessageBox,
+    QMenu,
+    QStyle,
+)
 
-from PyQt6.QtGui import QAction
-from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox, QMenu
-
-import dialogs
 from db import database
+from icons import IconLoader
+from launcher import LaunchSupervisor
+from models import CategoryModel, GameFilterProxyModel, GameListModel
+from sqltrace import query_tracer, traced
 from ui.mainWindow import Ui_MainWindow
 from utils import data_manager
 
+profiler.since_start("imports")
+
+SORT_MODE_TITLES = {
+    "name": "По названию",
+    "last_played": "По последнему запуску",
+    "play_count": "По числу запусков",
+    "added_at": "По дате добавления",
+    "install_size": "По размеру",
+}
+
+LAST_GAMES_LIMIT = 5
+SEARCH_DEBOUNCE_MS = 200
+SEARCH_LIMIT = 500
+FUZZY_SEARCH_LIMIT = 20
+ICON_SIZE = 24
+
+
+class SearchSignals(QObject):
+    finished = pyqtSignal(int, list)
+
+
+class SearchTask(QRunnable):
+    """Запрос к поиску в пуле потоков, чтобы не блокировать интерфейс."""
+
+    def __init__(self, generation: int, query: str):
+        super().__init__()
+        self.generation = generation
+        self.query = query
+        self.signals = SearchSignals()
+
+    def run(self):
+        try:
+            with query_tracer.action("search"):
+                games = database.search_games(self.query, SEARCH_LIMIT)
+                if not games:
+                    # Точных совпадений нет — возможно, в запросе опечатка
+                    games = database.fuzzy_search_games(
+                        self.query, FUZZY_SEARCH_LIMIT
+                    )
+        finally:
+            # Соединение потока пула закрывается вместе с задачей
+            database.connections.close_thread()
+        self.signals.finished.emit(
+            self.generation, [game[0] for game in games]
+        )
+
 
 def resource_path(relative_path: str) -> str:
     if hasattr(sys, "_MEIPASS"):
@@ -16,132 +89,458 @@ def resource_path(relative_path: str) -> str:
     return os.path.join(os.path.abspath("."), relative_path)
 
 
+@lru_cache(maxsize=None)
+def load_stylesheet(theme: str) -> str:
+    # Темы переключаются без чтения файла каждый раз
+    theme_file = resource_path(f"style/{theme}.qss")
+    with open(theme_file, "r", encoding="utf-8") as qss:
+        return qss.read()
+
+
+def close_database():
+    # Если окно закрыли до загрузки данных, база так и не открывалась
+    if database.is_created():
+        database.close()
+
+
 class QtLauncher(QMainWindow, Ui_MainWindow):
     def __init__(self):
-        super().__init__()
-        self.setFixedSize(750, 400)
-        self.setupUi(self)
+        with profiler.phase("setupUi"):
+            super().__init__()
+            self.setFixedSize(750, 400)
+            self.setupUi(self)
+
+        with profiler.phase("models"):
+            self.game_model = GameListModel(self)
+            self.game_proxy = GameFilterProxyModel(self)
+            self.game_proxy.setSourceModel(self.game_model)
+            self.list_games.setModel(self.game_proxy)
+
+            self.icon_loader = IconLoader(database, self)
+            self.game_model.set_icon_loader(
+                self.icon_loader,
+                self.style().standardIcon(QStyle.StandardPixmap.SP_FileIcon),
+            )
+            self.list_games.setIconSize(QSize(ICON_SIZE, ICON_SIZE))
+            self.list_games.setSelectionMode(
+                QAbstractItemView.SelectionMode.ExtendedSelection
+            )
+            self.list_games.setContextMenuPolicy(
+                Qt.ContextMenuPolicy.CustomContextMenu
+            )
+
+            # Общая модель категорий для меню и диалогов
+            self.category_model = CategoryModel(self)
+            self.category_actions = []
+            self.category_model.modelReset.connect(self._on_categories_reset)
+            self.category_model.rowsInserted.connect(
+                self._on_categories_inserted
+            )
+            self.category_model.rowsRemoved.connect(
+                self._on_categories_removed
+            )
+            self.category_model.dataChanged.connect(
+                self._on_categories_changed
+            )
 
-        self.profile_menu = QMenu(self)
+        with profiler.phase("menus"):
+            # Поиск запускается после паузы в наборе; устаревшие ответы
+            # отбрасываются по номеру запроса
+            self.search_generation = 0
+            self.search_timer = QTimer(self)
+            self.search_timer.setSingleShot(True)
+            self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+            self.search_timer.timeout.connect(self.run_search)
 
-        self.switch_user_action = QAction("Сменить пользователя", self)
-        self.switch_user_action.triggered.connect(self.switch_user)
-        self.profile_menu.addAction(self.switch_user_action)
+            self.profile_menu = QMenu(self)
 
-        self.profile_menu.addSeparator()
+            self.switch_user_action = QAction("Сменить пользователя", self)
+            self.switch_user_action.triggered.connect(self.switch_user)
+            self.profile_menu.addAction(self.switch_user_action)
 
-        self.logout_action = QAction("Выйти", self)
-        self.logout_action.triggered.connect(self.logout)
-        self.profile_menu.addAction(self.logout_action)
+            self.profile_menu.addSeparator()
 
-        self.profile_action = QAction("Профиль", self)
-        self.profile_action.triggered.connect(
-            lambda: self.open_dialog("profile")
-        )
-        self.profile_action.setMenu(self.profile_menu)
-        self.menuBar.addAction(self.profile_action)
+            self.logout_action = QAction("Выйти", self)
+            self.logout_action.triggered.connect(self.logout)
+            self.profile_menu.addAction(self.logout_action)
 
-        if not database.users.is_authenticated():
-            if not self.show_auth_dialog():
-                return
-        else:
+            self.profile_action = QAction("Профиль", self)
+            self.profile_action.triggered.connect(
+                lambda: self.open_dialog("profile")
+            )
+            self.profile_action.setMenu(self.profile_menu)
+            self.menuBar.addAction(self.profile_action)
+
+            self.launcher = LaunchSupervisor(database, self)
+            self.launcher.game_started.connect(self.on_game_started)
+            self.launcher.game_finished.connect(self.on_game_finished)
+            self.launcher.launch_failed.connect(self.on_launch_failed)
+
+            self.sort_mode, self.sort_reverse = data_manager.get_sort_mode()
+            self.sort_menu = QMenu("Сортировка", self)
+            self.sort_group = QActionGroup(self)
+            for mode, title in SORT_MODE_TITLES.items():
+                action = QAction(title, self)
+                action.setCheckable(True)
+                action.setChecked(mode == self.sort_mode)
+                action.triggered.connect(
+                    lambda checked, mode=mode: self.sort_games(mode=mode)
+                )
+                self.sort_group.addAction(action)
+                self.sort_menu.addAction(action)
+            self.menuBar.addAction(self.sort_menu.menuAction())
+
+            self.scan_thread = None
+            self.scan_added = 0
+            self.menu.addSeparator()
+            self.add_library_action = QAction(
+                "Добавить папку библиотеки...", self
+            )
+            self.add_library_action.triggered.connect(self.add_library_root)
+            self.menu.addAction(self.add_library_action)
+            self.scan_libraries_action = QAction(
+                "Сканировать библиотеки", self
+            )
+            self.scan_libraries_action.triggered.connect(self.scan_libraries)
+            self.menu.addAction(self.scan_libraries_action)
+            self.remove_missing_action = QAction(
+                "Удалить пропавшие игры", self
+            )
+            self.remove_missing_action.triggered.connect(
+                self.remove_missing_games
+            )
+            self.menu.addAction(self.remove_missing_action)
+
+            self.debug_menu = QMenu("Отладка", self)
+            self.sql_stats_action = QAction("Статистика SQL", self)
+            self.sql_stats_action.triggered.connect(self.show_sql_stats)
+            self.debug_menu.addAction(self.sql_stats_action)
+            self.sql_stats_reset_action = QAction(
+                "Сбросить статистику SQL", self
+            )
+            self.sql_stats_reset_action.triggered.connect(query_tracer.reset)
+            self.debug_menu.addAction(self.sql_stats_reset_action)
+            self.menuBar.addAction(self.debug_menu.menuAction())
+
+        with profiler.phase("stylesheet"):
+            self.setStyleSheet(load_stylesheet(data_manager.get_theme()))
+
+        with profiler.phase("signals"):
+            # Сигналы
+            self.add_game.clicked.connect(lambda: self.open_dialog("add_game"))
+            self.list_games.doubleClicked.connect(self.open_game)
+            self.list_games.customContextMenuRequested.connect(
+                self.show_games_menu
+            )
+            self.search_games.textChanged.connect(self.search_timer.start)
+            self.delete_game.clicked.connect(self.delete_game_from_list)
+            self.sort_name_a_z.clicked.connect(
+                lambda: self.sort_games(reverse=False)
+            )
+            self.sort_name_z_a.clicked.connect(
+                lambda: self.sort_games(reverse=True)
+            )
+            self.action_2.triggered.connect(lambda: self.set_theme("light"))
+            self.action_3.triggered.connect(lambda: self.set_theme("dark"))
+            self.create_category.triggered.connect(
+                lambda: self.open_dialog("add_category")
+            )
+            self.delete_category.triggered.connect(
+                lambda: self.open_dialog("delete_category")
+            )
+            self.edit_game.clicked.connect(
+                lambda: self.open_dialog("edit_game")
+            )
+
+        self.user_data_requested = False
+
+    def paintEvent(self, event):
+        if self.user_data_requested:
+            super().paintEvent(event)
+            return
+        with profiler.phase("first paint"):
+            super().paintEvent(event)
+        # База и список игр загружаются после первой отрисовки окна, чтобы
+        # окно появлялось сразу
+        self.user_data_requested = True
+        QTimer.singleShot(0, self.load_user_data)
+
+    @traced
+    def load_user_data(self):
+        try:
+            with profiler.phase("auth"):
+                authenticated = database.users.is_authenticated()
+            if not authenticated:
+                with profiler.phase("auth dialog"):
+                    if not self.show_auth_dialog():
+                        return
             self.update_profile_button()
+            with profiler.phase("update_game_list"):
+                self.update_game_list()
+            with profiler.phase("update_last_game_list"):
+                self.update_last_game_list()
+            with profiler.phase("update_categories"):
+                self.update_categories()
+            with profiler.phase("check_category_id_is_valid"):
+                database.check_category_id_is_valid()
+        finally:
+            profiler.finish()
+
+    def run_search(self):
+        self.search_generation += 1
+        query = self.search_games.text().strip()
+        if not query:
+            self.game_proxy.set_search_ids(None)
+            return
 
-        self.update_game_list()
-        self.update_last_game_list()
-        self.update_menu_bar()
-        database.check_category_id_is_valid()
+        task = SearchTask(self.search_generation, query)
+        task.signals.finished.connect(self.on_search_finished)
+        QThreadPool.globalInstance().start(task)
 
-        theme_file = resource_path(f"style/{data_manager.get_theme()}.qss")
-        with open(theme_file, "r", encoding="utf-8") as qss:
-            self.setStyleSheet(qss.read())
-
-        # Сигналы
-        self.add_game.clicked.connect(lambda: self.open_dialog("add_game"))
-        self.list_games.itemDoubleClicked.connect(self.open_game)
-        self.delete_game.clicked.connect(self.delete_game_from_list)
-        self.sort_name_a_z.clicked.connect(lambda: self.sort_games(""))
-        self.sort_name_z_a.clicked.connect(lambda: self.sort_games("r"))
-        self.action_2.triggered.connect(lambda: self.set_theme("light"))
-        self.action_3.triggered.connect(lambda: self.set_theme("dark"))
-        self.create_category.triggered.connect(
-            lambda: self.open_dialog("add_category")
-        )
-        self.delete_category.triggered.connect(
-            lambda: self.open_dialog("delete_category")
-        )
-        self.edit_game.clicked.connect(lambda: self.open_dialog("edit_game"))
+    @traced
+    def on_search_finished(self, generation, game_ids):
+        if generation != self.search_generation:
+            return
+        self.game_proxy.set_search_ids(game_ids)
 
+    @traced
     def set_theme(self, theme):
-        theme_file = resource_path(f"style/{theme}.qss")
-        with open(theme_file, "r", encoding="utf-8") as qss:
-            self.setStyleSheet(qss.read())
-        data_manager.update_setting("theme", theme)
+        self.setStyleSheet(load_stylesheet(theme))
+        data_manager.set_theme(theme)
 
+    @traced
     def update_game_list(self):
-        games = database.get_games()
-        self.list_games.clear()
-        for game in games:
-            self.list_games.addItem(game)
+        self.game_model.set_games(database.get_all_games())
+        self.apply_sort()
 
     def update_last_game_list(self):
-        games = data_manager.get_last_games()
+        games = database.get_last_games(LAST_GAMES_LIMIT)
         self.last_games.clear()
         for game in games:
             self.last_games.addItem(game)
 
-    def sort_games(self, mode):
-        items = []
-        for i in range(self.list_games.count()):
-            items.append(self.list_games.item(i).text())
+    @traced
+    def sort_games(self, mode=None, reverse=None):
+        if mode is None or mode == self.sort_mode:
+            if reverse is None or reverse == self.sort_reverse:
+                return
+            # Обратный порядок того же режима — это тот же список
+            # задом наперёд, база для него не нужна
+            self.sort_reverse = reverse
+            self.game_model.reverse_order()
+        else:
+            self.sort_mode = mode
+            if reverse is not None:
+                self.sort_reverse = reverse
+            self.apply_sort()
+        data_manager.set_sort_mode(self.sort_mode, self.sort_reverse)
+
+    def apply_sort(self):
+        # Порядок строк задаёт исходная модель по id из индекса базы;
+        # прокси только фильтрует
+        self.game_model.set_order(
+            database.get_game_order(self.sort_mode, self.sort_reverse)
+        )
 
-        sorted_items = sorted(items, reverse=(mode == "r"))
+    def current_game(self):
+        index = self.list_games.currentIndex()
+        if not index.isValid():
+            return None
+        return self.game_proxy.game_at(index)
+
+    def selected_games(self):
+        games = [
+            self.game_proxy.game_at(index)
+            for index in self.list_games.selectionModel().selectedIndexes()
+        ]
+        if not games:
+            game = self.current_game()
+            if game:
+                games = [game]
+        return games
+
+    @traced
+    def delete_game_from_list(self):
+        games = self.selected_games()
+        if len(games) > 1:
+            answer = QMessageBox.question(
+                self, "Удаление игр", f"Удалить выбранные игры: {len(games)}?"
+            )
+            if answer != QMessageBox.StandardButton.Yes:
+                return
+        self.remove_games(games)
 
-        self.list_games.clear()
-        for game_name in sorted_items:
-            self.list_games.addItem(game_name)
+    def remove_games(self, games):
+        deleted = database.delete_games([game[0] for game in games])
+        if not deleted:
+            return
+        self.list_games.clearSelection()
+        self.game_model.remove_games([game[0] for game in deleted])
+        self.category_model.remove_games(deleted)
+        self.update_last_game_list()
 
-    def delete_game_from_list(self):
-        current_item = self.list_games.currentItem()
-        if current_item:
-            game_name = current_item.text()
-            database.delete(
-                select_from="Games", where_value="name", parameter=game_name
+    @traced
+    def remove_missing_games(self):
+        games = self.game_model.missing_games()
+        if not games:
+            QMessageBox.information(
+                self, "Пропавшие игры", "Пропавших игр нет"
             )
-            current_row = self.list_games.currentRow()
-            self.list_games.takeItem(current_row)
-            self.list_games.clearSelection()
+            return
+        answer = QMessageBox.question(
+            self,
+            "Пропавшие игры",
+            f"Удалить из библиотеки пропавшие игры: {len(games)}?",
+        )
+        if answer == QMessageBox.StandardButton.Yes:
+            self.remove_games(games)
+
+    def show_games_menu(self, pos: QPoint):
+        games = self.selected_games()
+        if not games:
+            return
+        menu = QMenu(self)
+        move_menu = menu.addMenu("Переместить в категорию")
+        for row in range(self.category_model.rowCount()):
+            index = self.category_model.index(row)
+            category_id = index.data(CategoryModel.CategoryIdRole)
+            action = move_menu.addAction(index.data())
+            action.triggered.connect(
+                lambda checked, category_id=category_id: self.move_games(
+                    games, category_id
+                )
+            )
+        menu.addAction("Переименовать по шаблону...").triggered.connect(
+            lambda: self.rename_games(games)
+        )
+        menu.addSeparator()
+        menu.addAction("Удалить").triggered.connect(
+            self.delete_game_from_list
+        )
+        menu.exec(self.list_games.viewport().mapToGlobal(pos))
+
+    @traced
+    def move_games(self, games, category_id):
+        moved = database.move_games([game[0] for game in games], category_id)
+        if not moved:
+            return
+        self.game_model.update_games(moved)
+        moved_ids = {game[0] for game in moved}
+        self.category_model.remove_games(
+            [game for game in games if game[0] in moved_ids]
+        )
+        self.category_model.add_games(moved)
+
+    @traced
+    def rename_games(self, games):
+        pattern, ok = QInputDialog.getText(
+            self,
+            "Переименование",
+            "Что заменить (регулярное выражение):",
+        )
+        if not ok or not pattern:
+            return
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            QMessageBox.warning(self, "Ошибка", f"Неверный шаблон: {e}")
+            return
+        replacement, ok = QInputDialog.getText(
+            self, "Переименование", "На что заменить:"
+        )
+        if not ok:
+            return
 
-    def open_game(self, item):
-        game = database.get_game(item.text())
         try:
-            data_manager.add_game_to_history(game[1])
-            os.startfile(game[2])
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка!", str(e))
+            renamed, conflicts = database.rename_games(
+                [game[0] for game in games], pattern, replacement
+            )
+        except re.error as e:
+            QMessageBox.warning(self, "Ошибка", f"Неверная замена: {e}")
+            return
+        if renamed:
+            self.game_model.update_games(renamed)
+            self.apply_sort()
+        message = f"Переименовано игр: {len(renamed)}"
+        if conflicts:
+            details = "\n".join(
+                f"{old} → {new}: {reason}"
+                for old, new, reason in conflicts[:10]
+            )
+            if len(conflicts) > 10:
+                details += f"\n... и ещё {len(conflicts) - 10}"
+            message += f"\nПропущено: {len(conflicts)}\n{details}"
+        QMessageBox.information(self, "Переименование", message)
+
+    @traced
+    def open_game(self, index):
+        game = self.game_proxy.game_at(index)
+        if not self.launcher.launch(game):
+            self.statusbar.showMessage(f"«{game[1]}» уже запущена", 5000)
+
+    @traced
+    def on_game_started(self, game_id):
+        self.game_model.set_running(game_id, True)
+        game = database.get_game_by_id(game_id)
+        if game is not None:
+            self.game_model.update_game(game)
+        if self.sort_mode in ("last_played", "play_count"):
+            self.apply_sort()
         self.update_last_game_list()
 
+    def on_game_finished(self, game_id, exit_code):
+        self.game_model.set_running(game_id, False)
+
+    def on_launch_failed(self, game_id, error):
+        QMessageBox.warning(self, "Ошибка!", error)
+
     def open_dialog(self, dialog):
+        with query_tracer.action(f"open_dialog:{dialog}"):
+            self._open_dialog(dialog)
+
+    def _open_dialog(self, dialog):
+        import dialogs
+
         if dialog == "add_game":
-            _dialog = dialogs.AddGameDialog()
-            _dialog.exec()
-            self.update_game_list()
+            _dialog = dialogs.AddGameDialog(self.category_model)
+            if _dialog.exec():
+                self.game_model.add_games(_dialog.added_games)
+                self.category_model.add_games(_dialog.added_games)
+                self.apply_sort()
         if dialog == "add_category":
             _dialog = dialogs.AddCategoryDialog()
-            _dialog.exec()
-            self.update_menu_bar()
+            if _dialog.exec():
+                self.category_model.add_category(
+                    _dialog.category_id, _dialog.category_name
+                )
         if dialog == "delete_category":
-            _dialog = dialogs.DeleteCategoryDialog()
-            _dialog.exec()
-            self.update_game_list()
-            self.update_menu_bar()
+            _dialog = dialogs.DeleteCategoryDialog(self.category_model)
+            if _dialog.exec():
+                self.category_model.remove_category(
+                    _dialog.category_id, _dialog.moved_to
+                )
+                if _dialog.moved_games:
+                    self.game_model.move_category(
+                        _dialog.category_id, _dialog.moved_to
+                    )
+                if self.game_proxy.category() == _dialog.category_id:
+                    self.game_proxy.set_category(None)
         if dialog == "edit_game":
-            current_item = self.list_games.currentItem()
-            if current_item:
-                game_name = current_item.text()
-                _dialog = dialogs.EditGameDialog(game_name)
-                _dialog.exec()
-                self.update_game_list()
+            current_game = self.current_game()
+            if current_game:
+                _dialog = dialogs.EditGameDialog(
+                    current_game[1], self.category_model
+                )
+                if _dialog.exec():
+                    game = database.get_game(
+                        _dialog.game_name.text().strip()
+                    )
+                    if game:
+                        self.game_model.update_game(game)
+                        self.category_model.move_games(
+                            current_game[3], game[3]
+                        )
+                        self.apply_sort()
         if dialog == "profile":
             if not database.users.is_authenticated():
                 self.show_auth_dialog()
@@ -152,7 +551,116 @@ class QtLauncher(QMainWindow, Ui_MainWindow):
                     f"Вы вошли как: {database.users.get_current_user_login()}",
                 )
 
+    @traced
+    def add_library_root(self):
+        folder = QFileDialog.getExistingDirectory(
+            self, "Выбрать папку библиотеки"
+        )
+        if not folder:
+            return
+
+        roots = data_manager.get_library_roots()
+        if folder not in roots:
+            roots.append(folder)
+            data_manager.set_library_roots(roots)
+        self.scan_libraries()
+
+    @traced
+    def scan_libraries(self):
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            return
+
+        roots = data_manager.get_library_roots()
+        if not roots:
+            QMessageBox.information(
+                self, "Сканирование", "Сначала добавьте папку библиотеки"
+            )
+            return
+
+        from scanner import ScanThread
+
+        self.scan_added = 0
+        self.scan_thread = ScanThread(roots, database, parent=self)
+        self.scan_thread.found.connect(self.on_games_found)
+        self.scan_thread.scan_finished.connect(self.on_scan_finished)
+        self.statusbar.showMessage("Сканирование библиотек...")
+        self.scan_thread.start()
+
+    @traced
+    def on_games_found(self, candidates):
+        # Находки сканирования, остановленного при смене пользователя
+        if self.sender() is not self.scan_thread:
+            return
+        # Уже добавленные игры вернутся как конфликты и будут пропущены
+        inserted, _conflicts = database.insert_games_bulk(
+            (candidate.name, candidate.path, "Все") for candidate in candidates
+        )
+        self.game_model.add_games(inserted)
+        self.category_model.add_games(inserted)
+        self.scan_added += len(inserted)
+
+        # Файл мог вернуться на место после того, как игру пометили пропавшей
+        for game in database.set_games_missing(
+            (candidate.path for candidate in candidates), False
+        ):
+            self.game_model.update_game(game)
+        self.statusbar.showMessage(
+            f"Сканирование библиотек... добавлено игр: {self.scan_added}"
+        )
+
+    @traced
+    def on_scan_finished(self, stats):
+        if self.sender() is not self.scan_thread:
+            return
+        scanner = self.scan_thread.scanner
+        # Индекс сохраняется только теперь, когда найденные игры уже
+        # добавлены: сигналы found пришли раньше. Файлы, которые добавить
+        # не удалось, следующее сканирование предложит снова — их нет
+        # среди путей игр пользователя.
+        if not scanner.cancelled:
+            database.save_scan_state(
+                scanner.changed_state, scanner.removed_paths
+            )
+        missing = database.set_games_missing(stats.removed_files, True)
+        for game in missing:
+            self.game_model.update_game(game)
+        # Во время сканирования новые игры добавлялись в конец списка
+        if self.scan_added:
+            self.apply_sort()
+
+        self.statusbar.showMessage(
+            f"Сканирование завершено: добавлено игр {self.scan_added}, "
+            f"пропало {len(missing)}, просмотрено файлов {stats.files} "
+            f"за {stats.elapsed:.2f} с",
+            10000,
+        )
+
+    def stop_scan(self):
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            self.scan_thread.cancel()
+            self.scan_thread.wait()
+        self.scan_thread = None
+
+    def closeEvent(self, event):
+        running = len(self.launcher.running_games())
+        if running:
+            answer = QMessageBox.question(
+                self,
+                "Запущенные игры",
+                f"Запущено игр: {running}. Закрыть лаунчер и завершить их?",
+            )
+            if answer != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+            self.launcher.shutdown()
+        self.stop_scan()
+        self.icon_loader.shutdown()
+        data_manager.flush()
+        super().closeEvent(event)
+
     def show_auth_dialog(self):
+        import dialogs
+
         _dialog = dialogs.ProfileDialog()
         result = _dialog.exec()
 
@@ -171,15 +679,27 @@ class QtLauncher(QMainWindow, Ui_MainWindow):
         else:
             self.profile_action.setText("Войти")
 
+    @traced
     def reload_user_data(self):
+        # Фильтры прокси хранят id категории и игр прежнего пользователя,
+        # а незавершённый поиск не должен применить его результаты.
+        # Сканирование тоже шло для прежнего пользователя.
+        self.stop_scan()
+        self.search_timer.stop()
+        self.search_generation += 1
+        self.search_games.blockSignals(True)
+        self.search_games.clear()
+        self.search_games.blockSignals(False)
+        self.game_proxy.set_category(None)
+        self.game_proxy.set_search_ids(None)
         self.update_profile_button()
-        self.list_games.clear()
         self.last_games.clear()
         self.update_game_list()
         self.update_last_game_list()
-        self.update_menu_bar()
+        self.update_categories()
         database.check_category_id_is_valid()
 
+    @traced
     def switch_user(self):
         database.users.logout()
         if self.show_auth_dialog():
@@ -188,6 +708,7 @@ class QtLauncher(QMainWindow, Ui_MainWindow):
             # Если пользователь отменил вход, выходим из приложения
             self.close()
 
+    @traced
     def logout(self):
         reply = QMessageBox.question(
             self,
@@ -211,63 +732,85 @@ class QtLauncher(QMainWindow, Ui_MainWindow):
         elif reply == 1:  # Сменить пользователя
             self.switch_user()
 
-    def update_menu_bar(self):
-        menu = self.menu_3
-        actions = menu.actions()
+    def show_sql_stats(self):
+        report = query_tracer.report()
+        QMessageBox.information(self, "Статистика SQL", report)
 
-        separator_index = -1
-        for i, action in enumerate(actions):
-            if action.isSeparator():
-                separator_index = i
-                break
+    def update_categories(self):
+        self.category_model.set_categories(database.get_category_counts())
 
-        if separator_index != -1:
-            for action in actions[separator_index + 1 :]:
-                menu.removeAction(action)
+    def _category_action(self, row):
+        index = self.category_model.index(row)
+        name = index.data()
+        action = QAction(self)
+        action.triggered.connect(
+            lambda checked, cat_name=name: self.on_category_selected(cat_name)
+        )
+        self._set_category_text(action, index)
+        return action
+
+    @staticmethod
+    def _set_category_text(action, index):
+        count = index.data(CategoryModel.GameCountRole)
+        action.setText(f"{index.data()} ({count})")
+
+    def _on_categories_reset(self):
+        for action in self.category_actions:
+            self.menu_3.removeAction(action)
+            action.deleteLater()
+        self.category_actions = []
+        self._on_categories_inserted(
+            None, 0, self.category_model.rowCount() - 1
+        )
 
-        categories = database.get_categories()
-        for category in categories:
-            category_name = category[0]
-            action = QAction(category_name, self)
-            action.triggered.connect(
-                lambda checked, cat_name=category_name: self.on_category_selected(
-                    cat_name
-                )
+    def _on_categories_inserted(self, _parent, first, last):
+        before = (
+            self.category_actions[first]
+            if first < len(self.category_actions)
+            else None
+        )
+        for row in range(first, last + 1):
+            action = self._category_action(row)
+            self.menu_3.insertAction(before, action)
+            self.category_actions.insert(row, action)
+
+    def _on_categories_removed(self, _parent, first, last):
+        for action in self.category_actions[first : last + 1]:
+            self.menu_3.removeAction(action)
+            action.deleteLater()
+        del self.category_actions[first : last + 1]
+
+    def _on_categories_changed(self, top_left, bottom_right, _roles=()):
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            self._set_category_text(
+                self.category_actions[row], self.category_model.index(row)
             )
-            menu.addAction(action)
 
     def on_category_selected(self, category_name):
         self.filter_games_by_category(category_name)
 
+    @traced
     def filter_games_by_category(self, category_name):
         if not database.users.is_authenticated():
             return
 
-        self.list_games.clear()
-
         if category_name == "Все":
             # Показываем все игры пользователя
-            self.update_game_list()
+            self.game_proxy.set_category(None)
             return
 
         category_id = database.get_category_id_by_name(category_name)
         if category_id:
             # Показываем игры только из выбранной категории
-            conn = database.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT name FROM Games WHERE category_id = ? AND user_id = ?",
-                (category_id, database.users.get_current_user_id()),
-            )
-            games = cursor.fetchall()
-            conn.close()
-
-            for game in games:
-                self.list_games.addItem(game[0])
+            self.game_proxy.set_category(category_id)
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    argv = profiler.configure(sys.argv)
+    with profiler.phase("QApplication"):
+        app = QApplication(argv)
+    app.aboutToQuit.connect(close_database)
     wind = QtLauncher()
-    wind.show()
+    with profiler.phase("show"):
+        wind.show()
     sys.exit(app.exec())
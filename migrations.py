@@ -0,0 +1,500 @@
+"""Версионированные миграции схемы ``games.db``.
+
+Текущая версия схемы хранится в ``PRAGMA user_version``. Каждая миграция
+выполняется в отдельной транзакции, поэтому существующая база обновляется
+на месте и никогда не остаётся в промежуточном состоянии.
+"""
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from fuzzy import collation_key
+
+
+def _create_base_tables(conn: sqlite3.Connection):
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS Categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        UNIQUE(name, user_id),
+        FOREIGN KEY (user_id) REFERENCES Users (id)
+        )"""
+    )
+
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS Games (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        path TEXT NOT NULL UNIQUE,
+        category_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        FOREIGN KEY (category_id) REFERENCES Categories(id),
+        FOREIGN KEY (user_id) REFERENCES Users(id)
+        )"""
+    )
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        login TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL
+        )"""
+    )
+
+
+def _per_user_unique_and_indexes(conn: sqlite3.Connection):
+    # Глобальные UNIQUE на name и path не дают двум пользователям добавить
+    # одну и ту же игру. SQLite не умеет менять ограничения, поэтому
+    # таблица пересоздаётся.
+    conn.execute(
+        """CREATE TABLE Games_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        path TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        UNIQUE(user_id, name),
+        UNIQUE(user_id, path),
+        FOREIGN KEY (category_id) REFERENCES Categories(id),
+        FOREIGN KEY (user_id) REFERENCES Users(id)
+        )"""
+    )
+    conn.execute(
+        """INSERT INTO Games_new (id, name, path, category_id, user_id)
+        SELECT id, name, path, category_id, user_id FROM Games"""
+    )
+    conn.execute("DROP TABLE Games")
+    conn.execute("ALTER TABLE Games_new RENAME TO Games")
+
+    # get_category_counts / move_games / delete_category
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_games_user_category "
+        "ON Games(user_id, category_id)"
+    )
+    # get_category_counts / get_category_id_by_name: id входит в индекс как rowid
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_categories_user_name "
+        "ON Categories(user_id, name)"
+    )
+
+
+def _scan_state(conn: sqlite3.Connection):
+    # Индекс файловой системы для инкрементального сканирования библиотек.
+    # Общий для всех пользователей: файлы на диске одни и те же.
+    conn.execute(
+        """CREATE TABLE ScanState (
+        path TEXT PRIMARY KEY,
+        parent TEXT,
+        is_dir INTEGER NOT NULL,
+        inode INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL
+        ) WITHOUT ROWID"""
+    )
+    conn.execute(
+        "ALTER TABLE Games ADD COLUMN missing INTEGER NOT NULL DEFAULT 0"
+    )
+    conn.execute("CREATE INDEX idx_games_path ON Games(path)")
+
+
+GAMES_FTS_INSERT_TRIGGER = """CREATE TRIGGER games_fts_insert
+AFTER INSERT ON Games BEGIN
+INSERT INTO GamesFts (rowid, name, user_id)
+VALUES (new.id, new.name, new.user_id);
+END"""
+
+
+def _games_fts(conn: sqlite3.Connection):
+    # user_id индексируется как отдельный токен, чтобы отбор по владельцу
+    # выполнялся внутри полнотекстового индекса. Сборка SQLite без FTS5
+    # встречается редко; поиск тогда работает через LIKE.
+    try:
+        conn.execute(
+            """CREATE VIRTUAL TABLE GamesFts USING fts5(
+            name,
+            user_id,
+            content='Games',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+            )"""
+        )
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        return
+
+    conn.execute(GAMES_FTS_INSERT_TRIGGER)
+    conn.execute(
+        """CREATE TRIGGER games_fts_delete AFTER DELETE ON Games BEGIN
+        INSERT INTO GamesFts (GamesFts, rowid, name, user_id)
+        VALUES ('delete', old.id, old.name, old.user_id);
+        END"""
+    )
+    conn.execute(
+        """CREATE TRIGGER games_fts_update AFTER UPDATE OF name ON Games BEGIN
+        INSERT INTO GamesFts (GamesFts, rowid, name, user_id)
+        VALUES ('delete', old.id, old.name, old.user_id);
+        INSERT INTO GamesFts (rowid, name, user_id)
+        VALUES (new.id, new.name, new.user_id);
+        END"""
+    )
+    conn.execute("INSERT INTO GamesFts (GamesFts) VALUES ('rebuild')")
+
+
+def file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+# Ключи сортировки списка игр. Каждому режиму соответствует индекс, из
+# которого SQLite читает id уже в нужном порядке, в том числе в обратном.
+SORT_INDEXES = {
+    "idx_games_sort_name": "user_id, sort_name",
+    "idx_games_last_played": "user_id, last_played DESC, sort_name",
+    "idx_games_play_count": "user_id, play_count DESC, sort_name",
+    "idx_games_added_at": "user_id, added_at DESC, sort_name",
+    "idx_games_install_size": "user_id, install_size DESC, sort_name",
+}
+
+
+def _sort_keys(conn: sqlite3.Connection):
+    conn.execute(
+        "ALTER TABLE Games ADD COLUMN sort_name TEXT NOT NULL DEFAULT ''"
+    )
+    conn.execute(
+        "ALTER TABLE Games ADD COLUMN added_at INTEGER NOT NULL DEFAULT 0"
+    )
+    conn.execute("ALTER TABLE Games ADD COLUMN last_played INTEGER")
+    conn.execute(
+        "ALTER TABLE Games ADD COLUMN play_count INTEGER NOT NULL DEFAULT 0"
+    )
+    conn.execute(
+        "ALTER TABLE Games ADD COLUMN install_size INTEGER NOT NULL DEFAULT 0"
+    )
+    # Дата добавления старых игр неизвестна; берём время миграции
+    now = int(time.time())
+    conn.executemany(
+        """UPDATE Games SET sort_name = ?, added_at = ?, install_size = ?
+        WHERE id = ?""",
+        [
+            (collation_key(name), now, file_size(path), game_id)
+            for game_id, name, path in conn.execute(
+                "SELECT id, name, path FROM Games"
+            ).fetchall()
+        ],
+    )
+    for name, columns in SORT_INDEXES.items():
+        conn.execute(f"CREATE INDEX {name} ON Games({columns})")
+
+
+def _play_sessions(conn: sqlite3.Connection):
+    # Журнал запусков только пополняется. Последние запущенные игры
+    # читаются из Games.last_played (индекс idx_games_last_played),
+    # который обновляется в одной транзакции с добавлением сессии.
+    conn.execute(
+        """CREATE TABLE PlaySessions (
+        id INTEGER PRIMARY KEY,
+        game_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        started_at INTEGER NOT NULL,
+        ended_at INTEGER,
+        FOREIGN KEY (game_id) REFERENCES Games(id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES Users(id)
+        )"""
+    )
+    conn.execute(
+        "CREATE INDEX idx_play_sessions_user_started "
+        "ON PlaySessions(user_id, started_at DESC)"
+    )
+    conn.execute(
+        "CREATE INDEX idx_play_sessions_game ON PlaySessions(game_id)"
+    )
+
+
+def _import_history_files(conn: sqlite3.Connection, data_path: Path):
+    # До PlaySessions история хранилась в user_<id>/last_games.txt:
+    # до пяти названий, последняя запущенная игра — первой. Время
+    # запусков неизвестно, поэтому отсчитываем его от времени изменения
+    # файла, сохраняя порядок. Сами файлы больше не читаются.
+    if not data_path.is_dir():
+        return
+    for path in data_path.glob("user_*/last_games.txt"):
+        try:
+            user_id = int(path.parent.name.removeprefix("user_"))
+            names = path.read_text(encoding="utf-8").splitlines()
+            modified = int(path.stat().st_mtime)
+        except (ValueError, OSError):
+            continue
+        names = [name.strip() for name in names if name.strip()]
+        for position, name in enumerate(names):
+            game = conn.execute(
+                "SELECT id FROM Games WHERE user_id = ? AND name = ?",
+                (user_id, name),
+            ).fetchone()
+            if game is None:
+                continue
+            started_at = modified - position
+            conn.execute(
+                """INSERT INTO PlaySessions (game_id, user_id, started_at)
+                VALUES (?, ?, ?)""",
+                (game[0], user_id, started_at),
+            )
+            # Запуски после появления last_played уже учтены в Games
+            conn.execute(
+                """UPDATE Games SET
+                last_played = COALESCE(last_played, ?),
+                play_count = MAX(play_count, 1)
+                WHERE id = ?""",
+                (started_at, game[0]),
+            )
+
+
+def _launch_backend(conn: sqlite3.Connection):
+    # Способ запуска (backends.BACKENDS) определяется при первом запуске
+    # игры; NULL — ещё не определён
+    conn.execute("ALTER TABLE Games ADD COLUMN launch_backend TEXT")
+
+
+def _thumbnail_index(conn: sqlite3.Connection):
+    # Ключ — хэш пути, размера и времени изменения файла игры, значение —
+    # sha256 миниатюры в thumbnails/ ('' — у файла нет иконки). Изменённый
+    # файл получает новый ключ, а старые строки удаляются вместе с
+    # вытесненными миниатюрами.
+    conn.execute(
+        """CREATE TABLE ThumbnailIndex (
+        source_key TEXT PRIMARY KEY,
+        digest TEXT NOT NULL
+        ) WITHOUT ROWID"""
+    )
+    conn.execute("CREATE INDEX idx_thumbnail_digest ON ThumbnailIndex(digest)")
+
+
+# Игры, чья категория удалена или принадлежит другому пользователю,
+# переносятся во «Все» своего пользователя одним UPDATE. Игры без
+# «Все» (пользователь удалён) не трогаются: им некуда переехать.
+REPAIR_CATEGORIES_SQL = """UPDATE Games SET category_id = (
+        SELECT c.id FROM Categories c
+        WHERE c.user_id = Games.user_id AND c.name = 'Все'
+    )
+    WHERE NOT EXISTS (
+        SELECT 1 FROM Categories c
+        WHERE c.id = Games.category_id AND c.user_id = Games.user_id
+    )
+    AND EXISTS (
+        SELECT 1 FROM Categories c
+        WHERE c.user_id = Games.user_id AND c.name = 'Все'
+    )"""
+
+CATEGORY_INTEGRITY_KEY = "category_integrity"
+
+
+def repair_categories(conn: sqlite3.Connection) -> int:
+    """Чинит категории игр и отмечает базу согласованной.
+
+    Возвращает число перенесённых игр. Вызывается внутри транзакции.
+    """
+    conn.execute(
+        "INSERT OR IGNORE INTO Categories (name, user_id) "
+        "SELECT 'Все', id FROM Users"
+    )
+    repaired = conn.execute(REPAIR_CATEGORIES_SQL).rowcount
+    conn.execute(
+        "INSERT OR REPLACE INTO Meta (key, value) VALUES (?, 1)",
+        (CATEGORY_INTEGRITY_KEY,),
+    )
+    return repaired
+
+
+def _category_integrity(conn: sqlite3.Connection):
+    # SQLite не умеет ON DELETE SET DEFAULT со значением «своя „Все“ для
+    # каждого пользователя», поэтому перенос делает триггер. Он же
+    # срабатывает и в старых версиях лаунчера, которые не включают
+    # PRAGMA foreign_keys.
+    conn.execute(
+        """CREATE TABLE Meta (
+        key TEXT PRIMARY KEY,
+        value
+        ) WITHOUT ROWID"""
+    )
+    conn.execute(
+        """CREATE TRIGGER categories_keep_all
+        BEFORE DELETE ON Categories WHEN OLD.name = 'Все'
+        BEGIN
+            SELECT RAISE(ABORT, 'категорию «Все» удалить нельзя');
+        END"""
+    )
+    conn.execute(
+        """CREATE TRIGGER categories_reassign_games
+        BEFORE DELETE ON Categories
+        BEGIN
+            UPDATE Games SET category_id = (
+                SELECT id FROM Categories
+                WHERE user_id = OLD.user_id AND name = 'Все'
+            )
+            WHERE user_id = OLD.user_id AND category_id = OLD.id;
+        END"""
+    )
+    # Внешний ключ проверяет только, что категория существует. Чужую
+    # категорию (или любую, если ключи выключены) отмечаем в Meta, и
+    # следующий запуск починит её в check_category_id_is_valid.
+    for name, event in (
+        ("insert", "INSERT"),
+        ("update", "UPDATE OF category_id, user_id"),
+    ):
+        conn.execute(
+            f"""CREATE TRIGGER games_category_{name}
+            AFTER {event} ON Games
+            WHEN NOT EXISTS (
+                SELECT 1 FROM Categories
+                WHERE id = NEW.category_id AND user_id = NEW.user_id
+            )
+            BEGIN
+                UPDATE Meta SET value = 0
+                WHERE key = '{CATEGORY_INTEGRITY_KEY}';
+            END"""
+        )
+    # Сами ссылки чинит migrate() после последней миграции
+
+
+GAMES_VERSION_KEY = "games_version"
+
+
+def _games_version(conn: sqlite3.Connection):
+    # PRAGMA data_version меняется от любой чужой записи, в том числе
+    # ScanState и ThumbnailIndex из фоновых потоков. Счётчик меняется
+    # только вместе с Games, и каталог в памяти сбрасывается по нему.
+    conn.execute(
+        "INSERT INTO Meta (key, value) VALUES (?, 0)", (GAMES_VERSION_KEY,)
+    )
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(
+            f"""CREATE TRIGGER games_version_{event.lower()}
+            AFTER {event} ON Games
+            BEGIN
+                UPDATE Meta SET value = value + 1
+                WHERE key = '{GAMES_VERSION_KEY}';
+            END"""
+        )
+
+
+def _scan_state_per_user(conn: sqlite3.Connection):
+    # Индекс файлов решает, какие файлы предложить в библиотеку, а
+    # библиотеки у пользователей свои: с общим индексом второй
+    # пользователь не находил игр в папке, которую уже обошёл первый.
+    # Старый индекс не переносится — его записи ничьи, и следующее
+    # сканирование просто прочитает папки заново.
+    conn.execute("DROP TABLE ScanState")
+    conn.execute(
+        """CREATE TABLE ScanState (
+        user_id INTEGER NOT NULL,
+        path TEXT NOT NULL,
+        parent TEXT,
+        is_dir INTEGER NOT NULL,
+        inode INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        PRIMARY KEY (user_id, path),
+        FOREIGN KEY (user_id) REFERENCES Users(id)
+        ) WITHOUT ROWID"""
+    )
+
+
+def _games_category_index(conn: sqlite3.Connection):
+    # С включёнными внешними ключами удаление категории ищет игры, которые
+    # на неё ссылаются, по одному category_id. Индекс (user_id,
+    # category_id) для этого пришлось бы просмотреть целиком.
+    conn.execute("CREATE INDEX idx_games_category ON Games(category_id)")
+
+
+MIGRATIONS = [
+    _create_base_tables,
+    _per_user_unique_and_indexes,
+    _scan_state,
+    _games_fts,
+    _sort_keys,
+    _play_sessions,
+    _launch_backend,
+    _thumbnail_index,
+    _category_integrity,
+    _games_version,
+    _scan_state_per_user,
+    _games_category_index,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def has_table(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (name,),
+    ).fetchone()
+    return row is not None
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def games_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute(
+        "SELECT value FROM Meta WHERE key = ?", (GAMES_VERSION_KEY,)
+    ).fetchone()
+    return row[0] if row is not None else 0
+
+
+def check_foreign_keys(conn: sqlite3.Connection):
+    """Поднимает ``IntegrityError``, если в базе есть висячие ссылки."""
+    violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+    if violations:
+        table, rowid, parent, _ = violations[0]
+        raise sqlite3.IntegrityError(
+            f"нарушено {len(violations)} внешних ключей, например "
+            f"{table}.rowid={rowid} -> {parent}"
+        )
+
+
+def migrate(conn: sqlite3.Connection, data_path: Path | None = None) -> int:
+    """Доводит схему до ``SCHEMA_VERSION`` и возвращает итоговую версию.
+
+    Соединение должно работать в режиме autocommit (``isolation_level=None``).
+    ``data_path`` — папка данных, из которой переносится старая история
+    запусков; без неё история не переносится.
+    """
+    if get_version(conn) >= SCHEMA_VERSION:
+        return get_version(conn)
+    # Порядок из документации SQLite для пересоздания таблиц: старая база
+    # может ссылаться на удалённые категории, и с включёнными ключами
+    # INSERT ... SELECT при пересоздании Games упал бы. Ключи выключаются
+    # вне транзакции, после миграций ссылки чинятся и проверяются.
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for target, migration in enumerate(MIGRATIONS, start=1):
+            if get_version(conn) >= target:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Другой экземпляр лаунчера мог успеть обновить базу
+                if get_version(conn) < target:
+                    migration(conn)
+                    if migration is _play_sessions and data_path is not None:
+                        _import_history_files(conn, data_path)
+                    conn.execute(f"PRAGMA user_version = {target}")
+                if target == SCHEMA_VERSION:
+                    repair_categories(conn)
+                    check_foreign_keys(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+    return get_version(conn)
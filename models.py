@@ -0,0 +1,471 @@
+from functools import lru_cache
+
+from PyQt6.QtCore import (
+    QAbstractItemModel,
+    QAbstractListModel,
+    QModelIndex,
+    QSortFilterProxyModel,
+    Qt,
+)
+from PyQt6.QtGui import QColor, QFont
+
+VERTICAL_SORT = QAbstractItemModel.LayoutChangeHint.VerticalSortHint
+PERSISTENT_SCAN_LIMIT = 8
+# Сколько отдельных диапазонов строк удалять сигналами rowsRemoved;
+# при большем разбросе дешевле сбросить модель целиком
+REMOVE_RANGES_LIMIT = 32
+
+
+@lru_cache(maxsize=None)
+def missing_color() -> QColor:
+    # Первый QColor обходится в десятки миллисекунд, поэтому он создаётся
+    # не при импорте, а когда в списке впервые встретится пропавшая игра
+    return QColor("gray")
+
+
+class GameListModel(QAbstractListModel):
+    """Список игр текущего пользователя.
+
+    Хранит строки ``Games`` в том виде, в каком их отдаёт ``Database``.
+    Добавление, изменение и удаление одной игры затрагивает одну строку
+    модели, а не весь список.
+    """
+
+    GameIdRole = Qt.ItemDataRole.UserRole + 1
+    PathRole = Qt.ItemDataRole.UserRole + 2
+    CategoryRole = Qt.ItemDataRole.UserRole + 3
+    MissingRole = Qt.ItemDataRole.UserRole + 4
+    # «категория/id» для GameFilterProxyModel
+    FilterKeyRole = Qt.ItemDataRole.UserRole + 5
+    RunningRole = Qt.ItemDataRole.UserRole + 6
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._games = []
+        # id игр в порядке строк: по нему словарь id -> строка
+        # пересобирается без обращения к кортежам игр
+        self._ids = []
+        self._row_by_id = {}
+        self._row_index_dirty = False
+        self._running = set()
+        self._icons = None
+        self._placeholder_icon = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._games)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        game = self._games[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return game[1]
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self._icon(game)
+        if role == self.GameIdRole:
+            return game[0]
+        if role == self.PathRole:
+            return game[2]
+        if role == self.CategoryRole:
+            return game[3]
+        if role == self.MissingRole:
+            return bool(game[5])
+        if role == self.FilterKeyRole:
+            return f"{game[3]}/{game[0]}"
+        if role == self.RunningRole:
+            return game[0] in self._running
+        if game[0] in self._running:
+            if role == Qt.ItemDataRole.FontRole:
+                font = QFont()
+                font.setBold(True)
+                return font
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return "Игра запущена"
+        if game[5]:
+            if role == Qt.ItemDataRole.ForegroundRole:
+                return missing_color()
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return f"Файл игры не найден: {game[2]}"
+        return None
+
+    def set_icon_loader(self, loader, placeholder=None):
+        """Включает иконки игр; пока иконка грузится, виден ``placeholder``."""
+        self._icons = loader
+        self._placeholder_icon = placeholder
+        loader.icons_ready.connect(self._on_icons_ready)
+
+    def _icon(self, game):
+        # data() с этой ролью представление вызывает только для видимых
+        # строк, поэтому и загрузка идёт только для них
+        if self._icons is None:
+            return None
+        if game[5]:
+            return self._placeholder_icon
+        icon = self._icons.icon(game[0], game[2])
+        return self._placeholder_icon if icon is None else icon
+
+    def _on_icons_ready(self, game_ids):
+        rows = [row for row in map(self.row_of, game_ids) if row is not None]
+        if not rows:
+            return
+        # Готовые иконки относятся к видимым строкам, идущим подряд, поэтому
+        # одного сигнала на весь диапазон достаточно
+        self.dataChanged.emit(
+            self.index(min(rows)),
+            self.index(max(rows)),
+            [Qt.ItemDataRole.DecorationRole],
+        )
+
+    def set_games(self, games):
+        self.beginResetModel()
+        self._games = list(games)
+        self._ids = [game[0] for game in self._games]
+        self._reindex()
+        self.endResetModel()
+
+    def game_at(self, row):
+        return self._games[row]
+
+    def row_of(self, game_id) -> int | None:
+        if self._row_index_dirty:
+            self._reindex()
+        return self._row_by_id.get(game_id)
+
+    def add_game(self, game):
+        row = len(self._games)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._games.append(game)
+        self._ids.append(game[0])
+        self._row_by_id[game[0]] = row
+        self.endInsertRows()
+
+    def add_games(self, games):
+        games = list(games)
+        if not games:
+            return
+        first = len(self._games)
+        self.beginInsertRows(QModelIndex(), first, first + len(games) - 1)
+        for row, game in enumerate(games, start=first):
+            self._games.append(game)
+            self._ids.append(game[0])
+            self._row_by_id[game[0]] = row
+        self.endInsertRows()
+
+    def set_order(self, game_ids):
+        """Переставляет строки в порядке ``game_ids`` без сброса модели.
+
+        Игры, которых нет в ``game_ids``, остаются в конце. Выделение и
+        текущая строка в представлении сохраняются.
+        """
+        if self._row_index_dirty:
+            self._reindex()
+        row_by_id = self._row_by_id
+        try:
+            rows = list(map(row_by_id.__getitem__, game_ids))
+        except KeyError:
+            rows = [row_by_id[i] for i in game_ids if i in row_by_id]
+        if len(rows) != len(self._games):
+            placed = set(rows)
+            rows.extend(
+                row for row in range(len(self._games)) if row not in placed
+            )
+        self._move_rows(rows)
+
+    def reverse_order(self):
+        self.layoutAboutToBeChanged.emit([], VERTICAL_SORT)
+        self._games.reverse()
+        self._ids.reverse()
+        self._row_index_dirty = True
+        last = len(self._games) - 1
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent, [self.index(last - index.row()) for index in persistent]
+        )
+        self.layoutChanged.emit([], VERTICAL_SORT)
+
+    def _move_rows(self, rows):
+        """Ставит на место i строку, стоявшую на месте ``rows[i]``."""
+        rows = list(rows)
+        self.layoutAboutToBeChanged.emit([], VERTICAL_SORT)
+        self._games = list(map(self._games.__getitem__, rows))
+        self._ids = list(map(self._ids.__getitem__, rows))
+        # Словарь id -> строка пересоберётся при первом обращении
+        self._row_index_dirty = True
+        persistent = self.persistentIndexList()
+        if persistent:
+            # Обычно это только текущая строка представления: её проще
+            # найти поиском, чем строить обратную перестановку
+            if len(persistent) <= PERSISTENT_SCAN_LIMIT:
+                new_row = rows.index
+            else:
+                new_row = dict(zip(rows, range(len(rows)))).__getitem__
+            self.changePersistentIndexList(
+                persistent,
+                [self.index(new_row(index.row())) for index in persistent],
+            )
+        self.layoutChanged.emit([], VERTICAL_SORT)
+
+    def update_game(self, game):
+        row = self.row_of(game[0])
+        if row is None:
+            self.add_game(game)
+            return
+        self._games[row] = game
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def move_category(self, old_category_id, new_category_id):
+        """Переносит игры в другую категорию одним сигналом dataChanged."""
+        first = last = None
+        for row, game in enumerate(self._games):
+            if game[3] == old_category_id:
+                self._games[row] = (*game[:3], new_category_id, *game[4:])
+                if first is None:
+                    first = row
+                last = row
+        if first is not None:
+            self.dataChanged.emit(self.index(first), self.index(last))
+
+    def set_running(self, game_id, running: bool):
+        if running:
+            self._running.add(game_id)
+        else:
+            self._running.discard(game_id)
+        row = self.row_of(game_id)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    def remove_game(self, game_id):
+        row = self.row_of(game_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._games[row]
+        del self._ids[row]
+        del self._row_by_id[game_id]
+        # Номера строк после удалённой сдвинулись; пересчитаем их при
+        # следующем поиске, а не на каждое удаление
+        self._row_index_dirty = row != len(self._games)
+        self.endRemoveRows()
+
+    def update_games(self, games):
+        """Заменяет строки игр одним сигналом dataChanged."""
+        rows = []
+        for game in games:
+            row = self.row_of(game[0])
+            if row is not None:
+                self._games[row] = game
+                rows.append(row)
+        if rows:
+            self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)))
+
+    def remove_games(self, game_ids):
+        """Удаляет игры пачкой.
+
+        Смежные строки удаляются одним диапазоном; если диапазонов много,
+        модель сбрасывается одним сигналом вместо сотен rowsRemoved.
+        """
+        rows = sorted(
+            row
+            for row in map(self.row_of, game_ids)
+            if row is not None
+        )
+        if not rows:
+            return
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+
+        if len(ranges) > REMOVE_RANGES_LIMIT:
+            removed = set(rows)
+            self.beginResetModel()
+            self._games = [
+                game
+                for row, game in enumerate(self._games)
+                if row not in removed
+            ]
+            self._ids = [game[0] for game in self._games]
+            self._reindex()
+            self.endResetModel()
+            return
+
+        for first, last in reversed(ranges):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._games[first : last + 1]
+            del self._ids[first : last + 1]
+            self.endRemoveRows()
+        self._row_index_dirty = True
+
+    def missing_games(self) -> list:
+        return [game for game in self._games if game[5]]
+
+    def _reindex(self):
+        self._row_by_id = dict(zip(self._ids, range(len(self._ids))))
+        self._row_index_dirty = False
+
+
+class GameFilterProxyModel(QSortFilterProxyModel):
+    """Фильтрация списка игр без перестроения исходной модели.
+
+    Порядок строк задаёт исходная модель (``GameListModel.set_order``).
+    Фильтр по категории и результатам поиска собирается в одно регулярное
+    выражение по ``FilterKeyRole``: пока фильтр пуст, прокси не вызывает
+    Python для каждой строки, и перестановка 100 тысяч игр остаётся
+    быстрой.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setDynamicSortFilter(True)
+        self.setFilterRole(GameListModel.FilterKeyRole)
+        self._category_id = None
+        self._search_ids = None
+
+    def set_search_ids(self, game_ids):
+        """Оставляет только игры из результатов поиска; None — без поиска."""
+        self._search_ids = None if game_ids is None else set(game_ids)
+        self._update_filter()
+
+    def set_category(self, category_id: int | None):
+        self._category_id = category_id
+        self._update_filter()
+
+    def category(self) -> int | None:
+        return self._category_id
+
+    def _update_filter(self):
+        if self._category_id is None and self._search_ids is None:
+            self.setFilterRegularExpression("")
+            return
+        category = r"\d+" if self._category_id is None else self._category_id
+        if self._search_ids is None:
+            ids = r"\d+"
+        else:
+            ids = "|".join(map(str, sorted(self._search_ids)))
+        self.setFilterRegularExpression(f"^{category}/({ids})$")
+
+    def game_at(self, index):
+        source = self.mapToSource(index)
+        return self.sourceModel().game_at(source.row())
+
+
+class CategoryModel(QAbstractListModel):
+    """Категории текущего пользователя с числом игр в каждой.
+
+    Одна модель на окно: её показывают меню категорий и выпадающие списки
+    диалогов. Строки приходят из ``Database.get_category_counts`` одним
+    запросом, дальше счётчики меняются на месте: добавление, удаление или
+    перенос игры обновляет строку её категории и строку «Все», в которой
+    показано общее число игр.
+    """
+
+    CategoryIdRole = Qt.ItemDataRole.UserRole + 1
+    GameCountRole = Qt.ItemDataRole.UserRole + 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # [id, название, число игр в самой категории]
+        self._rows = []
+        self._row_by_id = {}
+        self._total = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        category_id, name, count = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return name
+        if role == self.CategoryIdRole:
+            return category_id
+        if role == self.GameCountRole:
+            return self._total if name == "Все" else count
+        return None
+
+    def set_categories(self, rows):
+        self.beginResetModel()
+        self._rows = [list(row) for row in rows]
+        self._total = sum(row[2] for row in self._rows)
+        self._reindex()
+        self.endResetModel()
+
+    def row_of(self, category_id) -> int | None:
+        return self._row_by_id.get(category_id)
+
+    def all_category_id(self):
+        """id категории «Все» текущего пользователя."""
+        for category_id, name, _count in self._rows:
+            if name == "Все":
+                return category_id
+        return None
+
+    def add_category(self, category_id, name):
+        # «Все» всегда первая, остальные по названию, как в запросе
+        row = 1 if self._rows and self._rows[0][1] == "Все" else 0
+        while row < len(self._rows) and self._rows[row][1] < name:
+            row += 1
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, [category_id, name, 0])
+        self._reindex()
+        self.endInsertRows()
+
+    def remove_category(self, category_id, moved_to=None):
+        """Убирает категорию; её игры переходят в ``moved_to``."""
+        row = self.row_of(category_id)
+        if row is None:
+            return
+        self.move_games(category_id, moved_to, self._rows[row][2])
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self._reindex()
+        self.endRemoveRows()
+
+    def add_games(self, games):
+        deltas = {}
+        for game in games:
+            deltas[game[3]] = deltas.get(game[3], 0) + 1
+        self._change_counts(deltas)
+
+    def remove_games(self, games):
+        deltas = {}
+        for game in games:
+            deltas[game[3]] = deltas.get(game[3], 0) - 1
+        self._change_counts(deltas)
+
+    def move_games(self, old_category_id, new_category_id, count=1):
+        if old_category_id != new_category_id:
+            self._change_counts(
+                {old_category_id: -count, new_category_id: count}
+            )
+
+    def _change_counts(self, deltas):
+        total = self._total
+        changed = set()
+        for category_id, delta in deltas.items():
+            row = self.row_of(category_id)
+            # Игры с несуществующей категорией не считаются нигде
+            if row is None or not delta:
+                continue
+            self._rows[row][2] += delta
+            self._total += delta
+            changed.add(row)
+        if self._total != total:
+            row = self.row_of(self.all_category_id())
+            if row is not None:
+                changed.add(row)
+        for row in sorted(changed):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [self.GameCountRole])
+
+    def _reindex(self):
+        self._row_by_id = {row[0]: i for i, row in enumerate(self._rows)}
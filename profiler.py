@@ -0,0 +1,148 @@
+"""Замер этапов запуска лаунчера.
+
+Включается переменной окружения ``QTLAUNCHER_PROFILE`` или ключом
+``--profile-startup``; значение (``QTLAUNCHER_PROFILE=путь``,
+``--profile-startup=путь``) задаёт файл трассировки. По умолчанию файл
+пишется в ``profiles/`` папки данных с датой запуска в имени.
+
+Трассировка сохраняется в формате Chrome trace events: её открывают
+``chrome://tracing`` и https://ui.perfetto.dev. В журнал пишется одна
+строка с длительностью каждого этапа. Выключенный профилировщик почти
+ничего не стоит: ``phase()`` возвращает пустой контекст.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+PROFILE_ENV = "QTLAUNCHER_PROFILE"
+PROFILE_FLAG = "--profile-startup"
+
+# Точка отсчёта: профилировщик импортируется первым, поэтому всё, что
+# было до первого этапа, — импорт модулей
+_ORIGIN = time.perf_counter()
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self._events = []
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def enable(self, trace_path: str | None = None):
+        self.enabled = True
+        self.trace_path = trace_path
+
+    def configure(self, argv: list[str]) -> list[str]:
+        """Включает замер по окружению и ключу; возвращает argv без ключа."""
+        value = os.environ.get(PROFILE_ENV)
+        rest = []
+        for arg in argv:
+            if arg == PROFILE_FLAG:
+                value = value or "1"
+            elif arg.startswith(PROFILE_FLAG + "="):
+                value = arg.split("=", 1)[1]
+            else:
+                rest.append(arg)
+        if value and value != "0":
+            self.enable(None if value == "1" else value)
+        return rest
+
+    def phase(self, name: str):
+        if not self.enabled or self._finished:
+            return nullcontext()
+        return self._phase(name)
+
+    @contextmanager
+    def _phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, started, time.perf_counter())
+
+    def since_start(self, name: str):
+        """Этап от импорта профилировщика до текущего момента.
+
+        Записывается и при выключенном замере: импорт модулей идёт раньше,
+        чем ``configure()`` прочтёт ключ командной строки.
+        """
+        if not self._finished:
+            self._record(name, _ORIGIN, time.perf_counter())
+
+    def _record(self, name, started, finished):
+        with self._lock:
+            self._events.append(
+                (name, started, finished, threading.get_ident())
+            )
+
+    def trace_events(self) -> list[dict]:
+        pid = os.getpid()
+        return [
+            {
+                "name": name,
+                "cat": "startup",
+                "ph": "X",
+                "ts": round((started - _ORIGIN) * 1_000_000, 1),
+                "dur": round((finished - started) * 1_000_000, 1),
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, started, finished, tid in self._events
+        ]
+
+    def summary(self) -> str:
+        total = (time.perf_counter() - _ORIGIN) * 1000
+        phases = ", ".join(
+            f"{name} {(finished - started) * 1000:.1f}"
+            for name, started, finished, _tid in self._events
+        )
+        return f"Запуск за {total:.1f} мс: {phases}"
+
+    def finish(self):
+        """Завершает замер: пишет трассировку и строку в журнал."""
+        if not self.enabled or self._finished:
+            return
+        self._finished = True
+        # json и logging нужны только при включённом замере
+        import json
+        import logging
+
+        logger = logging.getLogger("qtlauncher.startup")
+        if not logging.getLogger().handlers:
+            logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+        logger.info(self.summary())
+
+        path = self.trace_path or self._default_trace_path()
+        try:
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "traceEvents": self.trace_events(),
+                        "displayTimeUnit": "ms",
+                        "otherData": {
+                            "python": sys.version.split()[0],
+                            "platform": sys.platform,
+                        },
+                    },
+                    file,
+                )
+        except OSError as e:
+            logger.warning(f"Ошибка при сохранении трассировки запуска: {e}")
+            return
+        logger.info(f"Трассировка запуска: {path}")
+
+    @staticmethod
+    def _default_trace_path() -> str:
+        from utils import get_data_path
+
+        folder = get_data_path() / "profiles"
+        folder.mkdir(exist_ok=True)
+        return str(folder / time.strftime("startup-%Y%m%d-%H%M%S.json"))
+
+
+profiler = StartupProfiler()
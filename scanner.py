@@ -0,0 +1,386 @@
+"""Поиск исполняемых файлов игр в папках библиотек.
+
+``LibraryScanner`` обходит папки через ``os.scandir`` в пуле потоков и
+отдаёт найденные файлы порциями по мере обхода. ``ScanThread`` запускает
+его в фоне и передаёт порции в интерфейс сигналом.
+"""
+
+import os
+import re
+import stat
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, NamedTuple
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from backends import read_desktop_entry
+from sqltrace import query_tracer
+
+INCLUDE_EXTENSIONS = {".exe", ".sh", ".appimage", ".desktop"}
+
+# Деинсталляторы, установщики, распространяемые пакеты и служебные утилиты
+EXCLUDE_NAME_PATTERN = re.compile(
+    r"unins\d*|uninstall|setup|installer|vc_?redist|dxsetup|dxwebsetup"
+    r"|directx|dotnet|ndp\d+|physx|redist|crash_?report|crash_?handler"
+    r"|updater|ue\d?prereq|easyanticheat|battleye|eac_?launcher|cefprocess"
+    r"|helper|touchup|dowser",
+    re.IGNORECASE,
+)
+
+EXCLUDE_DIRS = {
+    "_commonredist",
+    "commonredist",
+    "redist",
+    "redistributables",
+    "directx",
+    "dotnetfx",
+    "vcredist",
+    "__installer",
+    "installers",
+    "easyanticheat",
+    "battleye",
+    "engine",
+    "__pycache__",
+    ".git",
+}
+
+# Имена, по которым не понять игру: берём название папки
+GENERIC_NAMES = {
+    "game",
+    "start",
+    "launcher",
+    "launch",
+    "run",
+    "play",
+    "main",
+    "app",
+    "bin",
+    "win64",
+    "win32",
+    "x64",
+    "x86",
+}
+
+
+class Candidate(NamedTuple):
+    name: str
+    path: str
+
+
+def candidate_name(path: str) -> str:
+    stem, extension = os.path.splitext(os.path.basename(path))
+    if extension.lower() == ".desktop":
+        name = read_desktop_entry(path).get("Name")
+        if name:
+            return name
+
+    if stem.lower() in GENERIC_NAMES:
+        parent = os.path.dirname(path)
+        # Пропускаем служебные папки вроде bin/x64
+        while parent and os.path.basename(parent).lower() in GENERIC_NAMES:
+            parent = os.path.dirname(parent)
+        if parent and os.path.basename(parent):
+            return os.path.basename(parent)
+    return stem
+
+
+class FileState(NamedTuple):
+    parent: str | None
+    is_dir: bool
+    inode: int
+    size: int
+    mtime_ns: int
+
+
+def _file_state(parent, is_dir, st: os.stat_result) -> FileState:
+    return FileState(
+        parent, is_dir, st.st_ino, 0 if is_dir else st.st_size, st.st_mtime_ns
+    )
+
+
+def _same_stat(old: FileState, is_dir: bool, st: os.stat_result) -> bool:
+    return (
+        old.inode == st.st_ino
+        and old.mtime_ns == st.st_mtime_ns
+        and (is_dir or old.size == st.st_size)
+    )
+
+
+class ScanStats:
+    def __init__(self):
+        self.directories = 0
+        self.directories_read = 0
+        self.files = 0
+        self.candidates = 0
+        self.removed_files = []
+        self.elapsed = 0.0
+
+
+class LibraryScanner:
+    """Обход папок библиотек с поддержкой инкрементального пересканирования.
+
+    ``state`` — сохранённый с прошлого раза индекс ``путь -> FileState``
+    для папок и найденных файлов. Папка, у которой не изменились inode
+    и mtime, повторно не читается: её подпапки и файлы берутся из индекса,
+    а файлы только проверяются через ``stat``. После обхода в
+    ``changed_state`` лежат новые и изменённые записи, а в
+    ``removed_paths`` — пропавшие.
+
+    ``known_paths`` — пути игр, уже добавленных в библиотеку. Файл не из
+    этого набора предлагается, даже если он не менялся: игру могли
+    удалить из библиотеки или не суметь добавить в прошлый раз.
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[str],
+        workers: int | None = None,
+        include_extensions: set[str] | None = None,
+        exclude_pattern: re.Pattern | None = None,
+        exclude_dirs: set[str] | None = None,
+        include_executable_bit: bool = True,
+        max_depth: int | None = 8,
+        state: dict[str, FileState] | None = None,
+        known_paths: set[str] | None = None,
+    ):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.include_extensions = include_extensions or INCLUDE_EXTENSIONS
+        self.exclude_pattern = exclude_pattern or EXCLUDE_NAME_PATTERN
+        self.exclude_dirs = exclude_dirs or EXCLUDE_DIRS
+        self.include_executable_bit = include_executable_bit and os.name != "nt"
+        self.max_depth = max_depth
+        self.state = state or {}
+        self.known_paths = known_paths
+        self.changed_state: dict[str, FileState] = {}
+        self.removed_paths: list[str] = []
+        self.stats = ScanStats()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def is_candidate(self, entry: os.DirEntry) -> bool:
+        stem, extension = os.path.splitext(entry.name)
+        extension = extension.lower()
+        if extension in self.include_extensions:
+            pass
+        elif extension or not self.include_executable_bit:
+            return False
+        else:
+            # Файл без расширения считается игрой, только если он
+            # исполняемый и это ELF или скрипт
+            try:
+                if not entry.stat().st_mode & stat.S_IXUSR:
+                    return False
+                with open(entry.path, "rb") as file:
+                    magic = file.read(4)
+            except OSError:
+                return False
+            if magic != b"\x7fELF" and not magic.startswith(b"#!"):
+                return False
+        return not self.exclude_pattern.search(stem)
+
+    def _scan_directory(self, path: str, depth: int):
+        subdirs, found, files = [], [], 0
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name.lower() not in self.exclude_dirs:
+                                subdirs.append(entry.path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    files += 1
+                    if self.is_candidate(entry):
+                        try:
+                            found.append((entry.path, entry.stat()))
+                        except OSError:
+                            continue
+        except OSError:
+            pass
+        return path, depth, subdirs, found, files
+
+    def _children(self) -> dict[str, list[str]]:
+        children = {}
+        for path, entry in self.state.items():
+            if entry.parent is not None:
+                children.setdefault(entry.parent, []).append(path)
+        return children
+
+    def _under_roots(self, path: str) -> bool:
+        return any(
+            path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+            for root in self.roots
+        )
+
+    def scan(
+        self, on_found: Callable[[list[Candidate]], None] | None = None
+    ) -> list[Candidate]:
+        """Обходит все папки и возвращает новые и изменившиеся файлы.
+
+        Если передан ``on_found``, он вызывается с каждой новой порцией
+        сразу после обработки очередной папки.
+        """
+        self._cancelled.clear()
+        self.stats = ScanStats()
+        self.changed_state = {}
+        self.removed_paths = []
+        started = time.perf_counter()
+        children = self._children()
+        seen = set()
+        result = []
+
+        def remember(path, parent, is_dir, st) -> bool:
+            """Запоминает запись и сообщает, отличается ли она от прошлой."""
+            seen.add(path)
+            old = self.state.get(path)
+            if old is not None and _same_stat(old, is_dir, st):
+                return False
+            self.changed_state[path] = _file_state(parent, is_dir, st)
+            return True
+
+        def offer(path, parent, st) -> bool:
+            """Изменился ли файл или его нет в библиотеке."""
+            changed = remember(path, parent, False, st)
+            if self.known_paths is None:
+                return changed
+            return changed or path not in self.known_paths
+
+        def report(found):
+            if found:
+                self.stats.candidates += len(found)
+                result.extend(found)
+                if on_found is not None:
+                    on_found(found)
+
+        def can_descend(depth):
+            return self.max_depth is None or depth < self.max_depth
+
+        stack = [(root, 0, None) for root in self.roots]
+        with ThreadPoolExecutor(self.workers) as pool:
+            pending = set()
+            while (stack or pending) and not self._cancelled.is_set():
+                while stack:
+                    path, depth, parent = stack.pop()
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    self.stats.directories += 1
+                    if not remember(path, parent, True, st):
+                        # Папка не менялась: обходим её по индексу
+                        found = []
+                        for child in children.get(path, ()):
+                            entry = self.state[child]
+                            if entry.is_dir:
+                                if can_descend(depth):
+                                    stack.append((child, depth + 1, path))
+                                continue
+                            self.stats.files += 1
+                            try:
+                                child_st = os.stat(child)
+                            except OSError:
+                                continue
+                            if offer(child, path, child_st):
+                                found.append(
+                                    Candidate(candidate_name(child), child)
+                                )
+                        report(found)
+                    else:
+                        pending.add(
+                            pool.submit(self._scan_directory, path, depth)
+                        )
+
+                if not pending:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, depth, subdirs, files_found, files = future.result()
+                    self.stats.directories_read += 1
+                    self.stats.files += files
+                    if can_descend(depth):
+                        stack.extend((d, depth + 1, path) for d in subdirs)
+                    found = [
+                        Candidate(candidate_name(file_path), file_path)
+                        for file_path, file_st in files_found
+                        if offer(file_path, path, file_st)
+                    ]
+                    report(found)
+            for future in pending:
+                future.cancel()
+
+        if not self._cancelled.is_set():
+            self.removed_paths = [
+                path
+                for path in self.state
+                if path not in seen and self._under_roots(path)
+            ]
+            self.stats.removed_files = [
+                path
+                for path in self.removed_paths
+                if not self.state[path].is_dir
+            ]
+        self.stats.elapsed = time.perf_counter() - started
+        return result
+
+
+class ScanThread(QThread):
+    """Фоновый запуск ``LibraryScanner`` с передачей находок в GUI.
+
+    Перед обходом загружает из базы индекс файлов и пути игр текущего
+    пользователя. Изменения индекса сохраняет GUI после того, как добавит
+    найденные игры (``LibraryScanner.changed_state``). Находки копятся и отправляются сигналом ``found`` не чаще
+    раза в ``batch_interval`` секунд, чтобы не засыпать очередь событий.
+    """
+
+    found = pyqtSignal(list)
+    scan_finished = pyqtSignal(object)
+
+    def __init__(
+        self, roots, database, batch_interval: float = 0.1, parent=None
+    ):
+        super().__init__(parent)
+        self.scanner = LibraryScanner(roots)
+        self.database = database
+        self.batch_interval = batch_interval
+        self._batch = []
+        self._last_emit = 0.0
+
+    def cancel(self):
+        self.scanner.cancel()
+
+    def _collect(self, candidates):
+        self._batch.extend(candidates)
+        now = time.monotonic()
+        if now - self._last_emit >= self.batch_interval:
+            self._flush(now)
+
+    def _flush(self, now):
+        if self._batch:
+            self.found.emit(self._batch)
+            self._batch = []
+        self._last_emit = now
+
+    def run(self):
+        with query_tracer.action("scan_libraries"):
+            self.scanner.state = {
+                path: FileState._make(row)
+                for path, row in self.database.load_scan_state().items()
+            }
+            self.scanner.known_paths = self.database.get_game_paths()
+            self.scanner.scan(self._collect)
+            self._flush(time.monotonic())
+        # Соединение этого потока больше не понадобится
+        self.database.connections.close_thread()
+        self.scan_finished.emit(self.scanner.stats)
@@ -0,0 +1,247 @@
+"""Учёт SQL-запросов по действиям интерфейса.
+
+При включённом учёте соединения ``ConnectionManager`` открываются с
+``TracedConnection`` и ``set_trace_callback``: трассировка SQLite
+считает все выполненные инструкции, включая BEGIN/COMMIT и строки
+``executemany``, а обёртки ``execute``/``executemany`` замеряют время.
+Инструкции относятся к действию, которое сейчас выполняется в этом
+потоке (``action()`` или метод с декоратором ``traced``); вложенные
+действия учитываются во внешнем — в том, что запустил пользователь.
+
+Запросы дольше ``slow_query_ms`` пишутся в ``logs/slow_queries.log``
+папки данных с ротацией по размеру.
+
+Учёт заметно замедляет запись (обработчик трассировки вызывается на
+каждую строку ``executemany``), поэтому включается отдельно: переменной
+окружения ``QTLAUNCHER_SQL_TRACE=1`` или ключом ``"sql_trace": true``
+в разделе ``database`` файла settings.json. Порог медленного запроса
+задаёт ключ ``slow_query_ms`` того же раздела.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+TRACE_ENV = "QTLAUNCHER_SQL_TRACE"
+SLOW_QUERY_MS = 50.0
+SLOW_LOG_NAME = "slow_queries.log"
+SLOW_LOG_MAX_BYTES = 1024 * 1024
+SLOW_LOG_BACKUPS = 3
+SLOW_SQL_PREVIEW = 500
+
+IDLE_ACTION = "<idle>"
+BACKGROUND_ACTION = "<background>"
+
+
+class ActionStats:
+    def __init__(self):
+        self.statements = 0
+        self.timed = 0
+        self.seconds = 0.0
+        self.connections = 0
+        self.slow = 0
+
+
+class QueryTracer:
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS):
+        self.enabled = False
+        self.slow_query_ms = slow_query_ms
+        self._stats: dict[str, ActionStats] = {}
+        # Стек действий по id потока, как и соединения в ConnectionManager
+        self._actions: dict[int, list[str]] = {}
+        self._lock = threading.Lock()
+        self._slow_log = None
+
+    def configure(self, settings: dict):
+        """Включает учёт по окружению и разделу ``database`` настроек."""
+        value = os.environ.get(TRACE_ENV)
+        if value is not None:
+            self.enabled = value not in ("", "0")
+        else:
+            self.enabled = settings.get("sql_trace") is True
+        try:
+            self.slow_query_ms = float(
+                settings.get("slow_query_ms", SLOW_QUERY_MS)
+            )
+        except (TypeError, ValueError):
+            self.slow_query_ms = SLOW_QUERY_MS
+
+    def current_action(self) -> str:
+        stack = self._actions.get(threading.get_ident())
+        if stack:
+            return stack[0]
+        if threading.current_thread() is threading.main_thread():
+            return IDLE_ACTION
+        return BACKGROUND_ACTION
+
+    @contextmanager
+    def action(self, name: str):
+        ident = threading.get_ident()
+        with self._lock:
+            stack = self._actions.setdefault(ident, [])
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+            if not stack:
+                with self._lock:
+                    self._actions.pop(ident, None)
+
+    def _action_stats(self) -> ActionStats:
+        name = self.current_action()
+        stats = self._stats.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(name, ActionStats())
+        return stats
+
+    # Счётчики одного действия пополняют разные потоки (GUI и пул
+    # поиска), а += над атрибутом не атомарен, поэтому под блокировкой
+    def statement(self, sql: str):
+        """Обработчик ``set_trace_callback``."""
+        stats = self._action_stats()
+        with self._lock:
+            stats.statements += 1
+
+    def connection_opened(self):
+        stats = self._action_stats()
+        with self._lock:
+            stats.connections += 1
+
+    def timed(self, sql: str, seconds: float):
+        stats = self._action_stats()
+        slow = seconds * 1000 >= self.slow_query_ms
+        with self._lock:
+            stats.timed += 1
+            stats.seconds += seconds
+            if slow:
+                stats.slow += 1
+        if slow:
+            self._log_slow(sql, seconds)
+
+    def _log_slow(self, sql: str, seconds: float):
+        logger = self._slow_logger()
+        if logger is None:
+            return
+        text = " ".join(sql.split())[:SLOW_SQL_PREVIEW]
+        logger.warning(
+            f"{seconds * 1000:.1f} мс [{self.current_action()}] {text}"
+        )
+
+    def _slow_logger(self):
+        # logging нужен только когда попался медленный запрос
+        with self._lock:
+            if self._slow_log is not None:
+                return self._slow_log or None
+            import logging
+            from logging.handlers import RotatingFileHandler
+
+            from utils import get_data_path
+
+            try:
+                folder = get_data_path() / "logs"
+                folder.mkdir(exist_ok=True)
+                handler = RotatingFileHandler(
+                    folder / SLOW_LOG_NAME,
+                    maxBytes=SLOW_LOG_MAX_BYTES,
+                    backupCount=SLOW_LOG_BACKUPS,
+                    encoding="utf-8",
+                )
+            except OSError as e:
+                print(f"Ошибка при открытии журнала медленных запросов: {e}")
+                self._slow_log = False
+                return None
+            handler.setFormatter(
+                logging.Formatter("%(asctime)s %(message)s")
+            )
+            logger = logging.getLogger("qtlauncher.sql.slow")
+            logger.addHandler(handler)
+            logger.propagate = False
+            self._slow_log = logger
+            return logger
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                name: dict(vars(stats)) for name, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def report(self) -> str:
+        if not self.enabled:
+            return (
+                "Учёт запросов выключен. Запустите лаунчер с "
+                f"{TRACE_ENV}=1 или добавьте \"sql_trace\": true в раздел "
+                "\"database\" файла settings.json"
+            )
+        rows = sorted(
+            self.snapshot().items(),
+            key=lambda item: item[1]["statements"],
+            reverse=True,
+        )
+        if not rows:
+            return "Запросов пока не было"
+        lines = [
+            f"{'Действие':<32} {'запросов':>9} {'соедин.':>8} "
+            f"{'мс':>9} {'медл.':>6}"
+        ]
+        for name, stats in rows:
+            lines.append(
+                f"{name:<32} {stats['statements']:>9} "
+                f"{stats['connections']:>8} "
+                f"{stats['seconds'] * 1000:>9.1f} {stats['slow']:>6}"
+            )
+        return "\n".join(lines)
+
+
+query_tracer = QueryTracer()
+
+
+def traced(method):
+    """Выполняет метод как действие с его именем.
+
+    Сигналы Qt передают слоту лишние аргументы (``checked`` у кнопок и
+    пунктов меню), а Qt отбрасывает их, только если видит сигнатуру
+    самой функции. Поэтому обёртка отбрасывает их сама.
+    """
+    code = method.__code__
+    if code.co_flags & 0x04:  # CO_VARARGS
+        limit = None
+    else:
+        limit = code.co_argcount
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        with query_tracer.action(method.__name__):
+            return method(*args[:limit], **kwargs)
+
+    return wrapper
+
+
+class TracedConnection(sqlite3.Connection):
+    """Соединение, замеряющее ``execute`` и ``executemany``.
+
+    Для SELECT замеряется подготовка и первый шаг выборки; остальные
+    строки дочитываются позже, при ``fetchall``.
+    """
+
+    def execute(self, sql, parameters=(), /):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            query_tracer.timed(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, parameters, /):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            query_tracer.timed(sql, time.perf_counter() - started)
@@ -30,8 +30,16 @@ class Ui_MainWindow(object):
         MainWindow.setAutoFillBackground(False)
         self.centralwidget = QtWidgets.QWidget(parent=MainWindow)
         self.centralwidget.setObjectName("centralwidget")
-        self.list_games = QtWidgets.QListWidget(parent=self.centralwidget)
-        self.list_games.setGeometry(QtCore.QRect(30, 10, 470, 290))
+        self.search_games = QtWidgets.QLineEdit(parent=self.centralwidget)
+        self.search_games.setGeometry(QtCore.QRect(30, 10, 470, 25))
+        font = QtGui.QFont()
+        font.setFamily("Arial")
+        font.setPointSize(10)
+        self.search_games.setFont(font)
+        self.search_games.setClearButtonEnabled(True)
+        self.search_games.setObjectName("search_games")
+        self.list_games = QtWidgets.QListView(parent=self.centralwidget)
+        self.list_games.setGeometry(QtCore.QRect(30, 40, 470, 260))
         font = QtGui.QFont()
         font.setFamily("Arial")
         font.setPointSize(16)
@@ -46,7 +54,7 @@ class Ui_MainWindow(object):
         self.list_games.setProperty("isWrapping", False)
         self.list_games.setLayoutMode(QtWidgets.QListView.LayoutMode.Batched)
         self.list_games.setViewMode(QtWidgets.QListView.ViewMode.ListMode)
-        self.list_games.setUniformItemSizes(False)
+        self.list_games.setUniformItemSizes(True)
         self.list_games.setWordWrap(False)
         self.list_games.setSelectionRectVisible(False)
         self.list_games.setObjectName("list_games")
@@ -192,7 +200,9 @@ class Ui_MainWindow(object):
     def retranslateUi(self, MainWindow):
         _translate = QtCore.QCoreApplication.translate
         MainWindow.setWindowTitle(_translate("MainWindow", "Qt Launcher"))
-        self.list_games.setSortingEnabled(False)
+        self.search_games.setPlaceholderText(
+            _translate("MainWindow", "Поиск игры...")
+        )
         self.sort_name_a_z.setText(_translate("MainWindow", "A - Z"))
         self.sort_name_z_a.setText(_translate("MainWindow", "Z - A"))
         self.label.setText(
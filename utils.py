@@ -1,5 +1,16 @@
+import atexit
+import copy
 import json
+import os
+import threading
+import time
 from pathlib import Path
+from typing import NamedTuple
+
+# Изменения настроек записываются пачкой после паузы
+SETTINGS_SAVE_DELAY = 0.5
+# Как часто проверять, не изменили ли settings.json снаружи
+SETTINGS_RELOAD_INTERVAL = 1.0
 
 
 def get_data_path():
@@ -26,150 +37,242 @@ class FileManager:
             return file.read()
 
     def _write_content(self, content):
-        with open(self.path, "w", encoding="utf-8") as file:
+        # Пишем во временный файл и подменяем им старый: при сбое на диске
+        # останется либо прежний файл, либо новый, но не половина
+        temp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(temp, "w", encoding="utf-8") as file:
             file.write(content)
+            # Без fsync после сбоя питания переименование может оказаться
+            # на диске раньше данных, и файл останется пустым
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp, self.path)
 
-
-class SessionManager:
-    def __init__(self):
-        self.file_manager = FileManager("session.json")
-        self.file_manager.ensure_exists("{}")
-
-    def save_session(self, user_id: int, login: str):
-        import json
-
-        session_data = {"user_id": user_id, "login": login}
-        self.file_manager._write_content(json.dumps(session_data))
-
-    def load_session(self) -> tuple[int | None, str | None]:
-        import json
-
+    def mtime_ns(self) -> int | None:
         try:
-            content = self.file_manager._read_content()
-            session_data = json.loads(content)
-            return session_data.get("user_id"), session_data.get("login")
-        except (FileNotFoundError, json.JSONDecodeError):
-            return None, None
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
 
-    def clear_session(self):
-        import os
 
-        try:
-            os.remove(self.file_manager.path)
-        except FileNotFoundError:
-            pass
+class Session(NamedTuple):
+    user_id: int | None
+    login: str | None
 
 
-class GameHistoryManager:
-    def __init__(self):
-        self.data_path = get_data_path()
-        self.current_user_id = None
-
-    def _get_user_history_path(self, user_id: int) -> Path:
+# Нет сохранённой сессии: сравнивается по «is», поэтому отличается и от
+# сессии пользователя, чей id равен 0
+NO_SESSION = Session(None, None)
 
-        user_dir = self.data_path / f"user_{user_id}"
-        user_dir.mkdir(exist_ok=True)
-        return user_dir / "last_games.txt"
 
-    def set_current_user(self, user_id: int | None):
+class Lazy:
+    """Объект, создаваемый при первом обращении к его атрибутам.
 
-        self.current_user_id = user_id
-        if user_id is not None:
-            path = self._get_user_history_path(user_id)
-            if not path.exists():
-                path.touch()
+    Модуль можно импортировать, не открывая файлов и базы: работа
+    ``factory`` откладывается до первого использования объекта.
+    """
 
-    def get_last_games(self) -> list[str]:
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
 
-        if self.current_user_id is None:
-            return []
+    def _resolve(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
 
-        path = self._get_user_history_path(self.current_user_id)
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return [game for game in f.read().split("\n") if game.strip()]
-        except FileNotFoundError:
-            return []
+    def is_created(self) -> bool:
+        return self._instance is not None
 
-    def add_game(self, game_name: str):
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
 
-        if self.current_user_id is None:
-            return
 
-        games = self.get_last_games()
-        # Удаляем дубликат и добавляем в начало
-        games = [game for game in games if game != game_name]
-        games.insert(0, game_name)
-        # Ограничиваем историю 5 играми
-        games = games[:5]
-        self._save_games(games)
+class SessionManager:
+    """Сессия текущего пользователя.
 
-    def _save_games(self, games: list[str]):
+    session.json читается один раз, при первом обращении; дальше сессия
+    хранится в памяти, а файл только перезаписывается при входе и
+    удаляется при выходе.
+    """
 
-        if self.current_user_id is None:
-            return
+    def __init__(self):
+        self.file_manager = FileManager("session.json")
+        self._session = None
 
-        path = self._get_user_history_path(self.current_user_id)
-        content = "\n".join(game for game in games if game.strip())
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
+    def current(self) -> Session:
+        if self._session is None:
+            self._session = self._read()
+        return self._session
 
-    def clear_history(self):
+    def _read(self) -> Session:
+        try:
+            session_data = json.loads(self.file_manager._read_content())
+        except (OSError, json.JSONDecodeError):
+            return NO_SESSION
+        if not isinstance(session_data, dict):
+            return NO_SESSION
+        user_id = session_data.get("user_id")
+        login = session_data.get("login")
+        if not isinstance(user_id, int) or not isinstance(login, str):
+            return NO_SESSION
+        return Session(user_id, login)
 
-        if self.current_user_id is None:
-            return
+    def save_session(self, user_id: int, login: str):
+        self._session = Session(user_id, login)
+        session_data = {"user_id": user_id, "login": login}
+        self.file_manager._write_content(json.dumps(session_data))
 
-        path = self._get_user_history_path(self.current_user_id)
-        with open(path, "w", encoding="utf-8") as f:
-            f.write("")
+    def clear_session(self):
+        self._session = NO_SESSION
+        try:
+            os.remove(self.file_manager.path)
+        except FileNotFoundError:
+            pass
 
 
 class SettingsManager:
-    def __init__(self):
+    """Настройки из settings.json, загруженные в память.
+
+    Чтение не обращается к диску. Изменения записываются одним файлом
+    через ``SETTINGS_SAVE_DELAY`` после последнего из них и при выходе.
+    Если файл изменили снаружи (другой экземпляр лаунчера или вручную),
+    он перечитывается; ещё не записанные свои изменения при этом
+    сохраняются.
+    """
+
+    def __init__(self, save_delay: float = SETTINGS_SAVE_DELAY):
         self.file_manager = FileManager("settings.json")
         self.file_manager.ensure_exists('{"theme": "dark"}')
-
-    def get_setting(self, key, default=None):
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._settings = {}
+        self._dirty = set()
+        self._mtime_ns = None
+        self._checked_at = 0.0
+        # Один поток записи на всё время работы ждёт, пока изменения не
+        # прекратятся на save_delay; дедлайн сдвигается каждым изменением
+        self._save_requested = threading.Condition(self._lock)
+        self._save_deadline = None
+        self._saver = None
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        mtime_ns = self.file_manager.mtime_ns()
         try:
-            content = self.file_manager._read_content()
-            settings = json.loads(content)
-            return settings.get(key, default)
+            settings = json.loads(self.file_manager._read_content())
         except (FileNotFoundError, json.JSONDecodeError):
+            settings = {}
+        if not isinstance(settings, dict):
+            settings = {}
+        for key in self._dirty:
+            settings[key] = self._settings[key]
+        self._settings = settings
+        self._mtime_ns = mtime_ns
+        self._checked_at = time.monotonic()
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < SETTINGS_RELOAD_INTERVAL:
+            return
+        self._checked_at = now
+        if self.file_manager.mtime_ns() != self._mtime_ns:
+            self._load()
+
+    def get_setting(self, key, default=None):
+        with self._lock:
+            self._reload_if_changed()
+            if key not in self._settings:
+                return default
+            # Копия, чтобы изменение списка или словаря вызывающим кодом
+            # не меняло настройки в обход update_setting
+            return copy.deepcopy(self._settings[key])
+
+    def _get_typed(self, key, default, types):
+        value = self.get_setting(key, default)
+        return value if isinstance(value, types) else default
+
+    def get_str(self, key, default: str = "") -> str:
+        return self._get_typed(key, default, str)
+
+    def get_bool(self, key, default: bool = False) -> bool:
+        return self._get_typed(key, default, bool)
+
+    def get_int(self, key, default: int = 0) -> int:
+        value = self.get_setting(key, default)
+        if isinstance(value, bool) or not isinstance(value, int):
             return default
+        return value
 
-    def update_setting(self, key, value):
-        try:
-            content = self.file_manager._read_content()
-            settings = json.loads(content)
-        except (FileNotFoundError, json.JSONDecodeError):
-            settings = {}
+    def get_list(self, key, default: list | None = None) -> list:
+        return self._get_typed(key, [] if default is None else default, list)
+
+    def get_dict(self, key, default: dict | None = None) -> dict:
+        return self._get_typed(key, {} if default is None else default, dict)
 
-        settings[key] = value
-        self.file_manager._write_content(
-            json.dumps(settings, indent=4, ensure_ascii=False)
-        )
+    def update_setting(self, key, value):
+        with self._lock:
+            if key in self._settings and self._settings[key] == value:
+                return
+            self._settings[key] = copy.deepcopy(value)
+            self._dirty.add(key)
+            self._schedule_save()
+
+    def _schedule_save(self):
+        self._save_deadline = time.monotonic() + self.save_delay
+        if self._saver is None:
+            self._saver = threading.Thread(
+                target=self._save_loop, name="settings-save", daemon=True
+            )
+            self._saver.start()
+        self._save_requested.notify()
+
+    def _save_loop(self):
+        with self._lock:
+            while True:
+                if self._save_deadline is None:
+                    self._save_requested.wait()
+                    continue
+                remaining = self._save_deadline - time.monotonic()
+                if remaining > 0:
+                    self._save_requested.wait(remaining)
+                    continue
+                self.flush()
+
+    def flush(self):
+        """Записывает накопленные изменения на диск."""
+        with self._lock:
+            self._save_deadline = None
+            if not self._dirty:
+                return
+            # Не затираем изменения, сделанные в файле снаружи
+            if self.file_manager.mtime_ns() != self._mtime_ns:
+                self._load()
+            try:
+                self.file_manager._write_content(
+                    json.dumps(self._settings, indent=4, ensure_ascii=False)
+                )
+            except OSError as e:
+                print(f"Ошибка при сохранении настроек: {e}")
+                return
+            self._dirty.clear()
+            self._mtime_ns = self.file_manager.mtime_ns()
+            self._checked_at = time.monotonic()
 
 
 class DataManager:
     def __init__(self):
-        self.history = GameHistoryManager()
         self.settings = SettingsManager()
         self.session = SessionManager()
 
-        user_id, _ = self.session.load_session()
-        self.history.set_current_user(user_id)
-
-    def get_last_games(self):
-        return self.history.get_last_games()
-
-    def add_game_to_history(self, game_name):
-        self.history.add_game(game_name)
-
-    def clear_game_history(self):
-        self.history.clear_history()
-
     def get_theme(self):
-        return self.settings.get_setting("theme", "dark")
+        return self.settings.get_str("theme", "dark")
 
     def set_theme(self, theme):
         self.settings.update_setting("theme", theme)
@@ -177,8 +280,21 @@ class DataManager:
     def update_setting(self, key, value):
         self.settings.update_setting(key, value)
 
-    def update_current_user(self, user_id: int | None):
-        self.history.set_current_user(user_id)
+    def flush(self):
+        self.settings.flush()
+
+    def get_library_roots(self) -> list[str]:
+        return self.settings.get_list("library_roots")
+
+    def set_library_roots(self, roots: list[str]):
+        self.settings.update_setting("library_roots", roots)
+
+    def get_sort_mode(self) -> tuple[str, bool]:
+        sort = self.settings.get_dict("sort")
+        return sort.get("mode", "name"), sort.get("reverse", False)
+
+    def set_sort_mode(self, mode: str, reverse: bool):
+        self.settings.update_setting("sort", {"mode": mode, "reverse": reverse})
 
 
-data_manager = DataManager()
+data_manager = Lazy(DataManager)